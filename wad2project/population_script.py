@@ -1,8 +1,11 @@
 import os
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wad2project.settings')
 
+import sys
+
 import django
 django.setup()
+from django.core.management import call_command
 from rotten_potatoes.models import *
 from django.contrib.auth.models import User
 from datetime import datetime
@@ -125,6 +128,9 @@ def populate():
           'movies': movies[2]}
     ]
 
+    # Users who are not producers rate the movies, each of them once per movie.
+    raters = []
+
     for user in users:
         user_p = add_user(user['username'], user['password'], user['producer'])
         # If the user is a producer, add his movies to the database.
@@ -132,10 +138,12 @@ def populate():
             for current_movie in user['movies']:
                 movie = add_movie(current_movie['name'], current_movie['release_date'], current_movie['actors'], current_movie['genre'], current_movie['trailer'], current_movie['upload_date'], user_p)
                 # Add ratings and comments associated with this movie to the database.
-                for rating in current_movie['ratings']:
-                    add_rating(user_p, movie, rating['rating'])
+                for rating, rater in zip(current_movie['ratings'], raters):
+                    add_rating(rater, movie, rating['rating'])
                 for comment in current_movie['comments']:
                     add_comment(user_p, movie, comment['time_posted'], comment['text'])
+        else:
+            raters.append(user_p)
 
 # Helper functions
 
@@ -161,7 +169,8 @@ def add_movie(name, rdate, actors, genre, trailer, udate, producer):
     return movie
 
 def add_rating(user_profile, movie, score):
-    rating = Rating.objects.get_or_create(movie=movie, user=user_profile, rating=score)[0]
+    rating = Rating.objects.get_or_create(movie=movie, user=user_profile)[0]
+    rating.rating = score
     rating.save()
     return rating
 
@@ -171,5 +180,10 @@ def add_comment(user, movie, tposted, text):
     return comment
 
 if __name__ == '__main__':
-    print("Starting population script...")
-    populate()
+    if len(sys.argv) > 1:
+        # Arguments ask for a synthetic dataset of any size instead of the sample data, e.g.
+        # python population_script.py --users 10000 --movies 2000 --ratings 1000000 --comments 100000
+        call_command('generate_data', *sys.argv[1:])
+    else:
+        print("Starting population script...")
+        populate()
@@ -0,0 +1 @@
+default_app_config = 'rotten_potatoes.apps.RottenPotatoesConfig'
@@ -4,9 +4,17 @@ from rotten_potatoes.models import *
 # Register your models here.
 class MovieAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug':('name',)}
+    readonly_fields = Movie.AGGREGATE_FIELDS + Movie.VERSION_FIELDS
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'run_at', 'created')
+    list_filter = ('status', 'task')
 
 
 admin.site.register(Movie, MovieAdmin)
 admin.site.register(Rating)
 admin.site.register(Comment)
 admin.site.register(UserProfile)
+admin.site.register(Actor)
+admin.site.register(Job, JobAdmin)
@@ -1,5 +1,24 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class RottenPotatoesConfig(AppConfig):
     name = 'rotten_potatoes'
+
+    def ready(self):
+        # Connect signal handlers
+        import rotten_potatoes.signals
+
+        # Migrations which remake the movie table drop the search triggers, put them back
+        post_migrate.connect(install_search_index, sender=self)
+
+        # Tune every new SQLite connection, see SQLITE_PRAGMAS
+        from rotten_potatoes.db import configure_sqlite
+        connection_created.connect(configure_sqlite)
+
+
+def install_search_index(sender, using, **kwargs):
+    from django.db import connections
+    from rotten_potatoes.search import install_search_index
+    install_search_index(connections[using])
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+USER_KEY = 'rotten_potatoes:user:{}'
+
+UserModel = get_user_model()
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend which loads the user of a session together with its profile in one query. With
+    a SHARED_CACHE both are kept in the cache for USER_CACHE_TTL seconds, so that logged in requests
+    do not query them, and saving or deleting the user or its profile removes them from the cache.
+    A per process cache would keep a changed password or a deactivated user valid in other workers.
+    """
+
+    def get_user(self, user_id):
+        key = USER_KEY.format(user_id)
+        user = cache.get(key) if settings.SHARED_CACHE else None
+        if user is None:
+            try:
+                # The profile is cached on the user, get_profile reads it from there
+                user = UserModel._default_manager.select_related('userprofile').get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if settings.SHARED_CACHE:
+                cache.set(key, user, settings.USER_CACHE_TTL)
+
+        return user if self.user_can_authenticate(user) else None
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
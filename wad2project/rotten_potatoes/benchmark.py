@@ -0,0 +1,271 @@
+import platform
+from collections import namedtuple
+from datetime import datetime
+from time import perf_counter
+
+import django
+import numpy as np
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from rotten_potatoes.leaderboards import LeaderboardPage
+from rotten_potatoes.models import User, UserProfile, Actor, Movie, Comment, Rating
+from rotten_potatoes.profiling import QueryTimer
+from rotten_potatoes.views import get_comments_page
+
+# A request to time. prepare(client, i) runs before the i-th request, outside the timing,
+# and returns its url and POST data, or None for a GET
+Scenario = namedtuple('Scenario', ['name', 'url_name', 'method', 'user', 'prepare'])
+
+BENCHMARK_PASSWORD = "benchmark"
+
+# Number of popular movies requests are spread over
+POPULAR_MOVIES = 20
+
+
+def url(name, *args):
+    return reverse("rotten_potatoes:" + name, args=args)
+
+
+class BenchmarkData:
+    # Users and objects the scenarios request, created on top of a generated dataset
+
+    def __init__(self):
+        self.viewer = self.create_user("benchmark_viewer", producer=False)
+        self.producer = self.create_user("benchmark_producer", producer=True)
+
+        self.movies = list(Movie.objects.order_by('-num_of_ratings', 'id')[:POPULAR_MOVIES])
+        if not self.movies:
+            raise ValueError("There are no movies to benchmark, generate a dataset first.")
+
+        # Movies of the benchmark producer, for the views only a producer can use
+        self.own_movie = Movie.objects.create(name="Benchmark Movie", producer=self.producer, genre="Action",
+                                              actors="Benchmark Actor", description="Benchmark movie.")
+
+        # The viewer rated some movies, so that their account has recommendations
+        for movie in self.movies[:5]:
+            Rating.objects.create(movie=movie, user=self.viewer, rating=5)
+
+        self.actor = Actor.objects.annotate(num_of_movies=Count('movies')).order_by('-num_of_movies', 'id').first()
+        self.genre = self.movies[0].genre
+
+    def create_user(self, username, producer):
+        user = User.objects.filter(username=username).first()
+        if user is None:
+            user = User.objects.create_user(username=username, password=BENCHMARK_PASSWORD)
+        return UserProfile.objects.get_or_create(user=user, defaults={"producer": producer})[0]
+
+    def movie(self, i):
+        return self.movies[i % len(self.movies)]
+
+
+def build_scenarios(data):
+    viewer, producer = data.viewer.user, data.producer.user
+
+    def get(name, *args):
+        return lambda client, i: (url(name, *args), None)
+
+    def movie_get(name):
+        return lambda client, i: (url(name, data.movie(i).slug), None)
+
+    def comments_page(client, i):
+        movie = data.movie(i)
+        cursor = get_comments_page(movie).next_cursor or ""
+        return url("movie_comments", movie.slug) + "?cursor=" + cursor, None
+
+    def register(client, i):
+        return url("register"), {"username": "benchmark_user_{}_{}".format(i, perf_counter()),
+                                 "password": BENCHMARK_PASSWORD, "producer": "No", "description": "Benchmark user."}
+
+    def login(client, i):
+        return url("login"), {"username": viewer.username, "password": BENCHMARK_PASSWORD}
+
+    def logout(client, i):
+        client.force_login(viewer)
+        return url("logout"), None
+
+    def edit_movie(client, i):
+        movie = data.own_movie
+        return url("edit_movie", movie.slug), {"name": movie.name, "actors": movie.actors, "genre": movie.genre,
+                                               "trailer": "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                                               "description": "Edited {} times.".format(i)}
+
+    def add_comment(client, i):
+        return url("add_comment", data.movie(i).slug), {"text": "Benchmark comment {}.".format(i)}
+
+    def rate_movie_get(client, i):
+        # A movie the viewer has not rated, otherwise the view only redirects
+        movie = data.movie(i)
+        Rating.objects.filter(movie=movie, user=data.viewer).delete()
+        return url("rate_movie", movie.slug), None
+
+    def rate_movie_post(client, i):
+        return rate_movie_get(client, i)[0], {"rating": str(i % 5 + 1)}
+
+    def add_movie(client, i):
+        return url("add_movie"), {"name": "Benchmark Added Movie {} {}".format(i, perf_counter()),
+                                  "actors": "Benchmark Actor", "genre": "Drama", "description": "Added.",
+                                  "trailer": "https://www.youtube.com/watch?v=dQw4w9WgXcQ"}
+
+    def edit_account(client, i):
+        return url("edit_account"), {"description": "Benchmark description {}.".format(i)}
+
+    first_page = LeaderboardPage(data.genre, "-avg_rating", per_page=10)
+    next_page_url = url("ratings") + "?genre={}&sort_by=-avg_rating&limit=10&cursor={}".format(
+        data.genre, first_page.next_cursor or "")
+
+    def delete_comment(client, i):
+        movie = data.movie(i)
+        comment = Comment.objects.create(movie=movie, user=data.viewer, text="To delete.", time_posted=datetime.now())
+        return url("delete_comment", movie.slug, comment.pk), None
+
+    def delete_movie(client, i):
+        movie = Movie.objects.create(name="Benchmark Deleted Movie {} {}".format(i, perf_counter()),
+                                     producer=data.producer, genre="Drama")
+        return url("delete_movie", movie.slug), None
+
+    actor_slug = data.actor.slug if data.actor else "missing"
+
+    return [
+        Scenario("index GET anonymous", "index", "GET", None, get("index")),
+        Scenario("index GET viewer", "index", "GET", viewer, get("index")),
+        Scenario("about GET anonymous", "about", "GET", None, get("about")),
+        Scenario("register GET anonymous", "register", "GET", None, get("register")),
+        Scenario("register POST anonymous", "register", "POST", None, register),
+        Scenario("login GET anonymous", "login", "GET", None, get("login")),
+        Scenario("login POST anonymous", "login", "POST", None, login),
+        Scenario("logout GET viewer", "logout", "GET", None, logout),
+        Scenario("movie GET anonymous", "movie", "GET", None, movie_get("movie")),
+        Scenario("movie GET viewer", "movie", "GET", viewer, movie_get("movie")),
+        Scenario("movie_comments GET anonymous", "movie_comments", "GET", None, comments_page),
+        Scenario("edit_movie GET producer", "edit_movie", "GET", producer, get("edit_movie", data.own_movie.slug)),
+        Scenario("edit_movie POST producer", "edit_movie", "POST", producer, edit_movie),
+        Scenario("add_comment GET viewer", "add_comment", "GET", viewer, movie_get("add_comment")),
+        Scenario("add_comment POST viewer", "add_comment", "POST", viewer, add_comment),
+        Scenario("rate_movie GET viewer", "rate_movie", "GET", viewer, rate_movie_get),
+        Scenario("rate_movie POST viewer", "rate_movie", "POST", viewer, rate_movie_post),
+        Scenario("actor GET anonymous", "actor", "GET", None, get("actor", actor_slug)),
+        Scenario("add_movie GET producer", "add_movie", "GET", producer, get("add_movie")),
+        Scenario("add_movie POST producer", "add_movie", "POST", producer, add_movie),
+        Scenario("account GET viewer", "account", "GET", viewer, get("account")),
+        Scenario("edit_account GET viewer", "edit_account", "GET", viewer, get("edit_account")),
+        Scenario("edit_account POST viewer", "edit_account", "POST", viewer, edit_account),
+        Scenario("ratings GET anonymous", "ratings", "GET", None, get("ratings")),
+        Scenario("ratings GET genre anonymous", "ratings", "GET", None,
+                 lambda client, i: (url("ratings") + "?genre={}&sort_by=-avg_rating".format(data.genre), None)),
+        Scenario("ratings GET next page anonymous", "ratings", "GET", None, lambda client, i: (next_page_url, None)),
+        Scenario("ratings POST anonymous", "ratings", "POST", None,
+                 lambda client, i: (url("ratings"), {"genre": data.genre, "sort_by": "name"})),
+        Scenario("search GET anonymous", "search", "GET", None, lambda client, i: (url("search") + "?q=the", None)),
+        Scenario("delete_comment GET viewer", "delete_comment", "GET", viewer, delete_comment),
+        Scenario("delete_movie GET producer", "delete_movie", "GET", producer, delete_movie),
+    ]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_scenario(scenario, iterations, warmup=0):
+    """
+    Request a scenario warmup + iterations times, and return the latency percentiles,
+    median query count and SQL time of the timed requests, in milliseconds.
+    """
+    client = Client()
+    if scenario.user is not None:
+        client.force_login(scenario.user)
+
+    latencies, queries, sql_times, statuses = [], [], [], set()
+    for i in range(warmup + iterations):
+        path, post_data = scenario.prepare(client, i)
+
+        timer = QueryTimer()
+        with connection.execute_wrapper(timer):
+            started = perf_counter()
+            if scenario.method == "POST":
+                response = client.post(path, post_data or {})
+            else:
+                response = client.get(path)
+            elapsed = perf_counter() - started
+
+        if i >= warmup:
+            latencies.append(elapsed * 1000)
+            queries.append(timer.count)
+            sql_times.append(timer.seconds * 1000)
+            statuses.add(response.status_code)
+
+    return {
+        "url_name": scenario.url_name,
+        "method": scenario.method,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "queries": int(np.median(queries)) if queries else 0,
+        "max_queries": max(queries, default=0),
+        "sql_ms": round(percentile(sql_times, 50), 3),
+        "status_codes": sorted(statuses),
+    }
+
+
+def run_benchmarks(iterations=20, warmup=2, only=None, log=None):
+    """
+    Run every scenario against the current database and return the results, which
+    can be saved as JSON and compared with compare_results.
+    """
+    log = log or (lambda message: None)
+    cache.clear()
+    data = BenchmarkData()
+
+    results = {}
+    for scenario in build_scenarios(data):
+        if only and only not in scenario.name:
+            continue
+        results[scenario.name] = run_scenario(scenario, iterations, warmup)
+        log(format_result(scenario.name, results[scenario.name]))
+
+    return {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "iterations": iterations,
+            "movies": Movie.objects.count(),
+            "ratings": Rating.objects.count(),
+            "comments": Comment.objects.count(),
+            "users": User.objects.count(),
+        },
+        "results": results,
+    }
+
+
+def format_result(name, result):
+    return "{:<36} p50 {:>8.2f}ms  p95 {:>8.2f}ms  p99 {:>8.2f}ms  {:>3} queries  {:>7.2f}ms SQL  {}".format(
+        name, result["p50_ms"], result["p95_ms"], result["p99_ms"], result["queries"], result["sql_ms"],
+        "/".join(str(code) for code in result["status_codes"]))
+
+
+def compare_results(results, baseline, threshold=0.2, min_ms=1.0):
+    """
+    Return a message for every scenario which regressed against the baseline: its p95 latency
+    grew more than threshold (a fraction) and more than min_ms, or it runs more queries.
+    """
+    regressions = []
+    for name, result in results["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+
+        if result["queries"] > previous["queries"]:
+            regressions.append("{}: {} queries, baseline {}".format(name, result["queries"], previous["queries"]))
+
+        slower = result["p95_ms"] - previous["p95_ms"]
+        if slower > min_ms and result["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append("{}: p95 {:.2f}ms, baseline {:.2f}ms".format(name, result["p95_ms"],
+                                                                         previous["p95_ms"]))
+
+    return regressions
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from rotten_potatoes.models import Movie
+
+
+HOME_PAGE_SECTIONS_KEY = 'rotten_potatoes:home_page_sections'
+
+
+def get_home_page_sections(catalog_version):
+    # Return the computed sections of the home page, from the cache when possible.
+    # Cached sections are tagged with the catalog version and the day they were computed on,
+    # as the recently added and this year's favorite sections also depend on the date. Both the
+    # version and the sections are read from the replica when the request does, so sections of
+    # a replica which lags behind are tagged with its older version. Without a version, nothing is cached.
+    if catalog_version is None:
+        return compute_home_page_sections()
+    tag = (catalog_version, datetime.now().date())
+
+    cached = cache.get(HOME_PAGE_SECTIONS_KEY)
+    if cached is not None and cached[0] == tag:
+        return cached[1]
+
+    sections = compute_home_page_sections()
+    cache.set(HOME_PAGE_SECTIONS_KEY, (tag, sections), settings.HOME_PAGE_CACHE_TTL)
+    return sections
+
+
+def compute_home_page_sections():
+    # Query the top 5 movies by score, so that a few high ratings do not outrank many
+    top_movies = list(Movie.objects.order_by('-score')[:5])
+
+    # Get movies which were uploaded in past 14 days
+    recently_added = list(Movie.objects.filter(upload_date__gte=datetime.now() - timedelta(days=14)))
+
+    # Change this weeks favorite to this years favorite #
+    current_year = datetime.now().date().strftime("%Y")  # Get current year
+    try:
+        this_years_favorite = Movie.objects.filter(release_date__range=
+                                                   [current_year + '-01-01',
+                                                    current_year + '-12-31']).order_by('-avg_rating')[0]
+    except IndexError:
+        this_years_favorite = None
+
+    return {
+        "top_movies": top_movies,
+        "recently_added": recently_added,
+        "this_years_favorite": this_years_favorite,
+    }
+
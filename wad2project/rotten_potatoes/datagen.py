@@ -0,0 +1,250 @@
+from datetime import date, timedelta
+from time import perf_counter
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.template.defaultfilters import slugify
+
+from rotten_potatoes.forms import genres
+from rotten_potatoes.models import User, UserProfile, Actor, Movie, Rating, Comment, rebuild_rating_aggregates
+from rotten_potatoes.scores import compute_movie_scores
+
+FIRST_NAMES = ["Liam", "Emma", "Noah", "Olivia", "James", "Ava", "Lucas", "Mia", "Ethan", "Zoe", "Tom", "Ian",
+               "Maggie", "Elijah", "Grace", "Oscar", "Ruby", "Hugo", "Iris", "Felix", "Nora", "Leo", "Ella", "Max"]
+LAST_NAMES = ["Neeson", "Hanks", "Wood", "Grace", "Nelson", "Franco", "Kazan", "Mckellen", "Stone", "Reed",
+              "Hart", "Lane", "Fox", "Moore", "Wells", "Price", "Hayes", "Cole", "Ford", "Grant", "Shaw", "Bell"]
+TITLE_WORDS = ["Last", "Dark", "Silent", "Golden", "Broken", "Lost", "Hidden", "Wild", "Final", "Crimson",
+               "Frozen", "Endless", "Iron", "Secret", "Burning", "Empty", "Night", "River", "Storm", "Kingdom",
+               "Shadow", "Road", "City", "Dream", "Garden", "Mountain", "Ocean", "Stranger", "Fire", "Heart"]
+LOREM = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. Donec vitae maecenas at nulla luctus, "
+         "pulvinar felis non, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.").split()
+
+# Synthetic data is dated within this many days before today
+DATE_RANGE_DAYS = 3 * 365
+
+
+def zipf_weights(size, exponent, rng):
+    # Probability of picking each of size items, following Zipf's law over a random ranking of them
+    ranks = rng.permutation(size) + 1
+    weights = 1.0 / ranks ** exponent
+    return weights / weights.sum()
+
+
+class DataGenerator:
+    """
+    Generate a synthetic dataset of users, producers, actors, movies, ratings and comments,
+    written with bulk_create in batches, each batch in its own transaction.
+    Movie and user activity follow Zipf's law, a few movies get most ratings and comments.
+    The same seed always generates the same data.
+    """
+
+    def __init__(self, users=100, movies=50, ratings=1000, comments=200, producers=0.05, actors=None,
+                 zipf_exponent=1.1, seed=0, batch_size=5000, prefix="gen", password="djangoProject", log=None):
+        if movies and not users:
+            raise ValueError("Can not generate movies without users to produce them.")
+        # Users rate a movie once, and producers do not rate their own movies
+        if ratings > (users - 1) * movies:
+            raise ValueError("Can not generate {} ratings, {} users can rate {} movies at most {} times."
+                             .format(ratings, users, movies, (users - 1) * movies))
+
+        self.num_users = users
+        self.num_movies = movies
+        self.num_ratings = ratings
+        self.num_comments = comments
+        self.num_producers = max(1, int(users * producers)) if movies else 0
+        self.num_actors = actors if actors is not None else max(1, movies // 2)
+        self.zipf_exponent = zipf_exponent
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.password = password
+        self.log = log or (lambda message: None)
+        self.rng = np.random.default_rng(seed)
+        self.today = date.today()
+
+    def generate(self):
+        started = perf_counter()
+
+        profile_ids = self.create_users()
+        actor_ids = self.create_actors()
+        movie_ids, producer_ids = self.create_movies(profile_ids[:self.num_producers], actor_ids)
+        self.create_ratings(profile_ids, movie_ids, producer_ids)
+        self.create_comments(profile_ids, movie_ids)
+        self.finish()
+
+        self.log("Generated data in {:.1f}s.".format(perf_counter() - started))
+
+    def next_ids(self, model, count):
+        # Primary keys for new rows, assigned here so that rows can be linked without reading them back
+        start = (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+        return np.arange(start, start + count, dtype=np.int64)
+
+    def dates(self, count, days=DATE_RANGE_DAYS):
+        offsets = self.rng.integers(0, days, size=count)
+        return [self.today - timedelta(days=int(offset)) for offset in offsets]
+
+    def text(self, words):
+        return " ".join(LOREM[i] for i in self.rng.integers(0, len(LOREM), size=words)).capitalize() + "."
+
+    def bulk_create(self, model, objects):
+        # Django splits the batch into inserts of the size the database allows
+        with transaction.atomic():
+            model.objects.bulk_create(objects)
+
+    def create_in_batches(self, model, count, build):
+        # Build and insert count rows, build(start, end) returns the objects of rows start to end
+        started = perf_counter()
+        for start in range(0, count, self.batch_size):
+            self.bulk_create(model, build(start, min(start + self.batch_size, count)))
+        self.log("Created {} {} in {:.1f}s.".format(count, model._meta.verbose_name_plural,
+                                                   perf_counter() - started))
+
+    def create_users(self):
+        # Every user gets the same password, hashed once
+        password = make_password(self.password)
+        user_ids = self.next_ids(User, self.num_users)
+        profile_ids = self.next_ids(UserProfile, self.num_users)
+
+        self.create_in_batches(User, self.num_users, lambda start, end: [
+            User(id=int(user_ids[i]), username="{}user{}".format(self.prefix, user_ids[i]), password=password)
+            for i in range(start, end)])
+
+        # The first users are the producers
+        self.create_in_batches(UserProfile, self.num_users, lambda start, end: [
+            UserProfile(id=int(profile_ids[i]), user_id=int(user_ids[i]), producer=i < self.num_producers)
+            for i in range(start, end)])
+
+        return profile_ids
+
+    def create_actors(self):
+        actor_ids = self.next_ids(Actor, self.num_actors)
+        first = self.rng.integers(0, len(FIRST_NAMES), size=self.num_actors)
+        last = self.rng.integers(0, len(LAST_NAMES), size=self.num_actors)
+
+        # Names are made unique with the actor id, as there are few combinations of them
+        names = ["{} {} {}".format(FIRST_NAMES[first[i]], LAST_NAMES[last[i]], actor_ids[i])
+                 for i in range(self.num_actors)]
+        self.actor_names = dict(zip(actor_ids.tolist(), names))
+
+        self.create_in_batches(Actor, self.num_actors, lambda start, end: [
+            Actor(id=int(actor_ids[i]), name=names[i], slug=slugify(names[i])) for i in range(start, end)])
+
+        return actor_ids
+
+    def create_movies(self, producer_profile_ids, actor_ids):
+        movie_ids = self.next_ids(Movie, self.num_movies)
+        producer_ids = self.rng.choice(producer_profile_ids, size=self.num_movies)
+        genre_names = [genre for genre, label in genres]
+        movie_genres = self.rng.integers(0, len(genre_names), size=self.num_movies)
+        title_words = self.rng.integers(0, len(TITLE_WORDS), size=(self.num_movies, 2))
+
+        # Popular actors star in more movies
+        actor_weights = zipf_weights(len(actor_ids), self.zipf_exponent, self.rng)
+        cast_sizes = self.rng.integers(1, 5, size=self.num_movies)
+        casts = [np.unique(self.rng.choice(actor_ids, size=size, p=actor_weights)).tolist() for size in cast_sizes]
+
+        release_dates = self.dates(self.num_movies, days=30 * 365)
+        upload_dates = self.dates(self.num_movies)
+
+        def build(start, end):
+            movies = []
+            for i in range(start, end):
+                # Names are made unique with the movie id, the slug is set here as bulk_create skips save()
+                name = "The {} {} {}".format(TITLE_WORDS[title_words[i, 0]], TITLE_WORDS[title_words[i, 1]],
+                                             movie_ids[i])
+                movies.append(Movie(id=int(movie_ids[i]), name=name, slug=slugify(name),
+                                    release_date=release_dates[i], upload_date=upload_dates[i],
+                                    actors=", ".join(self.actor_names[actor_id] for actor_id in casts[i]),
+                                    genre=genre_names[movie_genres[i]], producer_id=int(producer_ids[i]),
+                                    trailer="https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                                    description=self.text(int(self.rng.integers(10, 60)))))
+            return movies
+
+        self.create_in_batches(Movie, self.num_movies, build)
+
+        cast_links = [(int(movie_ids[i]), actor_id) for i in range(self.num_movies) for actor_id in casts[i]]
+        Cast = Movie.cast.through
+        self.create_in_batches(Cast, len(cast_links), lambda start, end: [
+            Cast(movie_id=movie_id, actor_id=actor_id) for movie_id, actor_id in cast_links[start:end]])
+
+        return movie_ids, producer_ids
+
+    def sample_pairs(self, count, user_weights, movie_weights, producer_ids, profile_ids):
+        """
+        Return count distinct (user index, movie index) pairs, users and movies picked by their weights.
+        Producers do not rate their own movies.
+        """
+        pairs = np.empty(0, dtype=np.int64)
+        while len(pairs) < count:
+            draw = 2 * (count - len(pairs)) + 1000
+            users = self.rng.choice(len(user_weights), size=draw, p=user_weights)
+            movies = self.rng.choice(len(movie_weights), size=draw, p=movie_weights)
+            drawn = users * self.num_movies + movies
+            drawn = drawn[profile_ids[users] != producer_ids[movies]]
+
+            # Keep the first draw of every pair, in the order drawn
+            found = len(pairs)
+            pairs = np.concatenate([pairs, drawn])
+            pairs = pairs[np.sort(np.unique(pairs, return_index=True)[1])]
+
+            # Popular pairs run out when most pairs are rated, draw the rest uniformly
+            if len(pairs) - found < draw // 100:
+                user_weights = np.full(len(user_weights), 1 / len(user_weights))
+                movie_weights = np.full(len(movie_weights), 1 / len(movie_weights))
+
+        pairs = pairs[:count]
+        return pairs // self.num_movies, pairs % self.num_movies
+
+    def create_ratings(self, profile_ids, movie_ids, producer_ids):
+        if not self.num_ratings:
+            return
+
+        movie_weights = zipf_weights(self.num_movies, self.zipf_exponent, self.rng)
+        user_weights = zipf_weights(self.num_users, self.zipf_exponent, self.rng)
+        users, movies = self.sample_pairs(self.num_ratings, user_weights, movie_weights, producer_ids, profile_ids)
+
+        # Every movie has a quality and every user a bias, ratings scatter around their sum
+        quality = self.rng.normal(3.4, 0.8, size=self.num_movies)
+        bias = self.rng.normal(0, 0.5, size=self.num_users)
+        noise = self.rng.normal(0, 0.7, size=self.num_ratings)
+        values = np.clip(np.rint(quality[movies] + bias[users] + noise), 1, 5).astype(np.int64)
+
+        # Plain lists, reading them is faster than reading numpy scalars row by row
+        rating_ids = self.next_ids(Rating, self.num_ratings).tolist()
+        rating_users = profile_ids[users].tolist()
+        rating_movies = movie_ids[movies].tolist()
+        values = values.tolist()
+
+        self.create_in_batches(Rating, self.num_ratings, lambda start, end: [
+            Rating(id=rating_ids[i], user_id=rating_users[i], movie_id=rating_movies[i], rating=values[i])
+            for i in range(start, end)])
+
+    def create_comments(self, profile_ids, movie_ids):
+        if not self.num_comments or not self.num_movies:
+            return
+
+        movies = self.rng.choice(movie_ids, size=self.num_comments,
+                                 p=zipf_weights(self.num_movies, self.zipf_exponent, self.rng)).tolist()
+        users = self.rng.choice(profile_ids, size=self.num_comments).tolist()
+        lengths = self.rng.integers(3, 40, size=self.num_comments).tolist()
+        posted = self.dates(self.num_comments)
+        comment_ids = self.next_ids(Comment, self.num_comments).tolist()
+
+        self.create_in_batches(Comment, self.num_comments, lambda start, end: [
+            Comment(id=comment_ids[i], user_id=users[i], movie_id=movies[i], text=self.text(lengths[i]),
+                    time_posted=posted[i]) for i in range(start, end)])
+
+    def finish(self):
+        # Rows were inserted with their primary keys, move the sequences past them
+        models = [User, UserProfile, Actor, Movie, Rating, Comment]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+
+        # bulk_create skips the signal handlers, compute what they maintain
+        started = perf_counter()
+        rebuild_rating_aggregates()
+        compute_movie_scores()
+        self.log("Computed rating aggregates and scores in {:.1f}s.".format(perf_counter() - started))
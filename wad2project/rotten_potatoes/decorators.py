@@ -0,0 +1,101 @@
+import hashlib
+from datetime import timedelta
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.shortcuts import redirect
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.timezone import localtime
+
+from rotten_potatoes.models import Movie, UserProfile
+
+
+def get_profile(request):
+    # Profile of the logged in user, looked up once per request
+    if not request.user.is_authenticated:
+        return None
+
+    if not hasattr(request, "_profile"):
+        # Loaded together with the user by the authentication backend, otherwise queried here,
+        # either way the profile reuses the user object of the request
+        try:
+            request._profile = request.user.userprofile
+        except UserProfile.DoesNotExist:
+            request._profile = None
+
+    return request._profile
+
+
+def movie_view(view=None, load_profile=True):
+    """
+    Resolve the movie_name_slug of the URL once, together with its producer and
+    the profile of the logged in user, and call the view with
+    (request, movie_obj, profile, ...) instead of the slug.
+    Views which do not need the profile use @movie_view(load_profile=False) and get None.
+    Redirects to the index page with a message if the movie does not exist.
+    """
+    if view is None:
+        return partial(movie_view, load_profile=load_profile)
+
+    @wraps(view)
+    def wrapper(request, movie_name_slug, *args, **kwargs):
+        try:
+            movie_obj = Movie.objects.select_related("producer__user").get(slug=movie_name_slug)
+        except Movie.DoesNotExist:
+            messages.error(request, "Sorry, movie you tried to access does not exists")
+            return redirect("/rotten_potatoes/")
+
+        profile = get_profile(request) if load_profile else None
+        return view(request, movie_obj, profile, *args, **kwargs)
+
+    return wrapper
+
+
+def conditional_page(page_version, daily=False):
+    """
+    Answer a GET request for a page the client already has with Not Modified, before the view
+    runs its queries. page_version(request, ...) is called with the arguments of the view and
+    returns the version and the modification time of the data the page shows, the ETag also
+    changes with the logged in user and PAGE_VERSION. Clients have to revalidate the page every time.
+    Pages with sections relative to the current date are daily: their ETag also changes with the
+    date, they are modified at its start at the earliest and expire at its end.
+    Pages with messages to show, or without a version yet, are always rendered, so that the
+    messages are not lost.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            # Counting the messages does not mark them as shown
+            if request.method not in ("GET", "HEAD") or len(messages.get_messages(request)):
+                return view(request, *args, **kwargs)
+
+            version, modified = page_version(request, *args, **kwargs)
+            if version is None:
+                return view(request, *args, **kwargs)
+            key = "{}:{}:{}".format(settings.PAGE_VERSION, request.user.pk, version)
+            cache_control = {"private": True, "no_cache": True}
+            if daily:
+                current_time = localtime()
+                start_of_day = current_time.replace(hour=0, minute=0, second=0, microsecond=0)
+                key += ":{}".format(current_time.date())
+                modified = max(modified, start_of_day)
+                cache_control["max_age"] = int((start_of_day + timedelta(days=1) - current_time).total_seconds())
+
+            etag = '"{}"'.format(hashlib.md5(key.encode()).hexdigest())
+            last_modified = int(modified.timestamp())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+
+            if response.status_code in (200, 304):
+                response["ETag"] = etag
+                response["Last-Modified"] = http_date(last_modified)
+                patch_cache_control(response, **cache_control)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -24,8 +24,21 @@ sort_by_list = [
     ("name", "Name <A-Z>"),
     ("-name", "Name <Z-A>"),
     ("-num_of_ratings", "Number Of Ratings"),
+    ("-score", "Top Rated"),
+    ("-score_lower_bound", "Most Reliably Rated"),
 ]
 
+# Full ordering for each sort_by choice, the primary key keeps pages stable between equal values
+sort_by_orderings = {
+    "avg_rating": ("avg_rating", "id"),
+    "-avg_rating": ("-avg_rating", "-id"),
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "-num_of_ratings": ("-num_of_ratings", "-id"),
+    "-score": ("-score", "-id"),
+    "-score_lower_bound": ("-score_lower_bound", "-id"),
+}
+
 ratings = [('1', '1'), ('2', '2'), ('3', '3'), ('4', '4'), ('5', '5')]
 
 
@@ -56,7 +69,8 @@ class MovieForm(forms.ModelForm):
 
     class Meta:
         model = Movie
-        exclude = ('producer', 'upload_date', )
+        exclude = (('producer', 'upload_date', 'cast', 'cover_thumbnails', ) + Movie.AGGREGATE_FIELDS
+                   + Movie.VERSION_FIELDS)
 
 
 class EditMovieForm(forms.ModelForm):
@@ -69,7 +83,8 @@ class EditMovieForm(forms.ModelForm):
 
     class Meta:
         model = Movie
-        exclude = ('producer', 'upload_date', 'slug', )
+        exclude = (('producer', 'upload_date', 'slug', 'cast', 'cover_thumbnails', ) + Movie.AGGREGATE_FIELDS
+                   + Movie.VERSION_FIELDS)
 
 
 class RatingsPageForm(forms.Form):
@@ -0,0 +1,126 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Count, Min, Q
+from django.utils.timezone import now
+
+from rotten_potatoes.models import Job
+from rotten_potatoes.thumbnails import update_thumbnails
+
+logger = logging.getLogger(__name__)
+
+# Functions the worker runs, by task name
+TASKS = {}
+
+
+def task(function):
+    # Register a function as a task which enqueue can run in the worker
+    TASKS[function.__name__] = function
+    return function
+
+
+def enqueue(task_name, **arguments):
+    if task_name not in TASKS:
+        raise ValueError("Unknown task {}.".format(task_name))
+    return Job.objects.create(task=task_name, arguments=json.dumps(arguments, sort_keys=True))
+
+
+def retry_delay(attempts):
+    # Exponential backoff, JOB_RETRY_DELAY seconds after the first failed attempt, doubling after each
+    return timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def claim_job():
+    """
+    Mark the pending job which is due first as running and return it, or None when there is
+    nothing to do. Jobs left running for longer than JOB_TIMEOUT, by a worker which died,
+    are taken again. Several workers can claim jobs at the same time.
+    """
+    current_time = now()
+    due = (Q(status=Job.PENDING, run_at__lte=current_time) |
+           Q(status=Job.RUNNING, started__lt=current_time - timedelta(seconds=settings.JOB_TIMEOUT)))
+
+    for job in Job.objects.filter(due).order_by('run_at', 'id')[:10]:
+        if job.status == Job.RUNNING and job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            # Do not retry forever a job which keeps stopping its worker
+            Job.objects.filter(pk=job.pk, status=Job.RUNNING, attempts=job.attempts).update(
+                status=Job.FAILED, last_error="Timed out after {} attempts.".format(job.attempts))
+            continue
+
+        # Only one worker's update matches the job in the state it was read in
+        claimed = Job.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+            status=Job.RUNNING, started=current_time, attempts=job.attempts + 1)
+        if claimed:
+            job.status, job.started, job.attempts = Job.RUNNING, current_time, job.attempts + 1
+            return job
+    return None
+
+
+def run_job(job):
+    """
+    Run a claimed job and delete it if it succeeds. A failed job is tried again after
+    a backoff delay, until it has been tried JOB_MAX_ATTEMPTS times. Returns whether it succeeded.
+    """
+    try:
+        TASKS[job.task](**json.loads(job.arguments))
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s %s failed, attempt %d: %s", job.pk, job.task, job.attempts, error)
+
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            Job.objects.filter(pk=job.pk).update(status=Job.FAILED, last_error=error)
+        else:
+            Job.objects.filter(pk=job.pk).update(status=Job.PENDING, last_error=error,
+                                                 run_at=now() + retry_delay(job.attempts))
+        return False
+
+    job.delete()
+    return True
+
+
+def run_pending_jobs(limit=None):
+    # Run due jobs until there are none left, or limit of them have run. Returns the number run
+    run = 0
+    while limit is None or run < limit:
+        job = claim_job()
+        if job is None:
+            break
+        run_job(job)
+        run += 1
+    return run
+
+
+def queue_stats():
+    """
+    Return the backlog of the queue: the number of jobs by task and status,
+    and the time the oldest due pending job has been waiting.
+    """
+    counts = {}
+    for row in Job.objects.values('task', 'status').annotate(count=Count('id')).order_by('task', 'status'):
+        counts.setdefault(row['task'], {})[row['status']] = row['count']
+
+    oldest = Job.objects.filter(status=Job.PENDING, run_at__lte=now()).aggregate(oldest=Min('run_at'))['oldest']
+    return {"counts": counts, "oldest_pending": now() - oldest if oldest else None}
+
+
+def retry_failed_jobs():
+    return Job.objects.filter(status=Job.FAILED).update(status=Job.PENDING, attempts=0, run_at=now())
+
+
+@task
+def generate_thumbnails(model, pk, field_name, name):
+    # Thumbnails of an uploaded image, unless the object was deleted or its image replaced since
+    instance = apps.get_model('rotten_potatoes', model).objects.filter(pk=pk).first()
+    if instance is None or getattr(instance, field_name).name != name:
+        return
+    update_thumbnails(instance, field_name)
+
+
+def enqueue_thumbnails(instance, field_name):
+    # Generate the thumbnails of the image of a saved object in the worker, the original is shown until then
+    return enqueue('generate_thumbnails', model=type(instance).__name__, pk=instance.pk, field_name=field_name,
+                   name=getattr(instance, field_name).name)
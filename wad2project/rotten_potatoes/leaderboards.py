@@ -0,0 +1,125 @@
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.defaultfilters import slugify
+from django.utils.functional import cached_property
+
+from rotten_potatoes.forms import genres, sort_by_orderings
+from rotten_potatoes.models import Movie, get_catalog_version
+from rotten_potatoes.pagination import decode_cursor, encode_cursor
+
+
+# Fields the ratings page sorts on, each leaderboard is kept in ascending
+# (value, id) order and read backwards for the descending sorts
+LEADERBOARD_FIELDS = sorted({ordering[0].lstrip('-') for ordering in sort_by_orderings.values()})
+
+LEADERBOARD_GENRES = {genre for genre, label in genres}
+
+
+def leaderboard_key(genre, field):
+    return 'rotten_potatoes:leaderboard:{}:{}'.format(slugify(genre), field)
+
+
+def build_genre_leaderboards(genre, genre_version):
+    # Rank every movie of the genre by every field with a single query
+    rows = list(Movie.objects.filter(genre=genre).values('id', *LEADERBOARD_FIELDS))
+
+    leaderboards = {}
+    for field in LEADERBOARD_FIELDS:
+        leaderboards[genre, field] = sorted((row[field], row['id']) for row in rows)
+
+    if genre_version is not None:
+        set_cached_leaderboards(leaderboards, genre_version)
+    return leaderboards
+
+
+def get_leaderboard(genre, field, genre_version):
+    entries = get_cached_leaderboards({genre: genre_version}).get((genre, field))
+    if entries is None:
+        entries = build_genre_leaderboards(genre, genre_version)[genre, field]
+    return entries
+
+
+def get_cached_leaderboards(genre_versions):
+    """
+    Return the leaderboards of the genres which are in the cache, by (genre, field), given the
+    versions of the genres. Leaderboards are cached with the version of their genre they were built
+    at, those of an older version are left out, so that writes of every process and of the commands
+    to a genre retire its leaderboards and leave the others alone. Leaderboards built from a replica
+    which lags behind carry its older version.
+    """
+    keys = {leaderboard_key(genre, field): (genre, field)
+            for genre in genre_versions if genre in LEADERBOARD_GENRES for field in LEADERBOARD_FIELDS}
+    return {keys[key]: entries for key, (version, entries) in cache.get_many(keys).items()
+            if version is not None and version == genre_versions[keys[key][0]]}
+
+
+def set_cached_leaderboards(leaderboards, genre_version):
+    cache.set_many({leaderboard_key(genre, field): (genre_version, entries)
+                    for (genre, field), entries in leaderboards.items()}, settings.LEADERBOARD_TTL)
+
+
+class LeaderboardPage:
+    """
+    Page of movies of a genre read from its precomputed leaderboard, with the same
+    interface and cursors as a KeysetPage over Movie ordered by sort_by_orderings.
+    The version of the genre is read from the database when it is not known.
+    """
+
+    def __init__(self, genre, sort_by, cursor=None, per_page=None, genre_version=None):
+        self.genre = genre
+        self.genre_version = genre_version
+        self.ordering = sort_by_orderings[sort_by]
+        self.field = self.ordering[0].lstrip('-')
+        self.descending = self.ordering[0].startswith('-')
+        self.per_page = per_page or settings.DEFAULT_PAGE_SIZE
+        model_fields = [Movie._meta.get_field(self.field), Movie._meta.pk]
+        self.after = decode_cursor(cursor, model_fields) if cursor else None
+
+    @cached_property
+    def _entries(self):
+        if self.genre_version is None:
+            self.genre_version = get_catalog_version([self.genre])[2][self.genre]
+        entries = get_leaderboard(self.genre, self.field, self.genre_version)
+
+        try:
+            # One more entry than needed to know if there is a next page
+            if self.descending:
+                end = len(entries) if self.after is None else bisect_left(entries, tuple(self.after))
+                return entries[max(0, end - self.per_page - 1):end][::-1]
+
+            start = 0 if self.after is None else bisect_right(entries, tuple(self.after))
+            return entries[start:start + self.per_page + 1]
+        except TypeError:
+            # Cursor values of the wrong type, start from the first page
+            self.after = None
+            return self._entries
+
+    @cached_property
+    def object_list(self):
+        ids = [movie_id for value, movie_id in self._entries[:self.per_page]]
+        movies = Movie.objects.in_bulk(ids)
+
+        # Leaderboards may lag behind, skip movies which were deleted or left the genre
+        return [movies[movie_id] for movie_id in ids
+                if movie_id in movies and movies[movie_id].genre == self.genre]
+
+    @property
+    def has_next(self):
+        return len(self._entries) > self.per_page
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return encode_cursor(list(self._entries[self.per_page - 1]))
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
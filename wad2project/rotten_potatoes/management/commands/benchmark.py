@@ -0,0 +1,102 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from rotten_potatoes.benchmark import run_benchmarks, compare_results
+from rotten_potatoes.datagen import DataGenerator
+from rotten_potatoes.query_budgets import check_query_budgets
+from rotten_potatoes.recommendations import build_movie_neighbors
+
+
+class Command(BaseCommand):
+    help = ("Benchmark every view on a generated dataset in a test database file, or on the configured database, "
+            "reporting latency percentiles, query counts and SQL time, optionally saving them and comparing "
+            "them with a baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--movies', type=int, default=200)
+        parser.add_argument('--ratings', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--use-existing', action='store_true',
+                            help="Benchmark the dataset of the configured database instead of generating one. "
+                                 "The writes of the scenarios are rolled back at the end.")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per scenario first.")
+        parser.add_argument('--only', help="Only run the scenarios whose name contains this text.")
+        parser.add_argument('--output', help="Save the results to this JSON file.")
+        parser.add_argument('--baseline', help="Compare the results with the ones saved in this JSON file.")
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help="Fraction a p95 latency may grow over the baseline before it is a regression.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        # Requests go through the test client, without the profiling middleware logging every one of them
+        logging.getLogger('rotten_potatoes.profiling').setLevel(logging.WARNING)
+        setup_test_environment()
+        try:
+            if options['use_existing']:
+                results = self.benchmark_existing(options)
+            else:
+                results = self.benchmark_generated(options)
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2, sort_keys=True)
+            self.stdout.write("Saved results to {}.".format(options['output']))
+
+        problems = []
+
+        over_budget = check_query_budgets(results)
+        if over_budget:
+            problems.append("Views over their query budget:\n" + "\n".join(over_budget))
+
+        if baseline is not None:
+            regressions = compare_results(results, baseline, options['threshold'])
+            if regressions:
+                problems.append("Regressions against {}:\n{}".format(options['baseline'], "\n".join(regressions)))
+
+        if problems:
+            raise CommandError("\n".join(problems))
+        self.stdout.write(self.style.SUCCESS("Every view is within its query budget{}.".format(
+            "" if baseline is None else " and there are no regressions against " + options['baseline'])))
+
+    def benchmark_generated(self, options):
+        # A throwaway test database in a file rather than in memory, so that the database settings,
+        # such as the journal mode, apply as they do in production
+        directory = tempfile.mkdtemp()
+        test_name = connection.settings_dict['TEST']['NAME']
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write("Generating dataset...")
+            DataGenerator(users=options['users'], movies=options['movies'], ratings=options['ratings'],
+                          comments=options['comments'], seed=options['seed']).generate()
+            build_movie_neighbors()
+
+            return run_benchmarks(options['iterations'], options['warmup'], options['only'], self.stdout.write)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            connection.settings_dict['TEST']['NAME'] = test_name
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def benchmark_existing(self, options):
+        # Everything runs in one transaction which is rolled back, the writes of views run in savepoints
+        self.stdout.write("Benchmarking {}...".format(connection.settings_dict['NAME']))
+        with transaction.atomic():
+            results = run_benchmarks(options['iterations'], options['warmup'], options['only'], self.stdout.write)
+            transaction.set_rollback(True)
+        return results
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.recommendations import build_movie_neighbors
+
+
+class Command(BaseCommand):
+    help = "Recompute the most similar movies of every movie from the ratings, to be run periodically."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--neighbors', type=int, help="Number of neighbors stored for every movie.")
+
+    def handle(self, *args, **options):
+        stored = build_movie_neighbors(options['neighbors'])
+        self.stdout.write(self.style.SUCCESS("Stored {} movie neighbors.".format(stored)))
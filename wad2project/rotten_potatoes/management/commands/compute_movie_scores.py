@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.scores import compute_movie_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute the bayesian score and rating lower bound of every movie, to be run periodically."
+
+    def handle(self, *args, **options):
+        # Bumps the catalog version, which retires the rankings cached by the web processes
+        updated = compute_movie_scores()
+        self.stdout.write(self.style.SUCCESS("Computed scores for {} movies.".format(updated)))
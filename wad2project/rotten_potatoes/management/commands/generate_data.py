@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rotten_potatoes.datagen import DataGenerator
+
+
+class Command(BaseCommand):
+    help = ("Generate a synthetic dataset with Zipf distributed movie popularity, "
+            "e.g. generate_data --users 100000 --movies 20000 --ratings 5000000 --comments 1000000")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--movies', type=int, default=50)
+        parser.add_argument('--ratings', type=int, default=1000)
+        parser.add_argument('--comments', type=int, default=200)
+        parser.add_argument('--actors', type=int, help="Number of actors, half the number of movies by default.")
+        parser.add_argument('--producers', type=float, default=0.05, help="Fraction of users who are producers.")
+        parser.add_argument('--zipf', type=float, default=1.1, help="Exponent of the popularity distribution.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--prefix', default="gen", help="Prefix of the generated usernames.")
+        parser.add_argument('--password', default="djangoProject", help="Password of every generated user.")
+
+    def handle(self, *args, **options):
+        try:
+            generator = DataGenerator(users=options['users'], movies=options['movies'], ratings=options['ratings'],
+                                      comments=options['comments'], actors=options['actors'],
+                                      producers=options['producers'], zipf_exponent=options['zipf'],
+                                      seed=options['seed'], batch_size=options['batch_size'],
+                                      prefix=options['prefix'], password=options['password'],
+                                      log=self.stdout.write)
+        except ValueError as e:
+            raise CommandError(e)
+
+        generator.generate()
+        self.stdout.write(self.style.SUCCESS("Generated {} users, {} movies, {} ratings and {} comments.".format(
+            options['users'], options['movies'], options['ratings'], options['comments'])))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.thumbnails import backfill_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Generate the thumbnails of the movie covers and profile pictures which have none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overwrite', action='store_true',
+                            help="Regenerate the thumbnails of every image, e.g. after changing THUMBNAIL_WIDTHS.")
+
+    def handle(self, *args, **options):
+        processed, failed = backfill_thumbnails(options['overwrite'], self.stdout.write)
+        self.stdout.write(self.style.SUCCESS("Generated thumbnails for {} images.".format(processed)))
+        if failed:
+            self.stdout.write(self.style.WARNING("Could not read {} images.".format(failed)))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.jobs import queue_stats, retry_failed_jobs
+from rotten_potatoes.models import Job
+
+
+class Command(BaseCommand):
+    help = "Show the backlog of background jobs by task and status, and the failed jobs."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Queue the failed jobs again.")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            self.stdout.write(self.style.SUCCESS("Queued {} failed jobs again.".format(retry_failed_jobs())))
+
+        stats = queue_stats()
+        if not stats['counts']:
+            self.stdout.write("No jobs.")
+        for task, counts in stats['counts'].items():
+            self.stdout.write("{}: {}".format(task, ", ".join(
+                "{} {}".format(counts.get(status, 0), status) for status, label in Job.STATUSES)))
+
+        if stats['oldest_pending'] is not None:
+            self.stdout.write("Oldest pending job waiting for {:.0f}s.".format(
+                stats['oldest_pending'].total_seconds()))
+
+        for job in Job.objects.filter(status=Job.FAILED).order_by('id'):
+            last_line = job.last_error.strip().splitlines()[-1] if job.last_error.strip() else ""
+            self.stdout.write(self.style.ERROR("Failed job {} {} {}: {}".format(job.pk, job.task, job.arguments,
+                                                                                 last_line)))
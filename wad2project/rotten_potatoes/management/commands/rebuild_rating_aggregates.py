@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.models import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating sum, count and average of every movie from the Rating table."
+
+    def handle(self, *args, **options):
+        updated = rebuild_rating_aggregates()
+        self.stdout.write(self.style.SUCCESS("Rebuilt rating aggregates for {} movies.".format(updated)))
@@ -0,0 +1,43 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.replica import logger, sync_replica
+
+
+class Command(BaseCommand):
+    help = ("Copy the default database to the replica database, which stands in for replication when "
+            "both are local SQLite files.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep copying the database until stopped.")
+        parser.add_argument('--interval', type=float,
+                            help="Seconds between two copies with --loop, REPLICA_SYNC_INTERVAL by default.")
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            sync_replica()
+            self.stdout.write(self.style.SUCCESS("Replica synced."))
+            return
+
+        interval = options['interval'] or settings.REPLICA_SYNC_INTERVAL
+        self.stopping = False
+        # Finish the current copy before stopping
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write("Syncing the replica every {} seconds...".format(interval))
+        while not self.stopping:
+            try:
+                sync_replica()
+            except Exception:
+                # E.g. a locked or missing file, the next copy is tried after the interval
+                logger.exception("Replica sync failed")
+            time.sleep(interval)
+
+        self.stdout.write(self.style.SUCCESS("Replica sync stopped."))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rotten_potatoes.warmup import run_warmup
+
+
+class Command(BaseCommand):
+    help = "Compile the templates, build the URL resolver and fill the caches, as new workers do when they start."
+
+    def handle(self, *args, **options):
+        failed = []
+        for name, seconds, result, error in run_warmup():
+            if error is None:
+                self.stdout.write("{}: {:.1f}ms, {}".format(name, seconds * 1000, result))
+            else:
+                self.stdout.write(self.style.ERROR("{}: failed after {:.1f}ms, {}".format(name, seconds * 1000,
+                                                                                          error)))
+                failed.append(name)
+
+        if failed:
+            raise CommandError("Warm-up failed: {}.".format(", ".join(failed)))
+        self.stdout.write(self.style.SUCCESS("Warmed up."))
@@ -0,0 +1,44 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from rotten_potatoes.jobs import claim_job, run_job, run_pending_jobs
+
+
+class Command(BaseCommand):
+    help = ("Run the background jobs, such as generating the thumbnails of uploaded images. "
+            "Several workers can run at the same time.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the jobs which are due, then stop.")
+        parser.add_argument('--poll-interval', type=float,
+                            help="Seconds to wait for new jobs when idle, WORKER_POLL_INTERVAL by default.")
+
+    def handle(self, *args, **options):
+        if options['once']:
+            run = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS("Ran {} jobs.".format(run)))
+            return
+
+        poll_interval = options['poll_interval'] or settings.WORKER_POLL_INTERVAL
+        self.stopping = False
+        # Finish the current job before stopping
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write("Worker started, waiting for jobs...")
+        while not self.stopping:
+            job = claim_job()
+            if job is None:
+                time.sleep(poll_interval)
+                continue
+
+            succeeded = run_job(job)
+            self.stdout.write("{} job {} {}.".format("Ran" if succeeded else "Failed", job.pk, job.task))
+
+        self.stdout.write(self.style.SUCCESS("Worker stopped."))
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:08
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Movie = apps.get_model('rotten_potatoes', 'Movie')
+    Rating = apps.get_model('rotten_potatoes', 'Rating')
+
+    ratings = Rating.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+    Movie.objects.update(
+        rating_sum=Coalesce(Subquery(ratings.annotate(total=Sum('rating')).values('total'),
+                                     output_field=IntegerField()), 0),
+        num_of_ratings=Coalesce(Subquery(ratings.annotate(total=Count('id')).values('total'),
+                                         output_field=IntegerField()), 0))
+    Movie.objects.filter(num_of_ratings__gt=0).update(
+        avg_rating=Cast('rating_sum', FloatField()) / F('num_of_ratings'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0003_auto_20210402_1654'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='avg_rating',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='num_of_ratings',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
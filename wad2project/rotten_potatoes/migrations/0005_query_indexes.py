@@ -0,0 +1,68 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:11
+
+from django.db import migrations, models
+from django.db.models import Count, F, FloatField, Max, Sum
+from django.db.models.functions import Cast
+
+
+def remove_duplicate_ratings(apps, schema_editor):
+    # Keep only the latest rating of each user for a movie before adding the unique constraint
+    Movie = apps.get_model('rotten_potatoes', 'Movie')
+    Rating = apps.get_model('rotten_potatoes', 'Rating')
+
+    duplicates = (Rating.objects.values('movie', 'user').order_by()
+                  .annotate(latest=Max('id'), count=Count('id')).filter(count__gt=1))
+
+    for duplicate in duplicates:
+        Rating.objects.filter(movie=duplicate['movie'], user=duplicate['user'],
+                              id__lt=duplicate['latest']).delete()
+
+        # Historical models send no signals, so recount the movie here
+        totals = Rating.objects.filter(movie=duplicate['movie']).aggregate(total=Sum('rating'), count=Count('id'))
+        Movie.objects.filter(pk=duplicate['movie']).update(rating_sum=totals['total'] or 0,
+                                                           num_of_ratings=totals['count'])
+        Movie.objects.filter(pk=duplicate['movie'], num_of_ratings__gt=0).update(
+            avg_rating=Cast('rating_sum', FloatField()) / F('num_of_ratings'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0004_movie_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['movie', 'time_posted'], name='comment_movie_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['name'], name='movie_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['upload_date'], name='movie_upload_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['release_date', 'avg_rating'], name='movie_release_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'avg_rating'], name='movie_genre_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'name'], name='movie_genre_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'num_of_ratings'], name='movie_genre_num_ratings_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('movie', 'user'), name='unique_movie_user_rating'),
+        ),
+    ]
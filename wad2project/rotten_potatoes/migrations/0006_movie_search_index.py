@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from rotten_potatoes.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    from rotten_potatoes.search import SEARCH_TABLE, SEARCH_TRIGGERS_SQL, search_index_available
+
+    if not search_index_available(schema_editor.connection):
+        return
+    for name in SEARCH_TRIGGERS_SQL:
+        schema_editor.execute("DROP TRIGGER IF EXISTS {}".format(name))
+    schema_editor.execute("DROP TABLE IF EXISTS {}".format(SEARCH_TABLE))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
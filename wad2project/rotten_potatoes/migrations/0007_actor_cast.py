@@ -0,0 +1,56 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:16
+
+from django.db import migrations, models
+from django.template.defaultfilters import slugify
+
+
+def backfill_cast(apps, schema_editor):
+    # Parse the actors field of every existing movie into Actor rows and cast links
+    Movie = apps.get_model('rotten_potatoes', 'Movie')
+    Actor = apps.get_model('rotten_potatoes', 'Actor')
+    Cast = Movie.cast.through
+
+    movie_names = {}
+    for movie_id, actors in Movie.objects.values_list('id', 'actors').iterator():
+        names = {}
+        for name in (actors or "").split(","):
+            name = " ".join(name.split())
+            if slugify(name):
+                names.setdefault(slugify(name), name)
+        movie_names[movie_id] = names
+
+    all_names = {}
+    for names in movie_names.values():
+        for slug, name in names.items():
+            all_names.setdefault(slug, name)
+    Actor.objects.bulk_create([Actor(name=name, slug=slug) for slug, name in all_names.items()],
+                              batch_size=500, ignore_conflicts=True)
+
+    actor_ids = dict(Actor.objects.values_list('slug', 'id'))
+    Cast.objects.bulk_create([Cast(movie_id=movie_id, actor_id=actor_ids[slug])
+                              for movie_id, names in movie_names.items() for slug in names],
+                             batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0006_movie_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Actor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256)),
+                ('slug', models.SlugField(max_length=256, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='cast',
+            field=models.ManyToManyField(blank=True, related_name='movies', to='rotten_potatoes.Actor'),
+        ),
+        migrations.RunPython(backfill_cast, migrations.RunPython.noop),
+    ]
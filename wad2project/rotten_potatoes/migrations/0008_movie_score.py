@@ -0,0 +1,44 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:22
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import FloatField, Sum, Value
+from django.db.models.functions import Cast
+
+
+def backfill_scores(apps, schema_editor):
+    # Bayesian scores only, the lower bounds are computed by the compute_movie_scores command
+    Movie = apps.get_model('rotten_potatoes', 'Movie')
+
+    totals = Movie.objects.aggregate(rating_sum=Sum('rating_sum'), num_of_ratings=Sum('num_of_ratings'))
+    prior_mean = (totals['rating_sum'] or 0) / (totals['num_of_ratings'] or 1)
+    weight = float(settings.SCORE_PRIOR_RATINGS)
+
+    Movie.objects.filter(num_of_ratings__gt=0).update(
+        score=(Cast('rating_sum', FloatField()) + Value(prior_mean * weight))
+        / (Cast('num_of_ratings', FloatField()) + Value(weight)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0007_actor_cast'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='score_lower_bound',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'score'], name='movie_genre_score_idx'),
+        ),
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
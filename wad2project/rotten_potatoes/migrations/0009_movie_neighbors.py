@@ -0,0 +1,27 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0008_movie_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieNeighbor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('similarity', models.FloatField()),
+                ('movie', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='neighbors', to='rotten_potatoes.Movie')),
+                ('neighbor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='rotten_potatoes.Movie')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movieneighbor',
+            index=models.Index(fields=['movie', 'similarity'], name='movie_neighbor_similarity_idx'),
+        ),
+    ]
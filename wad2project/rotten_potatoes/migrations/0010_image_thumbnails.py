@@ -0,0 +1,23 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0009_movie_neighbors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='cover_thumbnails',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_pic_thumbnails',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
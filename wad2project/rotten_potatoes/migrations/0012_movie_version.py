@@ -0,0 +1,24 @@
+# Generated by Django 2.2.17 on 2026-10-18 07:49
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0011_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='modified_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.17 on 2026-10-18 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0012_movie_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['modified_at'], name='movie_modified_at_idx'),
+        ),
+    ]
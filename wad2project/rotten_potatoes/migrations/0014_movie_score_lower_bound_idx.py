@@ -0,0 +1,22 @@
+# Generated by Django 2.2.17 on 2026-10-18 08:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0013_movie_modified_at_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movie',
+            name='score_lower_bound',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['genre', 'score_lower_bound'], name='movie_genre_lower_bound_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.17 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rotten_potatoes', '0015_catalog_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='comments_version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='details_version',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='ratings_version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -1,16 +1,31 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F, Q, Case, When, Value, FloatField, IntegerField, OuterRef, Subquery, Sum, Count
+from django.db.models.functions import Cast, Coalesce, Concat
 from django.template.defaultfilters import slugify
+from django.utils.timezone import now
 from django.contrib.auth.models import User
 from datetime import datetime
 
+from rotten_potatoes.replica import primary_reads
+
 
 # Create your models here.
 from wad2project.settings import MEDIA_ROOT
 
 
+# Picture of the profiles without an uploaded one
+DEFAULT_PROFILE_PIC = "profile_images/default.png"
+# Cover of the movies without an uploaded one
+DEFAULT_COVER = "movie_images/default.jpg"
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
-    profile_pic = models.ImageField(upload_to="profile_images", blank=True, default="profile_images/default.png")
+    profile_pic = models.ImageField(upload_to="profile_images", blank=True, default=DEFAULT_PROFILE_PIC)
+    # Widths of the generated thumbnails of the picture, empty until they are generated
+    profile_pic_thumbnails = models.CharField(max_length=64, blank=True, default="")
     description = models.TextField(max_length=1024, default="")
 
     # boolean flag for identifying producers
@@ -20,6 +35,26 @@ class UserProfile(models.Model):
         return self.user.username
 
 
+class Actor(models.Model):
+    name = models.CharField(max_length=256)
+    # Normalized name, the same actor written with different case or spacing shares it
+    slug = models.SlugField(max_length=256, unique=True)
+
+    def __str__(self):
+        return self.name
+
+
+def parse_actors(actors):
+    # Split a comma separated list of actors into clean names, one per actor
+    names = {}
+    for name in actors.split(","):
+        name = " ".join(name.split())
+        slug = slugify(name)
+        if slug and slug not in names:
+            names[slug] = name
+    return names
+
+
 class Movie(models.Model):
     name = models.CharField(max_length=128)
     release_date = models.DateField(null=True)
@@ -29,15 +64,97 @@ class Movie(models.Model):
     producer = models.ForeignKey(UserProfile, on_delete=models.CASCADE, null=True, blank=True)
     trailer = models.URLField(max_length=128)
     description = models.TextField(max_length=1024)
-    cover = models.ImageField(upload_to="movie_images", blank=True, default="movie_images/default.jpg")
+    cover = models.ImageField(upload_to="movie_images", blank=True, default=DEFAULT_COVER)
+    # Widths of the generated thumbnails of the cover, empty until they are generated
+    cover_thumbnails = models.CharField(max_length=64, blank=True, default="")
     upload_date = models.DateField()
     slug = models.SlugField(unique=True)
+    # Actors parsed from the actors field, kept in sync on save
+    cast = models.ManyToManyField(Actor, related_name='movies', blank=True)
+
+    # Rating aggregates, maintained by the Rating signal handlers
+    rating_sum = models.IntegerField(default=0)
+    num_of_ratings = models.IntegerField(default=0, db_index=True)
+    avg_rating = models.FloatField(default=0, db_index=True)
+
+    # Ranking scores, the bayesian average kept up to date with the aggregates and
+    # the lower bound of the rating computed by the compute_movie_scores command
+    score = models.FloatField(default=0, db_index=True)
+    score_lower_bound = models.FloatField(default=0, db_index=True)
+
+    # Version of what the movie page shows, bumped by every write to the movie, its ratings and
+    # its comments, and the time of the last one. Pages are answered with Not Modified from them.
+    version = models.IntegerField(default=1)
+    modified_at = models.DateTimeField(default=now)
+    # Versions of the fragments of the movie page, the details bumped by saves of the movie,
+    # the rating by its ratings and the comments by its comments
+    details_version = models.IntegerField(default=1)
+    ratings_version = models.IntegerField(default=1)
+    comments_version = models.IntegerField(default=1)
+
+    AGGREGATE_FIELDS = ('rating_sum', 'num_of_ratings', 'avg_rating', 'score', 'score_lower_bound')
+    VERSION_FIELDS = ('version', 'modified_at', 'details_version', 'ratings_version', 'comments_version')
+    # Versions written by a save of the movie, the others are bumped by the writes of ratings and comments
+    SAVED_VERSION_FIELDS = ('version', 'modified_at', 'details_version')
+
+    class Meta:
+        # SQLite appends the primary key to every index, so these also serve the id tiebreaker of pages
+        indexes = [
+            models.Index(fields=['name'], name='movie_name_idx'),
+            models.Index(fields=['upload_date'], name='movie_upload_date_idx'),
+            models.Index(fields=['release_date', 'avg_rating'], name='movie_release_rating_idx'),
+            models.Index(fields=['genre', 'avg_rating'], name='movie_genre_rating_idx'),
+            models.Index(fields=['genre', 'name'], name='movie_genre_name_idx'),
+            models.Index(fields=['genre', 'num_of_ratings'], name='movie_genre_num_ratings_idx'),
+            models.Index(fields=['genre', 'score'], name='movie_genre_score_idx'),
+            models.Index(fields=['genre', 'score_lower_bound'], name='movie_genre_lower_bound_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Produce slug from name, then save
         self.slug = slugify(self.name)
         self.upload_date = datetime.now()
+
+        # Never write back the aggregates and fragment versions of an existing movie, they
+        # may have been changed by a rating or a comment since this instance was loaded
+        updating = self.pk is not None and not self._state.adding
+        skipped = set(self.AGGREGATE_FIELDS + self.VERSION_FIELDS) - set(self.SAVED_VERSION_FIELDS)
+        if updating and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name not in skipped]
+        elif updating:
+            kwargs['update_fields'] = set(kwargs['update_fields']).union(self.SAVED_VERSION_FIELDS)
+
+        # Bump the versions in the same update, in the database as a rating may have bumped the version too
+        if updating:
+            self.version, self.details_version = F('version') + 1, F('details_version') + 1
+            self.modified_at = now()
         super(Movie, self).save(*args, **kwargs)
+        if updating:
+            # Loaded again from the database if they are used
+            del self.__dict__['version'], self.__dict__['details_version']
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Movie, cls).from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        # Remember the stored actors, the cast only needs updating when they change,
+        # and the stored genre, whose leaderboard the movie leaves when it changes
+        instance._loaded_actors = loaded.get('actors')
+        instance._loaded_genre = loaded.get('genre')
+        return instance
+
+    def update_cast(self):
+        # Link the movie to an Actor for every name in the actors field, creating missing actors
+        names = parse_actors(self.actors or "")
+        Actor.objects.bulk_create([Actor(name=name, slug=slug) for slug, name in names.items()],
+                                  ignore_conflicts=True)
+        self.cast.set(Actor.objects.filter(slug__in=names))
+        self._loaded_actors = self.actors
+
+    def cast_slugs(self):
+        # (slug, name) of every actor of the cast in credit order, without querying the cast
+        return list(parse_actors(self.actors or "").items())
 
     def __str__(self):
         return self.name
@@ -50,6 +167,19 @@ class Rating(models.Model):
 
     rating = models.IntegerField(default=0)
 
+    class Meta:
+        # A user rates a movie once, this also indexes the lookup of a user's rating of a movie
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'user'], name='unique_movie_user_rating'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Rating, cls).from_db(db, field_names, values)
+        # Remember the stored values so that changes can be applied to the movie aggregates
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return "Movie: {}, Score: {}.".format(self.movie.name, self.rating)
 
@@ -61,6 +191,196 @@ class Comment(models.Model):
     time_posted = models.DateField()
     movie = models.ForeignKey(Movie, on_delete=models.CASCADE)
 
+    class Meta:
+        # Comments of a movie are listed newest first
+        indexes = [
+            models.Index(fields=['movie', 'time_posted'], name='comment_movie_time_idx'),
+        ]
+
     def __str__(self):
         self.time_posted = datetime.now()
         return self.text
+
+    def delete(self, *args, **kwargs):
+        # The movie page lists the comments of the movie. Not done by a post_delete receiver,
+        # which would make the comments of a deleted movie be deleted and touched one by one
+        deleted = super(Comment, self).delete(*args, **kwargs)
+        touch_movie(self.movie_id, 'comments_version')
+        return deleted
+
+
+class MovieNeighbor(models.Model):
+    # Most similar movies of a movie by their ratings, computed by the build_movie_neighbors command
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='neighbors', db_index=False)
+    neighbor = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='+')
+    similarity = models.FloatField()
+
+    class Meta:
+        # Neighbors of a movie are read most similar first, this index also serves lookups by movie
+        indexes = [
+            models.Index(fields=['movie', 'similarity'], name='movie_neighbor_similarity_idx'),
+        ]
+
+    def __str__(self):
+        return "{} -> {} ({:.3f})".format(self.movie_id, self.neighbor_id, self.similarity)
+
+
+class Job(models.Model):
+    # Background task run by the worker command, deleted once it succeeds
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (FAILED, 'Failed')]
+
+    task = models.CharField(max_length=64)
+    # Keyword arguments of the task, as JSON
+    arguments = models.TextField(default="{}")
+    status = models.CharField(max_length=16, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    # Pending jobs run once this time is reached, later after each failed attempt
+    run_at = models.DateTimeField(default=now)
+    created = models.DateTimeField(default=now)
+    started = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    class Meta:
+        # The worker takes the pending job due first
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return "{} {} ({})".format(self.task, self.arguments, self.status)
+
+
+class CatalogVersion(models.Model):
+    # Counter bumped by every write changing the listing pages, in the transaction of the write
+    key = models.CharField(max_length=300, primary_key=True)
+    version = models.IntegerField(default=0)
+    modified_at = models.DateTimeField(default=now)
+
+    def __str__(self):
+        return "{}: {}".format(self.key, self.version)
+
+
+# Average rating computed from the stored sum and count of a movie
+AVG_RATING_EXPRESSION = Case(When(num_of_ratings=0, then=Value(0.0)),
+                             default=Cast('rating_sum', FloatField()) / F('num_of_ratings'),
+                             output_field=FloatField())
+
+SCORE_PRIOR_KEY = 'rotten_potatoes:score_prior'
+
+
+def get_score_prior():
+    # Mean of all ratings, which scores of movies with few ratings are pulled towards. Every process
+    # caches it for SCORE_PRIOR_CACHE_TTL seconds, and not at all while there are no ratings.
+    prior_mean = cache.get(SCORE_PRIOR_KEY)
+    if prior_mean is None:
+        # Not from a replica, which may lag behind the ratings
+        with primary_reads():
+            totals = Movie.objects.aggregate(rating_sum=Sum('rating_sum'), num_of_ratings=Sum('num_of_ratings'))
+        prior_mean = (totals['rating_sum'] or 0) / (totals['num_of_ratings'] or 1)
+        if totals['num_of_ratings']:
+            cache.set(SCORE_PRIOR_KEY, prior_mean, settings.SCORE_PRIOR_CACHE_TTL)
+    return prior_mean
+
+
+def score_expression(prior_mean):
+    # Bayesian average of the ratings of a movie, as if it also had SCORE_PRIOR_RATINGS
+    # ratings of the prior mean. Movies without ratings are not ranked.
+    weight = float(settings.SCORE_PRIOR_RATINGS)
+    return Case(When(num_of_ratings=0, then=Value(0.0)),
+                default=(Cast('rating_sum', FloatField()) + Value(prior_mean * weight))
+                / (Cast('num_of_ratings', FloatField()) + Value(weight)),
+                output_field=FloatField())
+
+
+def version_bump(*fragment_versions):
+    # Update of the version fields of movies whose page changed, and of the versions of the changed fragments
+    fields = {'version': F('version') + 1, 'modified_at': now()}
+    fields.update({field: F(field) + 1 for field in fragment_versions})
+    return fields
+
+
+def touch_movie(movie_id, *fragment_versions):
+    Movie.objects.filter(pk=movie_id).update(**version_bump(*fragment_versions))
+
+
+CATALOG_VERSION_KEY = 'catalog'
+GENRE_VERSION_PREFIX = 'genre:'
+
+
+def genre_version_key(genre):
+    return GENRE_VERSION_PREFIX + genre
+
+
+def bump_catalog_version(genres=(), movies=None):
+    """
+    Bump the version of the listing pages and the versions of the leaderboards of the genres, given
+    by name or as the genres of a queryset of movies, in one query. Called after the write changing
+    them and in its transaction, so that versions follow the order writes are committed in.
+    Counters which do not exist yet are left alone, see get_catalog_version.
+    """
+    keys = Q(key=CATALOG_VERSION_KEY) | Q(key__in=[genre_version_key(genre) for genre in genres])
+    if movies is not None:
+        genre_keys = movies.order_by().values(version_key=Concat(Value(GENRE_VERSION_PREFIX), 'genre'))
+        keys |= Q(key__in=genre_keys)
+    CatalogVersion.objects.filter(keys).update(version=F('version') + 1, modified_at=now())
+
+
+def read_versions(keys):
+    return {key: (version, modified) for key, version, modified
+            in CatalogVersion.objects.filter(key__in=keys).values_list('key', 'version', 'modified_at')}
+
+
+def get_catalog_version(genres=()):
+    """
+    Return the version of the listing pages, the time of the last write bumping it and the versions
+    of the leaderboards of the genres, by genre, in one query. Read with the router, so they come
+    from the replica when the data does. A counter which does not exist yet is created and read
+    again, so that the data read afterwards has every write made before it. Until a replica has
+    it, its version is None and nothing is cached under it.
+    """
+    keys = [CATALOG_VERSION_KEY] + [genre_version_key(genre) for genre in genres]
+    versions = read_versions(keys)
+
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        CatalogVersion.objects.bulk_create([CatalogVersion(key=key) for key in missing], ignore_conflicts=True)
+        versions.update(read_versions(missing))
+
+    version, modified = versions.get(CATALOG_VERSION_KEY, (None, None))
+    genre_versions = {genre: versions.get(genre_version_key(genre), (None, None))[0] for genre in genres}
+    return version, modified, genre_versions
+
+
+def adjust_rating_aggregates(movie_id, rating_delta, count_delta):
+    # Apply a change to the stored rating aggregates of a movie in the database,
+    # so that concurrent ratings can not overwrite each other
+    with transaction.atomic():
+        movies = Movie.objects.filter(pk=movie_id)
+        movies.update(rating_sum=F('rating_sum') + rating_delta,
+                      num_of_ratings=F('num_of_ratings') + count_delta, **version_bump('ratings_version'))
+        movies.update(avg_rating=AVG_RATING_EXPRESSION, score=score_expression(get_score_prior()))
+        bump_catalog_version(movies=movies)
+
+
+def rebuild_rating_aggregates(movies=None):
+    # Recompute the stored rating aggregates from the Rating table,
+    # for all movies or only for the given queryset
+    if movies is None:
+        movies = Movie.objects.all()
+
+    ratings = Rating.objects.filter(movie=OuterRef('pk')).order_by().values('movie')
+    rating_sum = ratings.annotate(total=Sum('rating')).values('total')
+    num_of_ratings = ratings.annotate(total=Count('id')).values('total')
+
+    with transaction.atomic():
+        updated = movies.update(
+            rating_sum=Coalesce(Subquery(rating_sum, output_field=IntegerField()), 0),
+            num_of_ratings=Coalesce(Subquery(num_of_ratings, output_field=IntegerField()), 0),
+            **version_bump('ratings_version'))
+        movies.update(avg_rating=AVG_RATING_EXPRESSION, score=score_expression(get_score_prior()))
+        bump_catalog_version(movies=movies)
+
+    return updated
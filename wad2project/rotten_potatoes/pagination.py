@@ -0,0 +1,112 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+def encode_cursor(values):
+    # Cursor is the url safe encoding of the ordering values of the last row on a page
+    data = json.dumps(values, default=str, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    # Return the values stored in a cursor converted by the model fields they order on,
+    # None if the cursor is not valid, as when it was tampered with
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data.decode())
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        values = [field.to_python(value) for field, value in zip(fields, values)]
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+    if None in values:
+        return None
+    return values
+
+
+def get_page_size(request, default=None):
+    # Page size requested with the limit parameter, capped to MAX_PAGE_SIZE
+    if default is None:
+        default = settings.DEFAULT_PAGE_SIZE
+
+    try:
+        page_size = int(request.GET.get('limit', default))
+    except ValueError:
+        page_size = default
+
+    return max(1, min(page_size, settings.MAX_PAGE_SIZE))
+
+
+class KeysetPage:
+    """
+    One page of a queryset ordered by the given fields, which must end with a unique field.
+    Instead of an OFFSET, the page starts after the row encoded in the cursor, so that
+    every page costs one indexed range query no matter how deep it is.
+    The query runs when the page is first used.
+    """
+
+    def __init__(self, queryset, ordering, cursor=None, per_page=None):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.per_page = per_page or settings.DEFAULT_PAGE_SIZE
+        self.cursor = cursor
+        model_fields = [queryset.model._meta.get_field(field) for field in self.fields]
+        self.after = decode_cursor(cursor, model_fields) if cursor else None
+
+    def keyset_filter(self):
+        # Rows after the cursor: (a > x) or (a = x and b > y) or ..., with < for descending fields
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            name = self.fields[i]
+            lookup = '__lt' if field.startswith('-') else '__gt'
+
+            row = Q(**{name + lookup: self.after[i]})
+            for previous, value in zip(self.fields[:i], self.after[:i]):
+                row &= Q(**{previous: value})
+            condition |= row
+
+        # Redundant bound on the first field, which lets the database seek the index
+        # to the cursor instead of reading every row before it
+        lookup = '__lte' if self.ordering[0].startswith('-') else '__gte'
+        return Q(**{self.fields[0] + lookup: self.after[0]}) & condition
+
+    @cached_property
+    def _rows(self):
+        queryset = self.queryset.order_by(*self.ordering)
+        if self.after is not None:
+            queryset = queryset.filter(self.keyset_filter())
+
+        # Fetch one more row than needed to know if there is a next page
+        return list(queryset[:self.per_page + 1])
+
+    @property
+    def object_list(self):
+        return self._rows[:self.per_page]
+
+    @property
+    def has_next(self):
+        return len(self._rows) > self.per_page
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+
+        last = self.object_list[-1]
+        return encode_cursor([getattr(last, field) for field in self.fields])
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
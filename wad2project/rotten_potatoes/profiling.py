@@ -0,0 +1,133 @@
+import logging
+import random
+import threading
+from contextlib import ExitStack
+from time import perf_counter
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+# Profile of the request the current thread is handling, None when it is not sampled
+_local = threading.local()
+
+
+class QueryTimer:
+    """
+    Database execute wrapper counting queries and adding up the time they take,
+    without the overhead of keeping every query like CaptureQueriesContext.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += perf_counter() - started
+            self.count += 1
+
+
+class RequestProfile:
+    """
+    Time spent by a request in SQL, in template rendering and in the rest of the
+    Python code. Queries run while rendering count as SQL, not as template time.
+    """
+
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.template_seconds = 0.0
+        self.total_seconds = 0.0
+        self.rendering = False
+
+    @property
+    def app_seconds(self):
+        return max(0.0, self.total_seconds - self.queries.seconds - self.template_seconds)
+
+    def server_timing(self):
+        return 'db;dur={:.2f};desc="{} queries", tpl;dur={:.2f}, app;dur={:.2f}, total;dur={:.2f}'.format(
+            self.queries.seconds * 1000, self.queries.count, self.template_seconds * 1000,
+            self.app_seconds * 1000, self.total_seconds * 1000)
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total_seconds * 1000, 3),
+            "app_ms": round(self.app_seconds * 1000, 3),
+            "db_ms": round(self.queries.seconds * 1000, 3),
+            "queries": self.queries.count,
+            "template_ms": round(self.template_seconds * 1000, 3),
+        }
+
+
+def current_profile():
+    return getattr(_local, "profile", None)
+
+
+class ProfiledTemplate(Template):
+
+    def render(self, context=None, request=None):
+        profile = current_profile()
+        # Templates rendered by other templates are already counted
+        if profile is None or profile.rendering:
+            return super().render(context, request)
+
+        profile.rendering = True
+        queries_before = profile.queries.seconds
+        started = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            elapsed = perf_counter() - started
+            profile.template_seconds += elapsed - (profile.queries.seconds - queries_before)
+            profile.rendering = False
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    # DjangoTemplates backend whose templates add their render time to the request profile
+
+    def from_string(self, template_code):
+        return ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        return ProfiledTemplate(super().get_template(template_name).template, self)
+
+
+class ProfilingMiddleware:
+    """
+    Measure the SQL, template and total time of a sample of requests, set by PROFILING_SAMPLE_RATE,
+    and report them in a log line, and in a Server-Timing header with DEBUG or PROFILING_SERVER_TIMING on.
+    Requests which are not sampled are not wrapped at all.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        profile = _local.profile = RequestProfile()
+        started = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.queries))
+                response = self.get_response(request)
+        finally:
+            profile.total_seconds = perf_counter() - started
+            _local.profile = None
+
+        # Timings tell untrusted clients too much about the server
+        if settings.DEBUG or settings.PROFILING_SERVER_TIMING:
+            response["Server-Timing"] = profile.server_timing()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("method=%s path=%s status=%s total_ms=%.2f app_ms=%.2f db_ms=%.2f queries=%d template_ms=%.2f",
+                        request.method, request.path, response.status_code, profile.total_seconds * 1000,
+                        profile.app_seconds * 1000, profile.queries.seconds * 1000, profile.queries.count,
+                        profile.template_seconds * 1000, extra={"request_profile": profile.as_dict()})
+        return response
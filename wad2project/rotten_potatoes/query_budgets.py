@@ -0,0 +1,49 @@
+# Most queries each route may run for a request of the benchmark scenarios, by (url name, method),
+# including the lookups of the session and of the user with its profile by logged in requests, which
+# are only cached with a SHARED_CACHE, cold caches and the savepoints of writes inside a TestCase or
+# their BEGIN outside of one.
+# The budgets must not depend on the number of comments, ratings or movies
+QUERY_BUDGETS = {
+    ('index', 'GET'): 4,
+    ('about', 'GET'): 0,
+    ('register', 'GET'): 0,
+    ('register', 'POST'): 5,
+    ('login', 'GET'): 0,
+    ('login', 'POST'): 9,
+    ('logout', 'GET'): 4,
+    ('movie', 'GET'): 4,
+    ('movie_comments', 'GET'): 2,
+    ('edit_movie', 'GET'): 3,
+    ('edit_movie', 'POST'): 6,
+    ('add_comment', 'GET'): 3,
+    ('add_comment', 'POST'): 5,
+    ('rate_movie', 'GET'): 4,
+    ('rate_movie', 'POST'): 12,
+    ('actor', 'GET'): 2,
+    ('add_movie', 'GET'): 2,
+    ('add_movie', 'POST'): 12,
+    ('account', 'GET'): 5,
+    ('edit_account', 'GET'): 2,
+    ('edit_account', 'POST'): 4,
+    ('ratings', 'GET'): 5,
+    ('ratings', 'POST'): 4,
+    ('search', 'GET'): 2,
+    ('delete_comment', 'GET'): 5,
+    ('delete_movie', 'GET'): 11,
+}
+
+
+def check_query_budgets(results):
+    """
+    Return a message for every scenario of the benchmark results which ran more
+    queries than the budget of its route, or whose route has no budget.
+    """
+    over_budget = []
+    for name, result in sorted(results["results"].items()):
+        budget = QUERY_BUDGETS.get((result["url_name"], result["method"]))
+        if budget is None:
+            over_budget.append("{}: no query budget for {} {}".format(name, result["method"], result["url_name"]))
+        elif result["max_queries"] > budget:
+            over_budget.append("{}: {} queries, budget {}".format(name, result["max_queries"], budget))
+
+    return over_budget
@@ -0,0 +1,134 @@
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from rotten_potatoes.models import Movie, MovieNeighbor, Rating, version_bump
+
+# Ratings above the middle of the 1 to 5 scale count for a recommendation, below it against
+NEUTRAL_RATING = 3
+
+# Number of movies whose similarities are computed at once, bounds the memory used by the builder
+BLOCK_SIZE = 1000
+
+# Most ratings of a user, highest first, whose neighbors are merged into recommendations
+MAX_SEED_RATINGS = 50
+
+Recommendation = namedtuple('Recommendation', ['movie', 'because', 'score'])
+
+
+def load_rating_matrix():
+    """
+    Return the ratings as a sparse user x movie matrix of ratings centred on the mean
+    rating of each user, with the movie id of every column.
+    """
+    rows = np.array(list(Rating.objects.values_list('user_id', 'movie_id', 'rating')), dtype=np.int64)
+    if not len(rows):
+        return sparse.csr_matrix((0, 0)), np.array([], dtype=np.int64)
+
+    user_ids, users = np.unique(rows[:, 0], return_inverse=True)
+    movie_ids, movies = np.unique(rows[:, 1], return_inverse=True)
+    ratings = rows[:, 2].astype(np.float64)
+
+    # Adjusted cosine, similar movies are the ones users rate above or below their own
+    # average together, not just the ones many users have rated
+    user_means = np.bincount(users, weights=ratings) / np.bincount(users)
+    centred = ratings - user_means[users]
+
+    matrix = sparse.csr_matrix((centred, (users, movies)), shape=(len(user_ids), len(movie_ids)))
+    return matrix, movie_ids
+
+
+def compute_movie_neighbors(matrix, movie_ids, neighbors):
+    """
+    Yield (movie id, neighbor id, similarity) for the most similar movies of every movie,
+    by cosine similarity of the columns of the rating matrix. Only positive similarities are kept.
+    """
+    # Scale columns to unit length, so that the product of two columns is their cosine
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))).ravel()
+    norms[norms == 0] = 1
+    matrix = sparse.csc_matrix(matrix.multiply(1 / norms))
+    by_movie = matrix.T.tocsr()
+
+    for start in range(0, matrix.shape[1], BLOCK_SIZE):
+        similarities = (by_movie[start:start + BLOCK_SIZE] @ matrix).tocsr()
+
+        for row in range(similarities.shape[0]):
+            begin, end = similarities.indptr[row], similarities.indptr[row + 1]
+            columns, values = similarities.indices[begin:end], similarities.data[begin:end]
+
+            keep = (values > 0) & (columns != start + row)
+            columns, values = columns[keep], values[keep]
+            if len(values) > neighbors:
+                top = np.argpartition(-values, neighbors)[:neighbors]
+                columns, values = columns[top], values[top]
+
+            movie_id = int(movie_ids[start + row])
+            for neighbor_id, similarity in zip(movie_ids[columns].tolist(), values.tolist()):
+                yield movie_id, neighbor_id, similarity
+
+
+def build_movie_neighbors(neighbors=None):
+    """
+    Replace the stored neighbors of every movie with the ones computed from the current ratings.
+    Returns the number of neighbors stored.
+    """
+    neighbors = neighbors or settings.MOVIE_NEIGHBORS
+    matrix, movie_ids = load_rating_matrix()
+
+    # Computed before the transaction, whose delete holds the write lock until it commits
+    rows = [MovieNeighbor(movie_id=movie_id, neighbor_id=neighbor_id, similarity=similarity)
+            for movie_id, neighbor_id, similarity in compute_movie_neighbors(matrix, movie_ids, neighbors)]
+
+    with transaction.atomic():
+        MovieNeighbor.objects.all().delete()
+        MovieNeighbor.objects.bulk_create(rows)
+
+        # Movie pages list the new neighbors
+        Movie.objects.update(**version_bump())
+
+    return len(rows)
+
+
+def similar_movies(movie, limit=None):
+    # Most similar movies of a movie, in one query
+    neighbors = movie.neighbors.select_related('neighbor').order_by('-similarity')
+    return [neighbor.neighbor for neighbor in neighbors[:limit or settings.SIMILAR_MOVIES]]
+
+
+def recommend_movies(profile, limit=None):
+    """
+    Return Recommendations of movies the user has not rated, by merging the neighbors of the movies
+    they rated, each weighted by how far the rating is from neutral. A recommendation is
+    because of the rated movie which added the most to its score.
+    """
+    limit = limit or settings.RECOMMENDATIONS
+    seeds = dict(Rating.objects.filter(user=profile).order_by('-rating', '-id')
+                 .values_list('movie_id', 'rating')[:MAX_SEED_RATINGS])
+    if not seeds:
+        return []
+
+    scores, because = {}, {}
+    neighbors = MovieNeighbor.objects.filter(movie_id__in=seeds).values_list('movie_id', 'neighbor_id', 'similarity')
+    for movie_id, neighbor_id, similarity in neighbors:
+        weight = similarity * (seeds[movie_id] - NEUTRAL_RATING)
+        scores[neighbor_id] = scores.get(neighbor_id, 0) + weight
+        if weight > because.get(neighbor_id, (0, None))[0]:
+            because[neighbor_id] = (weight, movie_id)
+
+    # Recommend only movies with a reason, and which the user has not rated
+    candidates = [movie_id for movie_id, score in scores.items()
+                  if score > 0 and movie_id in because and movie_id not in seeds]
+    candidates.sort(key=lambda movie_id: (-scores[movie_id], movie_id))
+    candidates = candidates[:limit]
+
+    # Seeds are only the highest ratings, a user with more ratings may have rated a candidate
+    if len(seeds) == MAX_SEED_RATINGS:
+        rated = set(Rating.objects.filter(user=profile, movie_id__in=candidates).values_list('movie_id', flat=True))
+        candidates = [movie_id for movie_id in candidates if movie_id not in rated]
+
+    movies = Movie.objects.in_bulk(candidates + [because[movie_id][1] for movie_id in candidates])
+    return [Recommendation(movies[movie_id], movies[because[movie_id][1]], scores[movie_id])
+            for movie_id in candidates if movie_id in movies and because[movie_id][1] in movies]
@@ -0,0 +1,131 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+
+# Apps whose models are always read from the primary. The session and the user of a request are kept
+# in the cache, and a copy read from a replica which lacks the last login, logout or password change
+# would be cached.
+PRIMARY_APPS = {'auth', 'sessions'}
+
+# Clients which wrote recently, whose reads go to the primary until the replica has their writes
+STICKY_COOKIE = 'read_primary_until'
+
+# Database of the reads of the current request, and whether it wrote
+_local = threading.local()
+
+logger = logging.getLogger(__name__)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send the reads of the read only views to the replica, when ReplicaMiddleware allows it for the
+    request, and every write and other read to the primary. The database an object was loaded
+    from is not used, a cached object read from the replica is read from the primary afterwards.
+    """
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in PRIMARY_APPS:
+            return PRIMARY
+        return REPLICA if getattr(_local, 'read_replica', False) else PRIMARY
+
+    def db_for_write(self, model, **hints):
+        _local.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both databases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The tables of the replica are copied from the primary
+        return db != REPLICA
+
+
+@contextmanager
+def primary_reads():
+    # Read from the primary inside the block, e.g. to fill a cache shared with the requests reading from it
+    read_replica = getattr(_local, 'read_replica', False)
+    _local.read_replica = False
+    try:
+        yield
+    finally:
+        _local.read_replica = read_replica
+
+
+def replica_ready():
+    # Whether the replica has the tables of the models, SQLite opens a missing database file as an empty one
+    connection = connections[REPLICA]
+    try:
+        tables = set(connection.introspection.table_names())
+    finally:
+        connection.close()
+    return all(model._meta.db_table in tables for model in apps.get_models() if model._meta.managed)
+
+
+def is_sticky(request):
+    try:
+        return int(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """
+    With USE_REPLICA on, let the GET requests of the REPLICA_VIEWS read from the replica.
+    A client which wrote is given a cookie which sends its reads to the primary for
+    REPLICA_STICKY_SECONDS, so that it sees its own writes before the replica has them.
+    The replica is checked when the middleware is loaded, without its tables every read goes to the primary.
+    """
+
+    def __init__(self, get_response):
+        if settings.USE_REPLICA and not replica_ready():
+            logger.error("USE_REPLICA is on but the replica database has no tables, reading from the primary. "
+                         "Run the sync_replica command and restart the server.")
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _local.read_replica, _local.wrote = False, False
+        try:
+            response = self.get_response(request)
+            wrote = _local.wrote
+        finally:
+            _local.read_replica, _local.wrote = False, False
+
+        if wrote:
+            response.set_cookie(STICKY_COOKIE, int(time.time()) + settings.REPLICA_STICKY_SECONDS,
+                                max_age=settings.REPLICA_STICKY_SECONDS, httponly=True)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _local.read_replica = (settings.USE_REPLICA and request.method in ('GET', 'HEAD') and
+                               request.resolver_match.url_name in settings.REPLICA_VIEWS and
+                               not is_sticky(request))
+
+
+def copy_database(source_name, target_name):
+    """
+    Copy a SQLite database file over another with the backup API, which reads a consistent
+    snapshot of the source while it is written to, and lets the target be read until it is replaced.
+    """
+    source, target = sqlite3.connect(source_name), sqlite3.connect(target_name)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def sync_replica():
+    # Local stand-in for replication, the replica file becomes a copy of the primary one
+    copy_database(settings.DATABASES[PRIMARY]['NAME'], settings.DATABASES[REPLICA]['NAME'])
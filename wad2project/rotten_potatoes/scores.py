@@ -0,0 +1,77 @@
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from rotten_potatoes.models import Movie, bump_catalog_version
+
+# Ratings go from 1 to 5 stars
+MIN_RATING = 1
+MAX_RATING = 5
+
+# Number of score updates sent to the database at once
+WRITE_BATCH_SIZE = 1000
+
+
+def bayesian_averages(rating_sums, rating_counts, prior_mean, prior_weight):
+    # Average of the ratings of every movie with prior_weight more ratings of prior_mean,
+    # 0 for movies without ratings
+    averages = (rating_sums + prior_mean * prior_weight) / (rating_counts + prior_weight)
+    return np.where(rating_counts > 0, averages, 0.0)
+
+
+def wilson_lower_bounds(rating_sums, rating_counts, z):
+    # Lower bound of the Wilson score interval of the mean rating of every movie, with the
+    # ratings scaled to a fraction between 0 and 1 and the bound scaled back to stars.
+    # 0 for movies without ratings.
+    counts = np.maximum(rating_counts, 1)
+    fraction = (rating_sums / counts - MIN_RATING) / (MAX_RATING - MIN_RATING)
+    fraction = np.clip(fraction, 0.0, 1.0)
+
+    z2 = z * z
+    centre = fraction + z2 / (2 * counts)
+    spread = z * np.sqrt(fraction * (1 - fraction) / counts + z2 / (4 * counts * counts))
+    bounds = (centre - spread) / (1 + z2 / counts)
+
+    return np.where(rating_counts > 0, MIN_RATING + bounds * (MAX_RATING - MIN_RATING), 0.0)
+
+
+def compute_movie_scores():
+    """
+    Recompute the score and score lower bound of every movie from its stored rating aggregates,
+    all movies at once with NumPy, and write back the ones which changed.
+    Returns the number of movies updated.
+    """
+    rows = list(Movie.objects.values_list('id', 'rating_sum', 'num_of_ratings', 'score', 'score_lower_bound', 'genre'))
+    if not rows:
+        return 0
+
+    data = np.array([row[:5] for row in rows], dtype=np.float64)
+    ids = data[:, 0].astype(np.int64)
+    rating_sums, rating_counts = data[:, 1], data[:, 2]
+
+    total_ratings = rating_counts.sum()
+    prior_mean = float(rating_sums.sum() / total_ratings) if total_ratings else 0.0
+
+    scores = bayesian_averages(rating_sums, rating_counts, prior_mean, settings.SCORE_PRIOR_RATINGS)
+    lower_bounds = wilson_lower_bounds(rating_sums, rating_counts, settings.SCORE_CONFIDENCE_Z)
+
+    # Only write the movies whose scores changed
+    changed = ~(np.isclose(scores, data[:, 3], rtol=0, atol=1e-9) &
+                np.isclose(lower_bounds, data[:, 4], rtol=0, atol=1e-9))
+    # With the aggregates they were computed from, as integers again
+    updates = list(zip(scores[changed].tolist(), lower_bounds[changed].tolist(), ids[changed].tolist(),
+                       rating_sums[changed].astype(np.int64).tolist(), rating_counts[changed].astype(np.int64).tolist()))
+
+    # A movie rated since its aggregates were read keeps the score the rating gave it, the next run corrects it
+    table = connection.ops.quote_name(Movie._meta.db_table)
+    sql = ("UPDATE {} SET score = %s, score_lower_bound = %s "
+           "WHERE id = %s AND rating_sum = %s AND num_of_ratings = %s".format(table))
+    updated = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(updates), WRITE_BATCH_SIZE):
+            cursor.executemany(sql, updates[start:start + WRITE_BATCH_SIZE])
+            updated += cursor.rowcount
+        # The listing pages and leaderboards ranking them change, the movie pages do not show the scores
+        if updated:
+            bump_catalog_version({row[5] for row, movie_changed in zip(rows, changed) if movie_changed})
+    return updated
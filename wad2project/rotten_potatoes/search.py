@@ -0,0 +1,107 @@
+import re
+
+from django.db import connection, connections, router
+from django.db.models import Q
+
+from rotten_potatoes.models import Movie
+
+
+SEARCH_TABLE = "rotten_potatoes_movie_fts"
+MOVIE_TABLE = "rotten_potatoes_movie"
+
+# Column weights for ranking, a match in the name counts more than one in the description
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+
+# External content FTS5 table over the movie table, triggers keep it in sync with every write
+SEARCH_TABLE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS {search} USING fts5(
+    name, actors, description,
+    content='{movie}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+)
+""".format(search=SEARCH_TABLE, movie=MOVIE_TABLE)
+
+SEARCH_TRIGGERS_SQL = {
+    SEARCH_TABLE + "_insert": """
+CREATE TRIGGER IF NOT EXISTS {search}_insert AFTER INSERT ON {movie} BEGIN
+    INSERT INTO {search}(rowid, name, actors, description)
+    VALUES (new.id, new.name, new.actors, new.description);
+END
+""",
+    SEARCH_TABLE + "_delete": """
+CREATE TRIGGER IF NOT EXISTS {search}_delete AFTER DELETE ON {movie} BEGIN
+    INSERT INTO {search}({search}, rowid, name, actors, description)
+    VALUES ('delete', old.id, old.name, old.actors, old.description);
+END
+""",
+    SEARCH_TABLE + "_update": """
+CREATE TRIGGER IF NOT EXISTS {search}_update AFTER UPDATE OF name, actors, description ON {movie} BEGIN
+    INSERT INTO {search}({search}, rowid, name, actors, description)
+    VALUES ('delete', old.id, old.name, old.actors, old.description);
+    INSERT INTO {search}(rowid, name, actors, description)
+    VALUES (new.id, new.name, new.actors, new.description);
+END
+""",
+}
+
+
+def search_index_available(using=connection):
+    return using.vendor == "sqlite"
+
+
+def install_search_index(using=connection):
+    # Create the search table and its triggers if they are missing, and rebuild the
+    # index when any trigger was missing, as writes made without it were not indexed.
+    # SQLite drops the triggers whenever a migration remakes the movie table,
+    # so this runs after every migrate.
+    if not search_index_available(using):
+        return False
+
+    with using.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [MOVIE_TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SEARCH_TRIGGERS_SQL if name not in existing]
+        if not missing:
+            return False
+
+        cursor.execute(SEARCH_TABLE_SQL)
+        for name in missing:
+            cursor.execute(SEARCH_TRIGGERS_SQL[name].format(search=SEARCH_TABLE, movie=MOVIE_TABLE))
+        cursor.execute("INSERT INTO {search}({search}) VALUES ('rebuild')".format(search=SEARCH_TABLE))
+
+    return True
+
+
+def build_match_query(text):
+    # Turn user input into a FTS5 query: every word must match, as a prefix of an indexed word.
+    # Words are quoted, so FTS5 operators and punctuation in the input have no effect.
+    words = re.findall(r"\w+", text)
+    return " ".join('"{}"*'.format(word) for word in words)
+
+
+def search_movies(text, limit, offset=0):
+    """
+    Return a list of up to limit movies matching the text, best match first, skipping the first
+    offset matches, and whether there are more matches after them.
+    """
+    match = build_match_query(text)
+    if not match:
+        return [], False
+
+    # The database the movies are read from, the replica when the request reads from it
+    using = connections[router.db_for_read(Movie)]
+    if not search_index_available(using):
+        # Fall back to a plain scan on other databases
+        movies = Movie.objects.filter(Q(name__icontains=text) | Q(actors__icontains=text)).order_by("name")
+        movies = list(movies[offset:offset + limit + 1])
+        return movies[:limit], len(movies) > limit
+
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT rowid FROM {search} WHERE {search} MATCH %s "
+            "ORDER BY bm25({search}, %s, %s, %s) LIMIT %s OFFSET %s".format(search=SEARCH_TABLE),
+            [match, *SEARCH_WEIGHTS, limit + 1, offset])
+        ids = [row[0] for row in cursor.fetchall()]
+
+    # Load the page of movies in one query and put them back in rank order
+    movies = Movie.objects.in_bulk(ids[:limit])
+    return [movies[pk] for pk in ids[:limit] if pk in movies], len(ids) > limit
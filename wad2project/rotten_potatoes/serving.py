@@ -0,0 +1,193 @@
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Names of files collected by ManifestStaticFilesStorage, with a hash of their content
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+
+# Precompressed versions of static files, in order of preference
+PRECOMPRESSED = [('br', '.br'), ('gzip', '.gz')]
+
+# A single byte range, the start or the end may be left out, e.g. bytes=0-499 or bytes=-500
+BYTE_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Bytes read at once when streaming part of a file
+BLOCK_SIZE = 64 * 1024
+
+
+def safe_path(root, path):
+    # Absolute path of a file below root, None when the path points outside of it
+    path = posixpath.normpath(path.replace('\\', '/')).lstrip('/')
+    if not path or path == '.' or path.startswith('../') or path == '..':
+        return None
+    return os.path.join(root, *path.split('/'))
+
+
+def accepted_encodings(request):
+    # Content codings of the Accept-Encoding header, without the refused ones (q=0)
+    encodings = set()
+    for value in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, *parameters = [part.strip() for part in value.split(';')]
+        refused = any(re.fullmatch(r'q=0(\.0*)?', parameter) for parameter in parameters)
+        if coding and not refused:
+            encodings.add(coding.lower())
+    return encodings
+
+
+def precompressed_version(request, full_path):
+    # Path and coding of the best precompressed version of a file the client accepts
+    accepted = accepted_encodings(request)
+    for coding, extension in PRECOMPRESSED:
+        if (coding in accepted or '*' in accepted) and os.path.isfile(full_path + extension):
+            return full_path + extension, coding
+    return full_path, None
+
+
+def file_etag(stat, coding=None):
+    # Strong ETag changing with the modification time and size of the file, and with its coding
+    return '"{:x}-{:x}{}"'.format(stat.st_mtime_ns, stat.st_size, "-" + coding if coding else "")
+
+
+def requested_range(request, size, etag, last_modified):
+    """
+    Return the (first, last) byte positions of the Range header of a request, False when the
+    range is outside of the file, or None to send the whole file: without a Range header,
+    when If-Range does not match the file, and for multiple or invalid ranges.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        return None
+
+    match = BYTE_RANGE.match(header.strip())
+    if match is None or match.groups() == ('', ''):
+        return None
+
+    first, last = match.groups()
+    if first == '':
+        # The last bytes of the file
+        length = int(last)
+        return (max(0, size - length), size - 1) if length and size else False
+
+    first, last = int(first), min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        return False
+    return (first, last) if first <= last else None
+
+
+def read_range(path, first, length):
+    with open(path, 'rb') as f:
+        f.seek(first)
+        while length > 0:
+            block = f.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def file_response(request, path, content_type, cache_control, coding=None, vary=()):
+    """
+    Respond with a file, or with Not Modified when the If-None-Match or If-Modified-Since
+    headers of the request match it, or with the requested byte range of it. Whole files go
+    through the file wrapper of the WSGI server, which sends them with sendfile where it can.
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat, coding)
+    last_modified = int(stat.st_mtime)
+
+    # Headers of the file, which Not Modified responses also carry
+    validators = HttpResponse()
+    validators['ETag'] = etag
+    validators['Last-Modified'] = http_date(last_modified)
+    validators['Cache-Control'] = cache_control
+    if vary:
+        patch_vary_headers(validators, vary)
+
+    conditional = get_conditional_response(request, etag, last_modified, validators)
+    if conditional is not validators:
+        return conditional
+
+    byte_range = requested_range(request, stat.st_size, etag, last_modified)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{}'.format(stat.st_size)
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(read_range(path, first, last - first + 1), status=206,
+                                         content_type=content_type)
+        response['Content-Range'] = 'bytes {}-{}/{}'.format(first, last, stat.st_size)
+        response['Content-Length'] = last - first + 1
+
+    for header in ('ETag', 'Last-Modified', 'Cache-Control', 'Vary'):
+        if validators.has_header(header):
+            response[header] = validators[header]
+    response['Accept-Ranges'] = 'bytes'
+    if coding is not None:
+        response['Content-Encoding'] = coding
+    return response
+
+
+def content_type_of(path):
+    return mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+@require_safe
+def serve_static(request, path):
+    """
+    Serve a file collected into STATIC_ROOT by collectstatic, precompressed when the client accepts
+    it. Files with a hash in their name never change and are cached for STATIC_CACHE_MAX_AGE,
+    the others have to be revalidated.
+    """
+    full_path = safe_path(settings.STATIC_ROOT, path) if settings.STATIC_ROOT else None
+    if full_path is None or not os.path.isfile(full_path):
+        raise Http404("Static file not found")
+
+    if HASHED_NAME.search(path):
+        cache_control = 'public, max-age={}, immutable'.format(settings.STATIC_CACHE_MAX_AGE)
+    else:
+        cache_control = 'public, no-cache'
+
+    # Whether a precompressed version is served or not, the response depends on Accept-Encoding
+    served_path, coding = precompressed_version(request, full_path)
+    return file_response(request, served_path, content_type_of(full_path), cache_control, coding,
+                         vary=['Accept-Encoding'])
+
+
+@require_safe
+def serve_media(request, path):
+    """
+    Serve an uploaded file from MEDIA_ROOT, cached for MEDIA_CACHE_MAX_AGE and then revalidated
+    with its ETag. With MEDIA_ACCEL_REDIRECT set, only the headers are sent and nginx sends the file.
+    """
+    full_path = safe_path(settings.MEDIA_ROOT, path)
+    if full_path is None:
+        raise Http404("Media file not found")
+
+    cache_control = 'public, max-age={}'.format(settings.MEDIA_CACHE_MAX_AGE)
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx handles ranges and conditional requests of the internal location itself
+        relative_path = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response = HttpResponse(content_type=content_type_of(full_path))
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + quote(relative_path)
+        response['Cache-Control'] = cache_control
+        return response
+
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+    return file_response(request, full_path, content_type_of(full_path), cache_control)
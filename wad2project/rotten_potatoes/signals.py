@@ -0,0 +1,92 @@
+import threading
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from rotten_potatoes.auth import invalidate_cached_user
+from rotten_potatoes.models import Comment, Movie, Rating, UserProfile, adjust_rating_aggregates, \
+    bump_catalog_version, rebuild_rating_aggregates, touch_movie
+
+# Ids of the movies the current thread is deleting, whose ratings are deleted first by the cascade
+_deleting = threading.local()
+
+
+def deleting_movies():
+    if not hasattr(_deleting, 'movie_ids'):
+        _deleting.movie_ids = set()
+    return _deleting.movie_ids
+
+
+@receiver(post_save, sender=Rating)
+def rating_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, '_loaded_values', None)
+
+    if created:
+        adjust_rating_aggregates(instance.movie_id, instance.rating, 1)
+    elif previous is None:
+        # Unknown previous state, recount the movie from its ratings
+        rebuild_rating_aggregates(Movie.objects.filter(pk=instance.movie_id))
+    elif previous['movie_id'] != instance.movie_id:
+        # Rating moved to another movie, take it off the old one first
+        adjust_rating_aggregates(previous['movie_id'], -previous['rating'], -1)
+        adjust_rating_aggregates(instance.movie_id, instance.rating, 1)
+    elif previous['rating'] != instance.rating:
+        adjust_rating_aggregates(instance.movie_id, instance.rating - previous['rating'], 0)
+
+    instance._loaded_values = {'movie_id': instance.movie_id, 'rating': instance.rating}
+
+
+@receiver(post_save, sender=Movie)
+def movie_saved(sender, instance, created, raw=False, **kwargs):
+    # Listing pages show the movie, in the leaderboard of its genre and of the genre it left
+    previous_genre = getattr(instance, '_loaded_genre', None)
+    bump_catalog_version({instance.genre, previous_genre} - {None})
+    instance._loaded_genre = instance.genre
+    if raw:
+        return
+
+    # Parse the actors into the cast when they were changed
+    if created or getattr(instance, '_loaded_actors', None) != instance.actors:
+        instance.update_cast()
+
+
+@receiver(pre_delete, sender=Movie)
+def movie_deleting(sender, instance, **kwargs):
+    deleting_movies().add(instance.pk)
+
+
+@receiver(post_delete, sender=Movie)
+def movie_deleted(sender, instance, **kwargs):
+    deleting_movies().discard(instance.pk)
+    bump_catalog_version([instance.genre])
+
+
+@receiver(post_delete, sender=Rating)
+def rating_deleted(sender, instance, **kwargs):
+    previous = getattr(instance, '_loaded_values', None) or {'movie_id': instance.movie_id,
+                                                            'rating': instance.rating}
+    # The aggregates of a movie being deleted are deleted with it
+    if previous['movie_id'] not in deleting_movies():
+        adjust_rating_aggregates(previous['movie_id'], -previous['rating'], -1)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, raw=False, **kwargs):
+    # The movie page lists the comments of the movie, see Comment.delete for deleted ones.
+    # Listing pages do not show comments, the catalog version is left alone.
+    if not raw:
+        touch_movie(instance.movie_id, 'comments_version')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def user_changed(sender, instance, **kwargs):
+    # Users are cached with their profile by the authentication backend, also when they are created,
+    # as the id of a user can be reused after a rollback
+    invalidate_cached_user(instance.pk if sender is User else instance.user_id)
@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    # Only gzip versions are written without the brotli package
+    brotli = None
+
+# Static files worth compressing, images and fonts are compressed already
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.svg', '.txt', '.json', '.html', '.xml'}
+
+
+def compressors():
+    # Extension and function of every precompressed version written
+    yield '.gz', lambda content: gzip.compress(content, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda content: brotli.compress(content, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Static files storage for collectstatic which stores files under names containing a hash of
+    their content, e.g. css/style.1d2a3b4c5d6e.css, so that they can be cached forever, and
+    writes .gz and .br versions of them next to them for the static view to serve.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        collected = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            yield name, hashed_name, processed
+            if hashed_name and not isinstance(processed, Exception):
+                collected.update((name, hashed_name))
+
+        if not dry_run:
+            for name in sorted(collected):
+                self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS:
+            return
+
+        with self.open(name) as f:
+            content = f.read()
+
+        for extension, compress in compressors():
+            compressed = compress(content)
+            # Small files may not get any smaller
+            if len(compressed) < len(content):
+                if self.exists(name + extension):
+                    self.delete(name + extension)
+                self._save(name + extension, ContentFile(compressed))
+
+    @property
+    def manifest_strict(self):
+        # Files missing from the manifest, e.g. before collectstatic, are an error with DEBUG off, rather
+        # than referred to by unhashed names which the static view would let browsers cache for a year
+        return not settings.DEBUG
@@ -0,0 +1,17 @@
+from django import template
+
+from rotten_potatoes.thumbnails import thumbnail_urls
+
+register = template.Library()
+
+
+@register.inclusion_tag('rotten_potatoes/picture.html')
+def picture(image, thumbnails, alt="", css_class="", sizes="100vw"):
+    """
+    Render an image with the srcset of its thumbnails, preferring WebP where the browser supports it,
+    e.g. {% picture movie.cover movie.cover_thumbnails "Movie cover" "img-fluid" "33vw" %}.
+    Only the original image is used until the thumbnails are generated.
+    """
+    srcset, webp_srcset = thumbnail_urls(image, thumbnails)
+    return {"src": image.url if image else "", "srcset": srcset, "webp_srcset": webp_srcset,
+            "alt": alt, "css_class": css_class, "sizes": sizes}
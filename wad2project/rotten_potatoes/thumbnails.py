@@ -0,0 +1,180 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from rotten_potatoes.auth import invalidate_cached_user
+from rotten_potatoes.models import Movie, UserProfile, bump_catalog_version, version_bump
+
+# Thumbnails of PNG images stay PNG to keep their transparency, the others are JPEG
+PNG_EXTENSION = '.png'
+
+# Images with thumbnails, by model
+THUMBNAIL_IMAGES = [(Movie, 'cover'), (UserProfile, 'profile_pic')]
+
+# EXIF orientations of photos taken sideways, whose width and height are swapped when displayed
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def thumbnails_field(field_name):
+    return field_name + '_thumbnails'
+
+
+def thumbnail_name(name, width, extension=None):
+    # Thumbnails are stored next to the original, e.g. movie_images/cover.320w.jpg
+    root, original_extension = os.path.splitext(name)
+    return "{}.{}w{}".format(root, width, extension or original_extension)
+
+
+def thumbnail_widths(image_width):
+    # Configured widths below the width of the image, and the image width itself
+    # when it is narrower than the largest one, so that thumbnails never upscale
+    widths = [width for width in settings.THUMBNAIL_WIDTHS if width < image_width]
+    if image_width < max(settings.THUMBNAIL_WIDTHS):
+        widths.append(image_width)
+    return widths
+
+
+def thumbnail_format(name):
+    # Format and extension of the thumbnails of an image, besides WebP
+    if os.path.splitext(name)[1].lower() == PNG_EXTENSION:
+        return 'PNG', PNG_EXTENSION
+    return 'JPEG', '.jpg'
+
+
+def parse_widths(value):
+    return [int(width) for width in value.split(",")] if value else []
+
+
+def save_image(storage, name, image, image_format, overwrite):
+    if storage.exists(name):
+        if not overwrite:
+            return
+        storage.delete(name)
+
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=settings.THUMBNAIL_QUALITY)
+    storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def generate_thumbnails(field_file, overwrite=False):
+    """
+    Write the thumbnails of an image in every width, in its own format and as WebP, and return
+    the widths as stored in its thumbnails field. Existing thumbnails are kept unless overwrite is set.
+    """
+    if not field_file:
+        return ""
+
+    storage = field_file.storage
+    image_format, extension = thumbnail_format(field_file.name)
+    with storage.open(field_file.name) as f:
+        # Only the header is read until the image is loaded
+        image = Image.open(f)
+        rotated = image.getexif().get(EXIF_ORIENTATION) in ROTATED_ORIENTATIONS
+        widths = thumbnail_widths(image.height if rotated else image.width)
+        names = [(thumbnail_name(field_file.name, width, extension), thumbnail_name(field_file.name, width, '.webp'))
+                 for width in widths]
+        if not overwrite and all(storage.exists(name) for pair in names for name in pair):
+            return ",".join(str(width) for width in widths)
+
+        # Apply the orientation of photos, which thumbnails would otherwise lose with the EXIF data
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode == 'LA' else 'RGB')
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        image = image.convert('RGB')
+
+    for width, (name, webp_name) in zip(widths, names):
+        thumbnail = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        save_image(storage, name, thumbnail, image_format, overwrite)
+        save_image(storage, webp_name, thumbnail, 'WEBP', overwrite)
+
+    return ",".join(str(width) for width in widths)
+
+
+def set_image(instance, field_name, file):
+    # Replace an image of a model, its thumbnails are generated with update_thumbnails once it is saved
+    setattr(instance, field_name, file)
+    setattr(instance, thumbnails_field(field_name), "")
+
+
+def update_thumbnails(instance, field_name, overwrite=False):
+    """
+    Generate the thumbnails of an image of a saved model and store their widths,
+    without saving the rest of the model or sending its signals.
+    """
+    field_file = getattr(instance, field_name)
+    widths = generate_thumbnails(field_file, overwrite)
+    setattr(instance, thumbnails_field(field_name), widths)
+    fields = {thumbnails_field(field_name): widths}
+    if isinstance(instance, Movie):
+        # The movie page now offers the thumbnails
+        fields.update(version_bump('details_version'))
+    # Unless the image was replaced in the meantime
+    with transaction.atomic():
+        updated = type(instance).objects.filter(pk=instance.pk, **{field_name: field_file.name}).update(**fields)
+        if updated and isinstance(instance, Movie):
+            # The home page shows covers too
+            bump_catalog_version()
+    if updated and isinstance(instance, UserProfile):
+        invalidate_cached_user(instance.user_id)
+    return widths
+
+
+def thumbnail_urls(field_file, widths):
+    """
+    Return the srcset values of the thumbnails of an image, in its own format and as WebP,
+    both empty when the thumbnails have not been generated.
+    """
+    widths = parse_widths(widths)
+    if not field_file or not widths:
+        return "", ""
+
+    storage = field_file.storage
+    extension = thumbnail_format(field_file.name)[1]
+    srcset = ", ".join("{} {}w".format(storage.url(thumbnail_name(field_file.name, width, extension)), width)
+                       for width in widths)
+    webp_srcset = ", ".join("{} {}w".format(storage.url(thumbnail_name(field_file.name, width, '.webp')), width)
+                            for width in widths)
+    return srcset, webp_srcset
+
+
+def backfill_thumbnails(overwrite=False, log=None):
+    """
+    Generate the thumbnails of every image which has none, or of every image with overwrite,
+    once per file since many rows share the default images. Returns the number of files
+    processed and of files which could not be read.
+    """
+    log = log or (lambda message: None)
+    processed, failed = 0, 0
+
+    for model, field_name in THUMBNAIL_IMAGES:
+        field = model._meta.get_field(field_name)
+        rows = model.objects.exclude(**{field_name: ""})
+        if not overwrite:
+            rows = rows.filter(**{thumbnails_field(field_name): ""})
+
+        for name in rows.order_by().values_list(field_name, flat=True).distinct():
+            try:
+                widths = generate_thumbnails(field.attr_class(None, field, name), overwrite)
+            except OSError as error:
+                log("Skipped {}: {}".format(name, error))
+                failed += 1
+                continue
+
+            fields = {thumbnails_field(field_name): widths}
+            if model is Movie:
+                fields.update(version_bump('details_version'))
+            with transaction.atomic():
+                model.objects.filter(**{field_name: name}).update(**fields)
+                if model is Movie:
+                    bump_catalog_version()
+            processed += 1
+
+    return processed, failed
@@ -11,13 +11,16 @@ urlpatterns = [
     path('login/', views.user_login, name='login'),
     path('logout/', views.user_logout, name='logout'),
     path('movie/<slug:movie_name_slug>/', views.movie, name='movie'),
+    path('movie/<slug:movie_name_slug>/comments/', views.movie_comments, name='movie_comments'),
     path('movie/<slug:movie_name_slug>/edit/', views.edit_movie, name='edit_movie'),
     path('movie/<slug:movie_name_slug>/addcomment/', views.add_comment, name='add_comment'),
     path('movie/<slug:movie_name_slug>/ratemovie/', views.rate_movie, name='rate_movie'),
+    path('actor/<slug:actor_slug>/', views.actor, name='actor'),
     path('addmovie/', views.add_movie, name='add_movie'),
     path('account/', views.account, name='account'),
     path('account/edit/', views.edit_account, name='edit_account'),
     path('ratings/', views.ratings, name='ratings'),
+    path('search/', views.search, name='search'),
     path('movie/<slug:movie_name_slug>/deletecomment/<int:comment_pk>/', views.delete_comment, name='delete_comment'),
     path('movie/<slug:movie_name_slug>/delete/', views.delete_movie, name='delete_movie'),
     ]
@@ -1,44 +1,54 @@
 from django.contrib import messages
-from django.db.models import Count, Avg
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404
 from django.shortcuts import render, redirect
 from rotten_potatoes.forms import *
+from rotten_potatoes.cache import get_home_page_sections
+from rotten_potatoes.leaderboards import LEADERBOARD_GENRES, LeaderboardPage
+from rotten_potatoes.pagination import KeysetPage, get_page_size
+from rotten_potatoes.decorators import conditional_page, get_profile, movie_view
+from rotten_potatoes.recommendations import recommend_movies, similar_movies
+from rotten_potatoes.search import search_movies
+from rotten_potatoes.jobs import enqueue_thumbnails
+from rotten_potatoes.thumbnails import set_image
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 from django.contrib.auth import authenticate, login, logout
 from datetime import datetime, timedelta
-from django.utils.timezone import now
+from urllib.parse import urlencode
+from django.utils.timezone import now, utc
 
 
-def index(request):
-    # Query the top 5 movies
-    top_movies = Movie.objects.annotate(avg_rating=Avg('rating__rating')).order_by('-avg_rating')[:5]
+def catalog_version(request, *args):
+    # Listing pages change with any movie or rating, a catalog never written to last changed at the epoch.
+    # Read once per request with the version of the genre asked for, the cached sections and leaderboards
+    # of the page are tagged with them
+    if not hasattr(request, "_catalog_version"):
+        genre = request.GET.get("genre", request.POST.get("genre"))
+        genres = [genre] if genre in LEADERBOARD_GENRES else []
+        version, modified, request._genre_versions = get_catalog_version(genres)
+        request._catalog_version = version, modified or datetime.fromtimestamp(0, utc)
+    return request._catalog_version
 
-    # Get movies which were uploaded in past 14 days
-    recently_added = Movie.objects.filter(upload_date__gte=datetime.now() - timedelta(days=14))
 
-    # Change this weeks favorite to this years favorite #
-    current_year = datetime.now().date().strftime("%Y")  # Get current year
-    try:
-        this_years_favorite = Movie.objects.annotate(avg_rating=Avg('rating__rating'))
-        this_years_favorite = this_years_favorite.filter(release_date__range=
-                                                         [current_year + '-01-01',
-                                                          current_year + '-12-31']).order_by('-avg_rating')[0]
-    except:
-        this_years_favorite = None
+def genre_version(request, genre):
+    catalog_version(request)
+    return request._genre_versions.get(genre)
 
-    context_dictionary = {
-        "top_movies": top_movies,
-        "recently_added": recently_added,
-        "this_years_favorite": this_years_favorite,
-    }
 
-    # Check if user is producer or not
-    try:
-        profile = UserProfile.objects.get(user=request.user)
-        context_dictionary['is_producer'] = profile.producer
-    except:
-        context_dictionary['is_producer'] = False
+def movie_version(request, movie_obj, profile):
+    return movie_obj.version, movie_obj.modified_at
+
+
+@conditional_page(catalog_version, daily=True)
+def index(request):
+    # Top movies, recently added movies and this year's favorite are cached between writes
+    context_dictionary = dict(get_home_page_sections(catalog_version(request)[0]))
+
+    # Check if user is producer or not, anonymous users have no profile to look up
+    profile = get_profile(request)
+    context_dictionary['is_producer'] = profile is not None and profile.producer
 
     return render(request, "rotten_potatoes/index.html", context_dictionary)
 
@@ -67,9 +77,12 @@ def register(request):
                 profile.producer = False
 
             if 'profile_pic' in request.FILES:
-                profile.profile_pic = request.FILES['profile_pic']
+                set_image(profile, 'profile_pic', request.FILES['profile_pic'])
 
             profile.save()
+            # Thumbnails of the default picture too, they are only written the first time
+            if not profile.profile_pic_thumbnails:
+                enqueue_thumbnails(profile, 'profile_pic')
             registered = True
 
         else:
@@ -134,37 +147,49 @@ def user_logout(request):
     return redirect(reverse('rotten_potatoes:index'))
 
 
-def movie(request, movie_name_slug):
-    # Get movie from the database, if not present return HttpResponse
-    if not check_movie_exists(movie_name_slug):
-        messages.error(request, "Sorry, movie you tried to access does not exists")
-        return redirect("/rotten_potatoes/")
+@movie_view(load_profile=False)
+@conditional_page(movie_version)
+def movie(request, movie_obj, profile):
+    context_dictionary = get_movie_context(movie_obj)
 
-    context_dictionary = get_movie_context(movie_name_slug)
+    # Details, rating and comments are cached as fragments shared by all users, each under its own version,
+    # which saves of the movie, its ratings and its comments bump in the database. Fragments rendered
+    # from a replica which lags behind are cached under the older version it has.
+    context_dictionary["fragment_cache_ttl"] = settings.MOVIE_FRAGMENT_CACHE_TTL
 
-    try:
-        context_dictionary["comments"] = Comment.objects.filter(movie=Movie.objects.get(slug=movie_name_slug))
-    except:
-        context_dictionary["comments"] = None
+    # First page of comments, newest first, only queried when the comments fragment is rendered
+    comments = get_comments_page(movie_obj)
+    context_dictionary["comments"] = comments
+    context_dictionary["next_comments_url"] = lambda: get_next_comments_url(movie_obj, comments)
+
+    # Movies rated like this one
+    context_dictionary["similar_movies"] = similar_movies(movie_obj)
 
     # Render movie page with context dict. information passed
     return render(request, "rotten_potatoes/movie.html", context_dictionary)
 
 
+def movie_comments(request, movie_name_slug):
+    # Next page of comments as a HTML fragment, appended to the movie page by main.js
+    try:
+        movie_obj = Movie.objects.get(slug=movie_name_slug)
+    except Movie.DoesNotExist:
+        raise Http404("Movie does not exist")
+
+    comments = get_comments_page(movie_obj, request.GET.get("cursor"))
+    response = render(request, "rotten_potatoes/comments.html", {"movie": movie_obj, "comments": comments})
+    response["X-Next-Page"] = get_next_comments_url(movie_obj, comments) or ""
+    return response
+
+
 @login_required
-def edit_movie(request, movie_name_slug):
+@movie_view
+def edit_movie(request, movie_obj, profile):
     form = EditMovieForm()
     initial_dict = {}
 
-    # Get movie from the database, if not present return HttpResponse
-    if not check_movie_exists(movie_name_slug):
-        messages.error(request, "Sorry, movie you tried to access does not exists")
-        return redirect("/rotten_potatoes/")
-
-    movie_obj = Movie.objects.get(slug=movie_name_slug)
-
     # Check if user is not the movie producer and admin
-    if UserProfile.objects.get(user=request.user) != movie_obj.producer and not request.user.is_superuser:
+    if not is_movie_producer(profile, movie_obj) and not request.user.is_superuser:
         messages.error(request, "You are not allowed to edit this movie")
         return redirect("/rotten_potatoes/")
 
@@ -181,9 +206,9 @@ def edit_movie(request, movie_name_slug):
         # Get from with initial values set to pre-existing movie data
         form = EditMovieForm(initial=initial_dict)
         # Get context dict. with movie and form info
-        context_dict = get_movie_context(movie_name_slug)
+        context_dict = get_movie_context(movie_obj)
         context_dict["form"] = form
-        context_dict["movie"] = movie_name_slug
+        context_dict["movie"] = movie_obj.slug
         return render(request, "rotten_potatoes/edit.html", context_dict)
 
     if request.method == "POST":
@@ -195,16 +220,20 @@ def edit_movie(request, movie_name_slug):
                 movie_edit = form.save(commit=False)
 
                 if "cover" in request.FILES:
-                    movie_edit.cover = request.FILES["cover"]
-                else:
-                    movie_edit.profile_pic = "movie_images/default.jpg"
+                    set_image(movie_edit, "cover", request.FILES["cover"])
+                elif movie_edit.cover.name != DEFAULT_COVER:
+                    set_image(movie_edit, "cover", DEFAULT_COVER)
 
                 movie_edit.save()
+                # The thumbnails of a new cover are generated by the worker, those of the
+                # default cover are shared and only written the first time
+                if not movie_edit.cover_thumbnails:
+                    enqueue_thumbnails(movie_edit, "cover")
 
-                return redirect(reverse("rotten_potatoes:movie", kwargs={"movie_name_slug": movie_name_slug}))
+                return redirect(reverse("rotten_potatoes:movie", kwargs={"movie_name_slug": movie_edit.slug}))
             except:
                 messages.error(request, "Movie with this name already exists. Try movie name + release year.")
-                return redirect(reverse("rotten_potatoes:edit_movie", kwargs={"movie_name_slug": movie_name_slug}))
+                return redirect(reverse("rotten_potatoes:edit_movie", kwargs={"movie_name_slug": movie_obj.slug}))
 
         else:
             print(form.errors)
@@ -212,12 +241,8 @@ def edit_movie(request, movie_name_slug):
 
 
 @login_required
-def add_comment(request, movie_name_slug):
-    # Check if movie exists
-    if not check_movie_exists(movie_name_slug):
-        messages.error(request, "Sorry, movie you tried to access does not exists")
-        return redirect("/rotten_potatoes/")
-
+@movie_view
+def add_comment(request, movie_obj, profile):
     form = AddCommentForm()
 
     if request.method == "POST":
@@ -225,32 +250,30 @@ def add_comment(request, movie_name_slug):
 
         if form.is_valid():
             comment = form.save(commit=False)
-            comment.user = UserProfile.objects.get(user=request.user)
-            comment.movie = Movie.objects.get(slug=movie_name_slug)
+            comment.user = profile
+            comment.movie = movie_obj
             comment.time_posted = now()
             comment.save()
 
-            return redirect(reverse('rotten_potatoes:movie', kwargs={"movie_name_slug": movie_name_slug}))
+            return redirect(reverse('rotten_potatoes:movie', kwargs={"movie_name_slug": movie_obj.slug}))
         else:
             print(form.errors)
 
     return render(request, "rotten_potatoes/addcomment.html", context={"form": form,
-                                                                       "movie": Movie.objects.get(
-                                                                           slug=movie_name_slug)})
+                                                                       "movie": movie_obj})
 
 
 @login_required
 def delete_comment(request, movie_name_slug, comment_pk):
     try:
-        Comment.objects.get(pk=comment_pk)
+        comment = Comment.objects.get(pk=comment_pk)
     except:
         messages.error(request, "Sorry, comment you tried to access does not exists")
         return redirect("/rotten_potatoes/")
 
     # Check if user is associated with the comment
-    user = UserProfile.objects.get(user=request.user)
-    comment = Comment.objects.get(pk=comment_pk)
-    if user != comment.user:
+    user = get_profile(request)
+    if user is None or user.pk != comment.user_id:
         messages.error(request, "You can not delete this comment")
         return redirect(reverse("rotten_potatoes:movie", kwargs={"movie_name_slug": movie_name_slug}))
 
@@ -260,45 +283,40 @@ def delete_comment(request, movie_name_slug, comment_pk):
 
 
 @login_required
-def rate_movie(request, movie_name_slug):
-    # Check if movie exists
-    if not check_movie_exists(movie_name_slug):
-        messages.error(request, "Sorry, movie you tried to access does not exists")
-        return redirect("/rotten_potatoes/")
-
-    try:
-        # Get all movie ratings
-        rating = Rating.objects.filter(movie=Movie.objects.get(slug=movie_name_slug))
-        # Check if any of the ratings are associated with the user
-        user_ratings = rating.filter(user=UserProfile.objects.get(user=request.user))
-
-        if user_ratings:  # If any rating associated with the user, don't allow them post more ratings
-            messages.error(request, "You have already rated this movie.")
-            return redirect(reverse("rotten_potatoes:movie", kwargs={"movie_name_slug": movie_name_slug}))
-    except:
-        pass
+@movie_view
+def rate_movie(request, movie_obj, profile):
+    movie_url = reverse("rotten_potatoes:movie", kwargs={"movie_name_slug": movie_obj.slug})
 
     # Check if user is not producer of the movie (producers cant rate their own movie)
-    if UserProfile.objects.get(user=request.user).pk == Movie.objects.get(slug=movie_name_slug).producer.pk:
+    if is_movie_producer(profile, movie_obj):
         messages.error(request, "You can not rate your own movie")
-        return redirect(reverse("rotten_potatoes:movie", kwargs={"movie_name_slug": movie_name_slug}))
+        return redirect(movie_url)
+
+    # If any rating associated with the user, don't allow them post more ratings
+    if Rating.objects.filter(movie=movie_obj, user=profile).exists():
+        messages.error(request, "You have already rated this movie.")
+        return redirect(movie_url)
 
     form = AddRatingForm()
     if request.method == "POST":
         form = AddRatingForm(request.POST)
         if form.is_valid():
             rating_obj = form.save(commit=False)
-            rating_obj.user = UserProfile.objects.get(user=request.user)
-            rating_obj.movie = Movie.objects.get(slug=movie_name_slug)
-            rating_obj.save()
+            rating_obj.user = profile
+            rating_obj.movie = movie_obj
+            try:
+                with transaction.atomic():
+                    rating_obj.save()
+            except IntegrityError:
+                # Another request of this user rated the movie in the meantime
+                messages.error(request, "You have already rated this movie.")
 
-            return redirect(reverse('rotten_potatoes:movie',
-                                    kwargs={'movie_name_slug': movie_name_slug}))
+            return redirect(movie_url)
         else:
             print(form.errors)
             return HttpResponse(form.errors)
     else:
-        context_dict = get_movie_context(movie_name_slug)
+        context_dict = get_movie_context(movie_obj)
         context_dict['form'] = form
 
         return render(request, "rotten_potatoes/ratemovie.html", context_dict)
@@ -306,7 +324,8 @@ def rate_movie(request, movie_name_slug):
 
 @login_required
 def add_movie(request):
-    if not UserProfile.objects.get(user=request.user).producer:
+    profile = get_profile(request)
+    if profile is None or not profile.producer:
         messages.error(request, "Sorry, you can not add a movie")
         return redirect("/rotten_potatoes/")
 
@@ -319,13 +338,16 @@ def add_movie(request):
             try:
                 movie_form = form.save(commit=False)
                 # Set producer and datetime before saving to database
-                movie_form.producer = UserProfile.objects.get(user=request.user)
+                movie_form.producer = profile
                 movie_form.upload_date = now()
 
                 if 'cover' in request.FILES:
-                    movie_form.cover = request.FILES['cover']
+                    set_image(movie_form, 'cover', request.FILES['cover'])
 
                 movie_form.save()
+                # Thumbnails of the default cover too, they are only written the first time
+                if not movie_form.cover_thumbnails:
+                    enqueue_thumbnails(movie_form, 'cover')
             except:
                 messages.error(request, "Movie with this name already exists. Try movie name + release year.")
                 return redirect(reverse("rotten_potatoes:add_movie"))
@@ -338,18 +360,12 @@ def add_movie(request):
 
 
 @login_required
-def delete_movie(request, movie_name_slug):
-
-    if not check_movie_exists(movie_name_slug):
-        messages.error(request, "Sorry, movie you tried to access does not exists")
-        return redirect("/rotten_potatoes/")
-
-    movie_obj = Movie.objects.get(slug=movie_name_slug)
-
+@movie_view
+def delete_movie(request, movie_obj, profile):
     # Check user is the producer of the movie or superuser
-    if UserProfile.objects.get(user=request.user) != movie_obj.producer and not request.user.is_superuser:
+    if not is_movie_producer(profile, movie_obj) and not request.user.is_superuser:
         messages.error(request, "You are not permitted to delete this movie")
-        return redirect(reverse('rotten_potatoes:movie', kwargs={"movie_name_slug": movie_name_slug}))
+        return redirect(reverse('rotten_potatoes:movie', kwargs={"movie_name_slug": movie_obj.slug}))
 
     movie_obj.delete()
 
@@ -360,16 +376,12 @@ def delete_movie(request, movie_name_slug):
 @login_required
 def account(request):
     context_dict = {}
-    try:
-        profile = UserProfile.objects.get(user=request.user)
+    profile = get_profile(request)
+    if profile is not None:
         context_dict = get_user_context(profile)
-        try:
-            movies = Movie.objects.filter(producer=UserProfile.objects.get(user=request.user))
-            context_dict['movies'] = movies
-        except:
-            context_dict['movies'] = None
-
-    except:
+        context_dict['movies'] = Movie.objects.filter(producer=profile)
+        context_dict['recommendations'] = recommend_movies(profile)
+    else:
         context_dict["profile"] = None
 
     return render(request, "rotten_potatoes/account.html", context_dict)
@@ -383,17 +395,21 @@ def edit_account(request):
         form = EditAccountForm(request.POST, request.FILES)
         if form.is_valid():
             # Retrieve pk of user
-            profile = UserProfile.objects.get(user=request.user)
+            profile = get_profile(request)
             # Associate change with user object in database
             form = EditAccountForm(request.POST, instance=profile)
             profile = form.save(commit=False)
             if "profile_pic" in request.FILES:
-                profile.profile_pic = request.FILES["profile_pic"]
-            else:
-                profile.profile_pic = "profile_images/default.png"
+                set_image(profile, "profile_pic", request.FILES["profile_pic"])
+            elif profile.profile_pic.name != DEFAULT_PROFILE_PIC:
+                set_image(profile, "profile_pic", DEFAULT_PROFILE_PIC)
 
             # Save form
             profile.save()
+            # The thumbnails of a new picture are generated by the worker, those of the
+            # default picture are shared and only written the first time
+            if not profile.profile_pic_thumbnails:
+                enqueue_thumbnails(profile, "profile_pic")
 
             return redirect(reverse("rotten_potatoes:account"))
         else:
@@ -403,7 +419,7 @@ def edit_account(request):
         initial_dict = {}
         form = EditAccountForm()
 
-        profile = UserProfile.objects.get(user=request.user)
+        profile = get_profile(request)
         initial_dict["profile_pic"] = profile.profile_pic
         initial_dict["description"] = profile.description
         form = EditAccountForm(initial=initial_dict)
@@ -413,91 +429,132 @@ def edit_account(request):
         return render(request, 'rotten_potatoes/editaccount.html', context_dict)
 
 
+def actor(request, actor_slug):
+    try:
+        actor_obj = Actor.objects.get(slug=actor_slug)
+    except Actor.DoesNotExist:
+        messages.error(request, "Sorry, actor you tried to access does not exists")
+        return redirect("/rotten_potatoes/")
+
+    # Ratings are stored on the movies, so the whole filmography is a single query
+    context_dict = {
+        "actor": actor_obj,
+        "movie_list": actor_obj.movies.order_by("-release_date", "name"),
+    }
+
+    return render(request, "rotten_potatoes/actor.html", context_dict)
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    context_dict = {"query": query, "movie_list": []}
+
+    try:
+        # Clamped, as the offset of a huge page number does not fit in an SQL integer
+        page = min(max(1, int(request.GET.get("page", 1))), settings.SEARCH_MAX_PAGE)
+    except ValueError:
+        page = 1
+
+    if query:
+        per_page = get_page_size(request)
+        movies, has_next = search_movies(query, per_page, (page - 1) * per_page)
+        context_dict["movie_list"] = movies
+
+        # Links to the neighbouring pages of results
+        if has_next:
+            context_dict["next_page_url"] = reverse("rotten_potatoes:search") + "?" + urlencode(
+                {"q": query, "page": page + 1})
+        if page > 1:
+            context_dict["previous_page_url"] = reverse("rotten_potatoes:search") + "?" + urlencode(
+                {"q": query, "page": page - 1})
+
+    return render(request, "rotten_potatoes/search.html", context_dict)
+
+
 # Ratings view with default sorting by movie rating
+@conditional_page(catalog_version, daily=True)
 def ratings(request):
-    form = RatingsPageForm()
     context_dict = {}
 
+    # Filters come from the sorting form, or from the query string when following a page link
     if request.method == "POST":
         form = RatingsPageForm(request.POST)
+    elif "genre" in request.GET:
+        form = RatingsPageForm(request.GET)
+    else:
+        form = None
 
-        if form.is_valid():
-
-            movies = Movie.objects.annotate(avg_rating=Avg('rating__rating')).annotate(num_of_ratings=Count('rating'))
+    genre = None
+    sort_by = sort_by_list[0][0]
 
+    if form is not None:
+        if form.is_valid():
             sort_by = form.cleaned_data.get('sort_by')
             genre = form.cleaned_data.get('genre')
-
-            # Filter movies by genre, then sort them by sort_by
-            movies = movies.filter(genre=genre).order_by(sort_by)
-
-            context_dict["movie_list"] = movies
-
-            try:
-                current_year = datetime.now().date().strftime("%Y")
-                this_years_favorite = Movie.objects.annotate(avg_rating=Avg('rating__rating'))
-                this_years_favorite = this_years_favorite.filter(release_date__range=
-                                                                 [current_year + '-01-01',
-                                                                  current_year + '-12-31']).order_by('-avg_rating')[0]
-            except:
-                this_years_favorite = None
-
-            context_dict["this_years_favorite"] = this_years_favorite
             form = RatingsPageForm(initial={"genre": genre, "sort_by": sort_by})
-            context_dict["form"] = form
         else:
             return HttpResponse(form.errors)
-
     else:   # Http GET
-        movies = Movie.objects.annotate(avg_rating=Avg('rating__rating')).annotate(num_of_ratings=Count('rating'))
-        try:
-            current_year = datetime.now().date().strftime("%Y")
-            this_years_favorite = Movie.objects.annotate(avg_rating=Avg('rating__rating'))
-            this_years_favorite = this_years_favorite.filter(release_date__range=
-                                                             [current_year + '-01-01',
-                                                              current_year + '-12-31']).order_by('-avg_rating')[0]
-        except:
-            this_years_favorite = None
+        form = RatingsPageForm()
 
-        context_dict["movie_list"] = movies
-        context_dict["this_years_favorite"] = this_years_favorite
-        context_dict["form"] = form
+    # Sort movies by sort_by, one page at a time, a genre is read from its precomputed leaderboard
+    per_page = get_page_size(request, settings.RATINGS_PAGE_SIZE)
+    if genre is not None:
+        page = LeaderboardPage(genre, sort_by, cursor=request.GET.get("cursor"), per_page=per_page,
+                               genre_version=genre_version(request, genre))
+    else:
+        page = KeysetPage(Movie.objects.all(), sort_by_orderings[sort_by], cursor=request.GET.get("cursor"),
+                          per_page=per_page)
 
-    return render(request, "rotten_potatoes/ratings.html", context_dict)
+    context_dict["movie_list"] = page
+    context_dict["this_years_favorite"] = get_home_page_sections(catalog_version(request)[0])["this_years_favorite"]
+    context_dict["form"] = form
 
+    if page.has_next:
+        query = {"cursor": page.next_cursor}
+        if genre is not None:
+            query.update({"genre": genre, "sort_by": sort_by})
+        if "limit" in request.GET:
+            query["limit"] = page.per_page
+        context_dict["next_page_url"] = reverse("rotten_potatoes:ratings") + "?" + urlencode(query)
 
-def get_movie_context(movie_name_slug):
-    context_dictionary = {}
-    try:
-        # Get movie object to get details
-        movie_obj = Movie.objects.annotate(avg_rating=Avg('rating__rating')).annotate(num_of_ratings=Count('rating'))
-        # Get average rating and number of ratings
-        movie_obj = movie_obj.get(slug=movie_name_slug)
+    return render(request, "rotten_potatoes/ratings.html", context_dict)
 
-        context_dictionary = {
-            "movie": movie_obj,
-        }
 
-        # Convert url into embedded video link
-        try:
-            url = movie_obj.trailer
-            x = url.split("=")
-            newLink = "https://www.youtube.com/embed/" + x[-1]
+def get_movie_context(movie_obj):
+    context_dictionary = {
+        "movie": movie_obj,
+    }
 
-            context_dictionary['urlLink'] = newLink
+    # Convert url into embedded video link
+    try:
+        url = movie_obj.trailer
+        x = url.split("=")
+        newLink = "https://www.youtube.com/embed/" + x[-1]
 
-        # Convert url into embedded video link
-        except:
-            newLink = "https://www.youtube.com/embed/dQw4w9WgXcQ"
-            context_dictionary['urlLink'] = newLink
+        context_dictionary['urlLink'] = newLink
 
-    # If movie object does not exist, set movie details to None
+    # Convert url into embedded video link
     except:
-        context_dictionary["movie"] = None
+        newLink = "https://www.youtube.com/embed/dQw4w9WgXcQ"
+        context_dictionary['urlLink'] = newLink
 
     return context_dictionary
 
 
+def get_comments_page(movie_obj, cursor=None):
+    # Comment authors are joined in, the template shows their username and checks their id
+    comments = Comment.objects.filter(movie=movie_obj).select_related("user__user")
+    return KeysetPage(comments, ("-time_posted", "-id"), cursor=cursor, per_page=settings.COMMENTS_PAGE_SIZE)
+
+
+def get_next_comments_url(movie_obj, comments):
+    if not comments.has_next:
+        return None
+    return reverse("rotten_potatoes:movie_comments",
+                   kwargs={"movie_name_slug": movie_obj.slug}) + "?" + urlencode({"cursor": comments.next_cursor})
+
+
 def get_user_context(profile):
     context_dict = {"profile": profile}
 
@@ -513,13 +570,9 @@ def get_user_context(profile):
     return context_dict
 
 
-def check_movie_exists(movie_name_slug):
-    # Check if movie exists
-    try:
-        Movie.objects.get(slug=movie_name_slug)
-        return True
-    except:
-        return False
+def is_movie_producer(profile, movie_obj):
+    # Check if the profile is the producer of the movie, without loading the producer
+    return profile is not None and profile.pk == movie_obj.producer_id
 
 
 2
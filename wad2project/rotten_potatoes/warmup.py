@@ -0,0 +1,83 @@
+import logging
+import os
+import time
+
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+from rotten_potatoes.cache import get_home_page_sections
+from rotten_potatoes.leaderboards import LEADERBOARD_GENRES, build_genre_leaderboards, get_cached_leaderboards
+from rotten_potatoes.models import get_catalog_version, get_score_prior
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    # Names of the templates below a template directory, as passed to get_template
+    for root, dirs, files in os.walk(directory):
+        for name in files:
+            if name.endswith('.html'):
+                yield os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    # Compile every template of the project directories, the cached loader keeps them for the first requests
+    compiled = 0
+    for backend in engines.all():
+        for directory in backend.engine.dirs:
+            for name in template_names(directory):
+                backend.get_template(name)
+                compiled += 1
+    return "{} templates".format(compiled)
+
+
+def warm_urls():
+    # Build the reverse lookups of the resolver and of its namespaces, which the first reverse() would
+    resolvers, names = [get_resolver()], 0
+    while resolvers:
+        resolver = resolvers.pop()
+        names += sum(1 for key in resolver.reverse_dict if isinstance(key, str))
+        resolvers.extend(namespace_resolver for prefix, namespace_resolver in resolver.namespace_dict.values())
+    return "{} named routes".format(names)
+
+
+def warm_caches():
+    # Home page sections, score prior and the leaderboards of the ratings page not cached yet
+    catalog_version, modified, genre_versions = get_catalog_version(LEADERBOARD_GENRES)
+    get_score_prior()
+    get_home_page_sections(catalog_version)
+
+    cached = get_cached_leaderboards(genre_versions)
+    missing = LEADERBOARD_GENRES - {genre for genre, field in cached}
+    for genre in missing:
+        build_genre_leaderboards(genre, genre_versions[genre])
+    return "{} genre leaderboards built".format(len(missing))
+
+
+WARMUP_STEPS = [('templates', warm_templates), ('urls', warm_urls), ('caches', warm_caches)]
+
+
+def run_warmup():
+    """
+    Prepare a new worker for its first requests: compile the templates, build the URL resolver
+    and fill the caches. Returns (step, seconds, result, error) for every step, a failed step
+    is logged and does not stop the others. The database connections are closed afterwards.
+    """
+    steps = []
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            result, error = step(), None
+        except Exception as e:
+            result, error = None, e
+            logger.exception("Warm-up step %s failed", name)
+
+        seconds = time.perf_counter() - started
+        if error is None:
+            logger.info("Warm-up step %s took %.1fms: %s", name, seconds * 1000, result)
+        steps.append((name, seconds, result, error))
+
+    # Servers which load the application before forking its workers would otherwise share the connections
+    connections.close_all()
+    return steps
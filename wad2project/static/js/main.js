@@ -7,3 +7,18 @@ function submitDeleteComment(cci){
 function submitDeleteForm(){
   document.getElementById('delete').submit();
 }
+
+function loadMoreComments(button){
+  // Append the next page of comments, then point the button at the page after it
+  fetch(button.dataset.url).then(function(response){
+    var nextPage = response.headers.get('X-Next-Page');
+    return response.text().then(function(html){
+      document.getElementById('comment-list').insertAdjacentHTML('beforeend', html);
+      if (nextPage) {
+        button.dataset.url = nextPage;
+      } else {
+        button.remove();
+      }
+    });
+  });
+}
@@ -0,0 +1,5 @@
+import logging
+
+# Keep the line the profiling middleware logs for every request, and the warm-up steps, out of the test output
+logging.getLogger('rotten_potatoes.profiling').setLevel(logging.WARNING)
+logging.getLogger('rotten_potatoes.warmup').setLevel(logging.WARNING)
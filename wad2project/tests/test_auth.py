@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.contrib.sessions.models import Session
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from rotten_potatoes.auth import USER_KEY, CachedModelBackend
+from rotten_potatoes.models import *
+
+
+@override_settings(SHARED_CACHE=True, SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class TestCachedUsers(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        viewer = User.objects.create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.create(user=viewer, description="Old Description")
+        self.client.login(username="viewer", password="123")
+
+    def test_user_is_cached_with_its_profile(self):
+        user = CachedModelBackend().get_user(self.viewer.user.pk)
+
+        # Check the profile came with the user, and the next lookup is served from the cache
+        with self.assertNumQueries(0):
+            self.assertEquals(user.userprofile.description, "Old Description")
+            self.assertEquals(CachedModelBackend().get_user(self.viewer.user.pk).username, "viewer")
+
+    def test_logged_in_requests_skip_session_and_user_queries(self):
+        self.client.get(reverse("rotten_potatoes:edit_account"))
+
+        # Check the session, the user and the profile all come from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("rotten_potatoes:edit_account"))
+        self.assertContains(response, "Old Description")
+
+    def test_profile_edit_invalidates_cached_user(self):
+        self.client.get(reverse("rotten_potatoes:account"))
+        self.assertIsNotNone(cache.get(USER_KEY.format(self.viewer.user.pk)))
+
+        self.client.post(reverse("rotten_potatoes:edit_account"), data={"description": "New Description"})
+
+        # Check the next request sees the edited profile
+        self.assertIsNone(cache.get(USER_KEY.format(self.viewer.user.pk)))
+        self.assertContains(self.client.get(reverse("rotten_potatoes:account")), "New Description")
+
+    def test_deactivated_user_is_logged_out(self):
+        self.client.get(reverse("rotten_potatoes:account"))
+
+        user = User.objects.get(pk=self.viewer.user.pk)
+        user.is_active = False
+        user.save()
+
+        # Check the cached user is not used any more
+        response = self.client.get(reverse("rotten_potatoes:account"))
+        self.assertEquals(response.status_code, 302)
+
+
+@override_settings(SHARED_CACHE=False, SESSION_ENGINE='django.contrib.sessions.backends.db')
+class TestPerProcessCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        viewer = User.objects.create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.create(user=viewer)
+        self.client.login(username="viewer", password="123")
+        self.account_url = reverse("rotten_potatoes:account")
+
+    def test_session_flushed_by_another_worker_is_rejected(self):
+        self.assertEquals(self.client.get(self.account_url).status_code, 200)
+
+        # Another worker logs the session out, which only clears its own cache
+        Session.objects.filter(session_key=self.client.session.session_key).delete()
+
+        # Check the session is rejected, whether this worker read it before or reads it from a fresh cache
+        self.assertEquals(self.client.get(self.account_url).status_code, 302)
+        cache.clear()
+        self.assertEquals(self.client.get(self.account_url).status_code, 302)
+
+    def test_user_deactivated_by_another_worker_is_rejected(self):
+        self.assertEquals(self.client.get(self.account_url).status_code, 200)
+
+        # Another worker deactivates the user, its signals only clear its own cache
+        User.objects.filter(pk=self.viewer.user.pk).update(is_active=False)
+
+        # Check the user is loaded again and not let in
+        self.assertIsNone(CachedModelBackend().get_user(self.viewer.user.pk))
+        self.assertEquals(self.client.get(self.account_url).status_code, 302)
@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import get_resolver
+
+from rotten_potatoes.benchmark import run_benchmarks, compare_results
+from rotten_potatoes.datagen import DataGenerator
+from rotten_potatoes.recommendations import build_movie_neighbors
+
+
+class TestBenchmark(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        DataGenerator(users=30, movies=12, ratings=150, comments=40, seed=1).generate()
+        build_movie_neighbors()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_view_is_benchmarked(self):
+        results = run_benchmarks(iterations=1, warmup=0)["results"]
+
+        # Check every url of the app has a scenario
+        url_names = {name for name in get_resolver().namespace_dict["rotten_potatoes"][1].reverse_dict.keys()
+                     if isinstance(name, str)}
+        self.assertEquals(url_names - {result["url_name"] for result in results.values()}, set())
+
+        # Check no scenario fails
+        for name, result in results.items():
+            self.assertTrue(all(code < 400 for code in result["status_codes"]), name)
+            self.assertEquals(result["iterations"], 1)
+            self.assertTrue(result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"], name)
+
+    def test_only_runs_matching_scenarios(self):
+        results = run_benchmarks(iterations=1, warmup=0, only="ratings GET")["results"]
+
+        self.assertTrue(results)
+        self.assertTrue(all(name.startswith("ratings GET") for name in results))
+
+    def test_compare_results_flags_regressions(self):
+        baseline = {"results": {"index": {"p95_ms": 10.0, "queries": 3},
+                                "movie": {"p95_ms": 10.0, "queries": 3},
+                                "about": {"p95_ms": 0.2, "queries": 0}}}
+        results = {"results": {"index": {"p95_ms": 11.0, "queries": 3},
+                               "movie": {"p95_ms": 15.0, "queries": 4},
+                               "about": {"p95_ms": 0.8, "queries": 0},
+                               "new": {"p95_ms": 100.0, "queries": 50}}}
+
+        regressions = compare_results(results, baseline, threshold=0.2)
+
+        # Check only the slower movie page with more queries regressed, small or new scenarios are not
+        self.assertEquals(len(regressions), 2)
+        self.assertTrue(all(regression.startswith("movie:") for regression in regressions))
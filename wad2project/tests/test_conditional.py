@@ -0,0 +1,151 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils.timezone import localtime
+
+from rotten_potatoes.models import *
+from rotten_potatoes.recommendations import build_movie_neighbors
+from rotten_potatoes.scores import compute_movie_scores
+
+
+class TestConditionalPages(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        producer = User.objects.create_user(username="producer", password="123")
+        self.producer = UserProfile.objects.create(user=producer, producer=True)
+
+        viewer = User.objects.create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.create(user=viewer)
+
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.producer)
+        self.movie_url = reverse("rotten_potatoes:movie", args=[self.test_movie.slug])
+
+    def revalidate(self, url, response):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_movie_page_not_modified(self):
+        response = self.client.get(self.movie_url)
+        self.assertEquals(response.status_code, 200)
+        self.assertTrue(response.has_header("Last-Modified"))
+        self.assertIn("no-cache", response["Cache-Control"])
+
+        # Check the repeat visit is answered after loading the movie only
+        with self.assertNumQueries(1):
+            repeat = self.revalidate(self.movie_url, response)
+        self.assertEquals(repeat.status_code, 304)
+        self.assertEquals(repeat["ETag"], response["ETag"])
+        self.assertEquals(repeat.content, b"")
+
+    def test_movie_page_changes_with_writes(self):
+        changes = [
+            lambda: Rating.objects.create(movie=self.test_movie, user=self.viewer, rating=4),
+            lambda: Comment.objects.create(movie=self.test_movie, user=self.viewer, time_posted=datetime.now(),
+                                           text="Comment"),
+            lambda: Comment.objects.get().delete(),
+            lambda: Movie.objects.get(pk=self.test_movie.pk).save(),
+            lambda: build_movie_neighbors(),
+        ]
+
+        response = self.client.get(self.movie_url)
+        for change in changes:
+            change()
+
+            # Check every write to the movie, its ratings, comments or neighbors renders the page again
+            repeat = self.revalidate(self.movie_url, response)
+            self.assertEquals(repeat.status_code, 200)
+            self.assertNotEqual(repeat["ETag"], response["ETag"])
+            response = repeat
+
+    def test_saved_movie_version(self):
+        movie = Movie.objects.get(pk=self.test_movie.pk)
+        movie.save()
+
+        # Check the version was bumped in the database and is loaded again when used
+        self.assertEquals(movie.version, 2)
+        self.assertEquals(Movie.objects.get(pk=movie.pk).version, 2)
+
+    def test_etag_changes_with_user(self):
+        response = self.client.get(self.movie_url)
+        self.client.login(username="viewer", password="123")
+
+        # Check the page of an anonymous user is not reused for a logged in one
+        repeat = self.revalidate(self.movie_url, response)
+        self.assertEquals(repeat.status_code, 200)
+        self.assertEquals(self.revalidate(self.movie_url, repeat).status_code, 304)
+
+    def test_pending_messages_are_shown(self):
+        self.client.login(username="producer", password="123")
+        response = self.client.get(self.movie_url)
+
+        # Check a page with a message to show is rendered even if the client has it
+        self.client.get(reverse("rotten_potatoes:rate_movie", args=[self.test_movie.slug]))
+        repeat = self.revalidate(self.movie_url, response)
+        self.assertEquals(repeat.status_code, 200)
+        self.assertContains(repeat, "You can not rate your own movie")
+
+    def test_listing_pages_not_modified(self):
+        for url in (reverse("rotten_potatoes:index"), reverse("rotten_potatoes:ratings")):
+            response = self.client.get(url)
+
+            # Check a repeat visit only reads the catalog version, and a new rating renders the page again
+            with self.assertNumQueries(1):
+                self.assertEquals(self.revalidate(url, response).status_code, 304)
+
+            Rating.objects.create(movie=self.test_movie, user=self.viewer, rating=3)
+            self.assertEquals(self.revalidate(url, response).status_code, 200)
+            Rating.objects.all().delete()
+
+    def test_listing_pages_change_with_writes_without_signals(self):
+        url = reverse("rotten_potatoes:index")
+        Rating.objects.create(movie=self.test_movie, user=self.viewer, rating=4)
+        Movie.objects.create(name="Other Movie", producer=self.producer)
+        # Writes of the commands and of other processes leave the cache of this process alone
+        changes = [
+            lambda: compute_movie_scores(),
+            lambda: rebuild_rating_aggregates(Movie.objects.filter(pk=self.test_movie.pk)),
+            lambda: bump_catalog_version(),
+        ]
+
+        response = self.client.get(url)
+        for change in changes:
+            change()
+
+            # Check the version is read from the database
+            repeat = self.revalidate(url, response)
+            self.assertEquals(repeat.status_code, 200)
+            self.assertNotEqual(repeat["ETag"], response["ETag"])
+            response = repeat
+
+    def test_listing_pages_ignore_comments(self):
+        url = reverse("rotten_potatoes:index")
+        response = self.client.get(url)
+
+        # Check a comment, which the listing pages do not show, leaves them alone
+        Comment.objects.create(movie=self.test_movie, user=self.viewer, time_posted=datetime.now(), text="Comment")
+        self.assertEquals(self.revalidate(url, response).status_code, 304)
+
+    def test_listing_pages_change_with_the_date(self):
+        url = reverse("rotten_potatoes:index")
+        response = self.client.get(url)
+        self.assertIn("max-age=", response["Cache-Control"])
+
+        # Check the recently added movies and this year's favorite are computed again the next day
+        tomorrow = localtime() + timedelta(days=1)
+        with mock.patch("rotten_potatoes.decorators.localtime", return_value=tomorrow):
+            repeat = self.revalidate(url, response)
+        self.assertEquals(repeat.status_code, 200)
+        self.assertNotEqual(repeat["ETag"], response["ETag"])
+
+    def test_ratings_page_POST_is_rendered(self):
+        url = reverse("rotten_potatoes:ratings")
+        response = self.client.get(url)
+
+        response = self.client.post(url, data={"genre": "Action", "sort_by": "name"},
+                                    HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEquals(response.status_code, 200)
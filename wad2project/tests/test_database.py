@@ -0,0 +1,101 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.management import call_command
+from django.db import connections
+from django.db.models import F
+from django.test import TestCase
+
+from rotten_potatoes.models import *
+
+ALIAS = 'concurrency'
+
+
+class TestSqliteProfile(TestCase):
+    """
+    Rating and comment writes against a database file, as in production, with a second connection
+    reading the movie page data while the writer holds the lock it takes to commit.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        connections.databases[ALIAS] = dict(connections.databases['default'], OPTIONS={'timeout': 0.2}, TEST={},
+                                            NAME=os.path.join(cls.directory, 'db.sqlite3'))
+        call_command('migrate', database=ALIAS, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[ALIAS].close()
+        del connections[ALIAS]
+        del connections.databases[ALIAS]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        user = User.objects.db_manager(ALIAS).create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.using(ALIAS).create(user=user)
+        self.movie_id = Movie.objects.using(ALIAS).create(name="Test Movie").pk
+
+    def tearDown(self):
+        # Closing the connection rolls back a write a failed test left open
+        connections[ALIAS].close()
+        for model in (Comment, Rating, Movie, UserProfile, User):
+            model.objects.using(ALIAS).all().delete()
+
+    def reader(self):
+        # A connection of another worker
+        connection = sqlite3.connect(connections[ALIAS].settings_dict['NAME'], timeout=0.2, isolation_level=None)
+        self.addCleanup(connection.close)
+        return connection
+
+    def write_rating_and_comment(self):
+        # The writes of rate_movie and add_comment, with the lock a writer holds while committing them.
+        # Saved raw, as by loaddata, so that the signal handlers do not write to the default database
+        cursor = connections[ALIAS].cursor()
+        cursor.execute('BEGIN EXCLUSIVE')
+        Rating(movie_id=self.movie_id, user=self.viewer, rating=4).save_base(raw=True, using=ALIAS)
+        Movie.objects.using(ALIAS).filter(pk=self.movie_id).update(rating_sum=F('rating_sum') + 4,
+                                                                    num_of_ratings=F('num_of_ratings') + 1)
+        Comment(movie_id=self.movie_id, user=self.viewer, time_posted=datetime.now(),
+                text="Comment").save_base(raw=True, using=ALIAS)
+        return cursor
+
+    def test_pragmas_are_set_on_new_connections(self):
+        cursor = connections[ALIAS].cursor()
+
+        cursor.execute('PRAGMA journal_mode')
+        self.assertEquals(cursor.fetchone()[0], 'wal')
+        cursor.execute('PRAGMA synchronous')
+        self.assertEquals(cursor.fetchone()[0], 1)
+        cursor.execute('PRAGMA cache_size')
+        self.assertEquals(cursor.fetchone()[0], -64 * 1024)
+
+    def test_readers_are_not_blocked_by_writes(self):
+        reader = self.reader()
+        cursor = self.write_rating_and_comment()
+
+        # Check the movie and its comments are read while the writer holds the lock, as they were before it
+        row = reader.execute('SELECT num_of_ratings FROM rotten_potatoes_movie WHERE id = ?', [self.movie_id])
+        self.assertEquals(row.fetchone()[0], 0)
+        row = reader.execute('SELECT COUNT(*) FROM rotten_potatoes_comment WHERE movie_id = ?', [self.movie_id])
+        self.assertEquals(row.fetchone()[0], 0)
+
+        # Check the writes are seen once committed
+        cursor.execute('COMMIT')
+        row = reader.execute('SELECT num_of_ratings FROM rotten_potatoes_movie WHERE id = ?', [self.movie_id])
+        self.assertEquals(row.fetchone()[0], 1)
+
+    def test_readers_were_blocked_with_a_rollback_journal(self):
+        # New connections of the following tests turn WAL on again
+        connections[ALIAS].cursor().execute('PRAGMA journal_mode = DELETE')
+        reader = self.reader()
+        cursor = self.write_rating_and_comment()
+
+        # Check the reader fails after waiting for the writer, which is what WAL avoids
+        with self.assertRaises(sqlite3.OperationalError):
+            reader.execute('SELECT num_of_ratings FROM rotten_potatoes_movie WHERE id = ?', [self.movie_id])
+        cursor.execute('ROLLBACK')
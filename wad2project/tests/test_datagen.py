@@ -0,0 +1,101 @@
+import os
+
+from django.contrib.auth import authenticate
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.test import TestCase
+
+from rotten_potatoes.datagen import DataGenerator
+from rotten_potatoes.models import *
+
+
+class TestDataGenerator(TestCase):
+
+    def generate(self, **options):
+        settings = dict(users=30, movies=12, ratings=150, comments=40, seed=1)
+        settings.update(options)
+        DataGenerator(**settings).generate()
+
+    def snapshot(self):
+        # Generated data independent of primary keys
+        return (sorted(Rating.objects.values_list('user__user__username', 'movie__name', 'rating')),
+                sorted(Comment.objects.values_list('user__user__username', 'movie__name', 'text', 'time_posted')),
+                sorted(Movie.objects.values_list('name', 'genre', 'actors', 'producer__user__username')))
+
+    def test_generates_requested_number_of_rows(self):
+        self.generate()
+
+        self.assertEquals(User.objects.count(), 30)
+        self.assertEquals(UserProfile.objects.count(), 30)
+        self.assertEquals(Movie.objects.count(), 12)
+        self.assertEquals(Rating.objects.count(), 150)
+        self.assertEquals(Comment.objects.count(), 40)
+        self.assertEquals(UserProfile.objects.filter(producer=True).count(), 1)
+
+    def test_same_seed_generates_same_data(self):
+        self.generate()
+        first = self.snapshot()
+
+        User.objects.all().delete()
+        Actor.objects.all().delete()
+        self.generate()
+
+        self.assertEquals(self.snapshot(), first)
+
+    def test_different_seed_generates_different_data(self):
+        self.generate()
+        first = self.snapshot()
+
+        User.objects.all().delete()
+        self.generate(seed=2)
+
+        self.assertNotEquals(self.snapshot()[0], first[0])
+
+    def test_generated_ratings_are_valid(self):
+        self.generate(ratings=300)
+
+        # One rating per user and movie, none by the producer of the movie, all between 1 and 5
+        self.assertFalse(Rating.objects.values('movie', 'user').annotate(n=Count('id')).filter(n__gt=1).exists())
+        self.assertFalse(Rating.objects.filter(movie__producer=F('user')).exists())
+        self.assertFalse(Rating.objects.exclude(rating__range=(1, 5)).exists())
+
+    def test_popularity_is_skewed(self):
+        self.generate(users=100, movies=50, ratings=1000)
+
+        counts = sorted(Movie.objects.values_list('num_of_ratings', flat=True), reverse=True)
+        # The most popular tenth of the movies has a lot more than a tenth of the ratings
+        self.assertGreater(sum(counts[:5]), 250)
+
+    def test_generated_data_is_consistent(self):
+        self.generate()
+
+        # Aggregates and cast are filled in as the signal handlers would
+        for movie in Movie.objects.all():
+            ratings = list(Rating.objects.filter(movie=movie).values_list('rating', flat=True))
+            self.assertEquals(movie.num_of_ratings, len(ratings))
+            self.assertEquals(movie.rating_sum, sum(ratings))
+            self.assertEquals(sorted(movie.cast.values_list('slug', flat=True)), sorted(parse_actors(movie.actors)))
+            self.assertEquals(Movie.objects.get(slug=movie.slug), movie)
+
+        # New rows get primary keys after the generated ones
+        user = User.objects.create_user(username="new_user")
+        self.assertEquals(user.pk, User.objects.order_by('-pk')[1].pk + 1)
+
+    def test_generated_users_can_log_in(self):
+        self.generate(password="secret")
+
+        user = User.objects.first()
+        self.assertEquals(authenticate(username=user.username, password="secret"), user)
+
+    def test_too_many_ratings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            DataGenerator(users=3, movies=2, ratings=5)
+
+    def test_generate_data_command(self):
+        with open(os.devnull, "w") as devnull:
+            call_command("generate_data", users=10, movies=5, ratings=20, comments=5, stdout=devnull)
+            self.assertEquals(Rating.objects.count(), 20)
+
+            with self.assertRaises(CommandError):
+                call_command("generate_data", users=2, movies=5, ratings=20, stdout=devnull)
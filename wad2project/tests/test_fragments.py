@@ -0,0 +1,100 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+
+
+class TestMovieFragments(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        producer = User.objects.create_user(username="producer", password="123")
+        self.producer = UserProfile.objects.create(user=producer, producer=True)
+
+        viewer = User.objects.create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.create(user=viewer)
+
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.producer,
+                                               description="Old Description")
+        self.add_comment("First Comment")
+        self.movie_url = reverse("rotten_potatoes:movie", args=[self.test_movie.slug])
+
+    def add_comment(self, text, user=None):
+        return Comment.objects.create(movie=self.test_movie, user=user or self.viewer, time_posted=datetime.now(),
+                                      text=text)
+
+    def test_cached_fragments_skip_comments_query(self):
+        self.client.get(self.movie_url)
+
+        # Check the second visit only loads the movie and its similar movies
+        with self.assertNumQueries(2):
+            response = self.client.get(self.movie_url)
+        self.assertContains(response, "First Comment")
+        self.assertContains(response, "Old Description")
+
+    def test_fragments_are_invalidated_by_their_writes(self):
+        self.client.get(self.movie_url)
+
+        # Check a new comment is listed
+        self.add_comment("Second Comment")
+        self.assertContains(self.client.get(self.movie_url), "Second Comment")
+
+        # Check a rating changes the rating block
+        Rating.objects.create(movie=self.test_movie, user=self.viewer, rating=4)
+        self.assertContains(self.client.get(self.movie_url), "Number of Ratings: 1")
+
+        # Check an edit of the movie changes its details
+        movie = Movie.objects.get(pk=self.test_movie.pk)
+        movie.description = "New Description"
+        movie.save()
+        response = self.client.get(self.movie_url)
+        self.assertContains(response, "New Description")
+        self.assertNotContains(response, "Old Description")
+
+    def test_writes_keep_the_other_fragments_cached(self):
+        self.client.get(self.movie_url)
+
+        # Check a rating and a comment only render their own fragment again, the details stay cached
+        Movie.objects.filter(pk=self.test_movie.pk).update(description="Uncached Description")
+        Rating.objects.create(movie=self.test_movie, user=self.viewer, rating=4)
+        self.add_comment("Second Comment")
+        response = self.client.get(self.movie_url)
+        self.assertContains(response, "Number of Ratings: 1")
+        self.assertContains(response, "Second Comment")
+        self.assertContains(response, "Old Description")
+
+        # Check a rating leaves the comments fragment cached, which then skips its query
+        Rating.objects.filter(movie=self.test_movie).update(rating=5)
+        rebuild_rating_aggregates(Movie.objects.filter(pk=self.test_movie.pk))
+        with self.assertNumQueries(2):
+            self.client.get(self.movie_url)
+
+    def test_fragments_change_with_writes_of_other_processes(self):
+        self.client.get(self.movie_url)
+
+        # Writes of the worker and the commands only bump the versions in the database
+        Movie.objects.filter(pk=self.test_movie.pk).update(description="New Description",
+                                                           **version_bump('details_version'))
+
+        # Check the details are rendered again
+        self.assertContains(self.client.get(self.movie_url), "New Description")
+
+    def test_delete_buttons_are_revealed_per_user(self):
+        comment = Comment.objects.get()
+        self.client.get(self.movie_url)
+
+        # Check the cached comment list is the same for every user, with the author of each comment
+        self.client.login(username="viewer", password="123")
+        response = self.client.get(self.movie_url)
+        self.assertContains(response, 'data-author="{}"'.format(self.viewer.user.id))
+        self.assertContains(response, 'id="{}"'.format(comment.pk))
+
+        # Check only the logged in user's comments get their delete button shown
+        self.assertContains(response, 'li[data-author="{}"] .delete-comment'.format(self.viewer.user.id))
+        self.client.login(username="producer", password="123")
+        response = self.client.get(self.movie_url)
+        self.assertContains(response, 'li[data-author="{}"] .delete-comment'.format(self.producer.user.id))
+        self.assertNotContains(response, 'li[data-author="{}"] .delete-comment'.format(self.viewer.user.id))
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.test import TestCase
+
+from rotten_potatoes.forms import sort_by_orderings
+from rotten_potatoes.models import *
+from rotten_potatoes.pagination import KeysetPage
+
+
+class TestQueryPlans(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.test_profile, genre="Action")
+
+    def get_query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            # Last column of each row is the readable detail, e.g. "SEARCH ... USING INDEX ..."
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, sorted_by_index=False):
+        plan = self.get_query_plan(queryset)
+
+        # A table is scanned in full when SCAN is not followed by an index
+        for detail in plan:
+            if detail.startswith("SCAN") and "USING" not in detail:
+                self.fail("Full table scan in query plan: {}".format(plan))
+
+        # Sorting rows in a temporary b-tree means the index does not give the order
+        if sorted_by_index and any("TEMP B-TREE" in detail for detail in plan):
+            self.fail("Query sorts without an index: {}".format(plan))
+
+    def test_movie_by_slug_uses_index(self):
+        self.assertUsesIndex(Movie.objects.filter(slug="test-movie"))
+
+    def test_index_top_movies_uses_index(self):
+        self.assertUsesIndex(Movie.objects.order_by('-avg_rating')[:5], sorted_by_index=True)
+
+    def test_index_recently_added_uses_index(self):
+        self.assertUsesIndex(Movie.objects.filter(upload_date__gte=datetime.now() - timedelta(days=14)))
+
+    def test_index_this_years_favorite_uses_index(self):
+        self.assertUsesIndex(Movie.objects.filter(release_date__range=["2021-01-01", "2021-12-31"])
+                             .order_by('-avg_rating')[:1])
+
+    def test_ratings_pages_use_index_for_every_sort(self):
+        for sort_by, ordering in sort_by_orderings.items():
+            with self.subTest(sort_by=sort_by):
+                for movies in (Movie.objects.all(), Movie.objects.filter(genre="Action")):
+                    # First page, and a page after the test movie
+                    first_page = KeysetPage(movies, ordering, per_page=10)
+                    self.assertUsesIndex(first_page.queryset.order_by(*ordering)[:11], sorted_by_index=True)
+
+                    values = [getattr(self.test_movie, field.lstrip('-')) for field in ordering]
+                    next_page = KeysetPage(movies, ordering, per_page=10)
+                    next_page.after = values
+                    queryset = movies.filter(next_page.keyset_filter()).order_by(*ordering)[:11]
+                    self.assertUsesIndex(queryset)
+
+                    # Deep pages must seek the index to the cursor, not walk it from the start
+                    field = ordering[0].lstrip('-')
+                    plan = " ".join(self.get_query_plan(queryset))
+                    self.assertTrue(field + "<" in plan or field + ">" in plan, plan)
+
+    def test_rating_by_movie_and_user_uses_index(self):
+        self.assertUsesIndex(Rating.objects.filter(movie=self.test_movie, user=self.test_profile))
+
+    def test_ratings_of_user_use_index(self):
+        self.assertUsesIndex(Rating.objects.filter(user=self.test_profile))
+
+    def test_movie_comments_page_uses_index(self):
+        comments = Comment.objects.filter(movie=self.test_movie).select_related("user__user")
+        self.assertUsesIndex(comments.order_by("-time_posted", "-id")[:21], sorted_by_index=True)
+
+    def test_producer_movies_use_index(self):
+        self.assertUsesIndex(Movie.objects.filter(producer=self.test_profile))
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from rotten_potatoes import jobs
+from rotten_potatoes.jobs import claim_job, enqueue, queue_stats, retry_failed_jobs, run_job, run_pending_jobs
+from rotten_potatoes.models import *
+
+# Arguments the test tasks were called with
+calls = []
+
+
+@jobs.task
+def record_call(value):
+    calls.append(value)
+
+
+@jobs.task
+def always_fail():
+    raise RuntimeError("Task failed")
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_DELAY=10, JOB_TIMEOUT=60)
+class TestJobs(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_jobs_in_order_and_deletes_them(self):
+        enqueue("record_call", value=1)
+        enqueue("record_call", value=2)
+
+        self.assertEquals(run_pending_jobs(), 2)
+
+        self.assertEquals(calls, [1, 2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_task(self):
+        with self.assertRaises(ValueError):
+            enqueue("missing_task")
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = enqueue("always_fail")
+
+        with self.assertLogs("rotten_potatoes.jobs", level="WARNING"):
+            self.assertFalse(run_job(claim_job()))
+
+        # Check the job waits the retry delay before running again
+        job.refresh_from_db()
+        self.assertEquals(job.status, Job.PENDING)
+        self.assertEquals(job.attempts, 1)
+        self.assertTrue(job.last_error.find("RuntimeError: Task failed") > -1)
+        self.assertTrue(timedelta(seconds=9) < job.run_at - now() <= timedelta(seconds=10))
+        self.assertIsNone(claim_job())
+
+        # Check the delay doubles after the second failure
+        Job.objects.filter(pk=job.pk).update(run_at=now())
+        with self.assertLogs("rotten_potatoes.jobs", level="WARNING"):
+            run_job(claim_job())
+        job.refresh_from_db()
+        self.assertTrue(timedelta(seconds=19) < job.run_at - now() <= timedelta(seconds=20))
+
+    def test_job_fails_after_max_attempts(self):
+        job = enqueue("always_fail")
+
+        for attempt in range(3):
+            Job.objects.filter(pk=job.pk).update(run_at=now())
+            with self.assertLogs("rotten_potatoes.jobs", level="WARNING"):
+                run_pending_jobs()
+
+        job.refresh_from_db()
+        self.assertEquals(job.status, Job.FAILED)
+        self.assertEquals(job.attempts, 3)
+        self.assertIsNone(claim_job())
+
+        # Check failed jobs can be queued again
+        self.assertEquals(retry_failed_jobs(), 1)
+        self.assertEquals(claim_job().pk, job.pk)
+
+    def test_job_of_a_dead_worker_is_taken_again(self):
+        job = enqueue("record_call", value=1)
+        self.assertEquals(claim_job().pk, job.pk)
+
+        # Check a running job is not taken again until it times out
+        self.assertIsNone(claim_job())
+        Job.objects.filter(pk=job.pk).update(started=now() - timedelta(seconds=61))
+        self.assertEquals(claim_job().attempts, 2)
+
+        # Check it fails once it has timed out JOB_MAX_ATTEMPTS times
+        Job.objects.filter(pk=job.pk).update(started=now() - timedelta(seconds=61), attempts=3)
+        self.assertIsNone(claim_job())
+        self.assertEquals(Job.objects.get(pk=job.pk).status, Job.FAILED)
+
+    def test_queue_stats(self):
+        enqueue("record_call", value=1)
+        Job.objects.filter(pk=enqueue("record_call", value=2).pk).update(run_at=now() - timedelta(seconds=30))
+        Job.objects.filter(pk=enqueue("always_fail").pk).update(status=Job.FAILED)
+
+        stats = queue_stats()
+
+        self.assertEquals(stats["counts"], {"record_call": {"pending": 2}, "always_fail": {"failed": 1}})
+        self.assertTrue(stats["oldest_pending"] >= timedelta(seconds=30))
+
+    def test_commands(self):
+        enqueue("record_call", value=1)
+        Job.objects.filter(pk=enqueue("always_fail").pk).update(status=Job.FAILED, last_error="Error\nLast line")
+
+        out = StringIO()
+        call_command("jobs", stdout=out)
+        self.assertTrue(out.getvalue().find("record_call: 1 pending, 0 running, 0 failed") > -1)
+        self.assertTrue(out.getvalue().find("always_fail {}: Last line") > -1)
+
+        call_command("worker", "--once", stdout=StringIO())
+        self.assertEquals(calls, [1])
+        self.assertEquals(Job.objects.get().status, Job.FAILED)
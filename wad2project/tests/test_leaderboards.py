@@ -0,0 +1,150 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from rotten_potatoes.forms import sort_by_orderings
+from rotten_potatoes.leaderboards import LEADERBOARD_FIELDS, LeaderboardPage, get_cached_leaderboards, \
+    get_leaderboard
+from rotten_potatoes.models import *
+from rotten_potatoes.pagination import KeysetPage, encode_cursor
+from rotten_potatoes.scores import compute_movie_scores
+
+
+class TestLeaderboards(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test_profiles = []
+        for i in range(3):
+            user = User.objects.create_user(username="test_profile{}".format(i))
+            self.test_profiles.append(UserProfile.objects.create(user=user))
+
+        self.movies = {}
+        for name, ratings in [("Movie A", [3]), ("Movie B", [5, 4]), ("Movie C", []), ("Movie D", [4, 4, 1]),
+                              ("Movie E", [3])]:
+            movie = Movie.objects.create(name=name, producer=self.test_profiles[0], genre="Action")
+            for profile, rating in zip(self.test_profiles, ratings):
+                Rating.objects.create(movie=movie, user=profile, rating=rating)
+            self.movies[name] = movie
+
+        Movie.objects.create(name="Other Genre", producer=self.test_profiles[0], genre="Drama")
+
+    def collect_pages(self, page_class, *args):
+        # Names of every page, following the cursors from the first page
+        pages, cursor = [], None
+        while True:
+            page = page_class(*args, cursor=cursor, per_page=2)
+            pages.append([m.name for m in page])
+            cursor = page.next_cursor
+            if cursor is None:
+                return pages
+
+    def action_names(self, sort_by):
+        return [m.name for m in LeaderboardPage("Action", sort_by, per_page=10)]
+
+    def test_leaderboard_pages_match_database_pages(self):
+        for sort_by, ordering in sort_by_orderings.items():
+            with self.subTest(sort_by=sort_by):
+                self.assertEquals(self.collect_pages(LeaderboardPage, "Action", sort_by),
+                                  self.collect_pages(KeysetPage, Movie.objects.filter(genre="Action"), ordering))
+
+    def test_leaderboard_cursors_are_interchangeable_with_database_cursors(self):
+        ordering = sort_by_orderings["-avg_rating"]
+        database_page = KeysetPage(Movie.objects.filter(genre="Action"), ordering, per_page=2)
+        leaderboard_page = LeaderboardPage("Action", "-avg_rating", per_page=2)
+
+        self.assertEquals(leaderboard_page.next_cursor, database_page.next_cursor)
+
+    def test_leaderboard_page_is_read_without_ranking_query(self):
+        # Built on first use, afterwards a page only reads the genre version and loads its movies
+        self.action_names("-avg_rating")
+
+        with self.assertNumQueries(2):
+            self.action_names("-avg_rating")
+
+    def test_writes_retire_cached_leaderboards(self):
+        self.action_names("-avg_rating")
+
+        Rating.objects.create(movie=self.movies["Movie C"], user=self.test_profiles[0], rating=5)
+        rating = Rating.objects.get(movie=self.movies["Movie A"])
+        rating.rating = 1
+        rating.save()
+
+        # Check the leaderboard of the old genre version is built again on the next read
+        self.assertEquals(get_cached_leaderboards(get_catalog_version(["Action"])[2]), {})
+        with self.assertNumQueries(3):
+            names = self.action_names("-avg_rating")
+        self.assertEquals(names, ["Movie C", "Movie B", "Movie E", "Movie D", "Movie A"])
+
+        Rating.objects.filter(movie=self.movies["Movie C"]).delete()
+        self.assertEquals(self.action_names("-avg_rating")[-2:], ["Movie A", "Movie C"])
+
+    def test_scores_computed_by_the_command_reorder_leaderboards(self):
+        # A score the batch job corrects, which ranks first until then
+        Movie.objects.filter(name="Movie C").update(score=10)
+        self.assertEquals(self.action_names("-score")[0], "Movie C")
+
+        # Check the batch job, which sends no signals, retires the cached leaderboards
+        compute_movie_scores()
+        self.assertEquals(self.action_names("-score")[0], "Movie B")
+
+    def test_rating_writes_leave_leaderboards_alone(self):
+        movie = self.movies["Movie C"]
+
+        # Creating the rating, updating the movie aggregates and bumping the catalog version in a savepoint,
+        # nothing more
+        with self.assertNumQueries(6):
+            Rating.objects.create(movie=movie, user=self.test_profiles[0], rating=5)
+
+    def test_writes_leave_leaderboards_of_other_genres_alone(self):
+        get_leaderboard("Drama", "name", get_catalog_version(["Drama"])[2]["Drama"])
+
+        Rating.objects.create(movie=self.movies["Movie C"], user=self.test_profiles[0], rating=5)
+        Movie.objects.get(name="Movie A").save()
+        compute_movie_scores()
+
+        # Check writes to movies of another genre keep the Drama leaderboards cached
+        genre_versions = get_catalog_version(["Action", "Drama"])[2]
+        self.assertEquals(set(get_cached_leaderboards(genre_versions)),
+                          {("Drama", field) for field in LEADERBOARD_FIELDS})
+
+    def test_new_and_renamed_movies_take_their_place(self):
+        self.action_names("name")
+
+        Movie.objects.create(name="Movie AB", producer=self.test_profiles[0], genre="Action")
+        movie = Movie.objects.get(name="Movie E")
+        movie.name = "Movie 0"
+        movie.save()
+
+        self.assertEquals(self.action_names("name"), ["Movie 0", "Movie A", "Movie AB", "Movie B", "Movie C",
+                                                      "Movie D"])
+
+    def test_movie_changing_genre_moves_between_leaderboards(self):
+        self.action_names("name")
+        get_leaderboard("Drama", "name", get_catalog_version(["Drama"])[2]["Drama"])
+
+        movie = Movie.objects.get(name="Movie B")
+        movie.genre = "Drama"
+        movie.save()
+
+        self.assertNotIn("Movie B", self.action_names("name"))
+        self.assertEquals([m.name for m in LeaderboardPage("Drama", "name")], ["Movie B", "Other Genre"])
+
+    def test_deleted_movie_leaves_leaderboard(self):
+        self.action_names("name")
+
+        self.movies["Movie D"].delete()
+
+        self.assertEquals(self.action_names("name"), ["Movie A", "Movie B", "Movie C", "Movie E"])
+
+    def test_stale_leaderboard_skips_movies_no_longer_in_genre(self):
+        self.action_names("name")
+
+        # Writes which bypass the signals leave the leaderboard behind
+        Movie.objects.filter(name="Movie A").update(genre="Drama")
+
+        self.assertEquals(self.action_names("name"), ["Movie B", "Movie C", "Movie D", "Movie E"])
+
+    def test_cursor_with_wrong_values_starts_from_first_page(self):
+        page = LeaderboardPage("Action", "name", cursor=encode_cursor([1, "not an id"]), per_page=2)
+
+        self.assertEquals([m.name for m in page], ["Movie A", "Movie B"])
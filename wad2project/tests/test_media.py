@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, Client, override_settings
+from django.utils.http import http_date
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(256)) * 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL_REDIRECT=None, MEDIA_CACHE_MAX_AGE=3600)
+class TestMediaServing(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        os.makedirs(os.path.join(MEDIA_ROOT, "movie_images"), exist_ok=True)
+        with open(os.path.join(MEDIA_ROOT, "movie_images", "cover.jpg"), "wb") as f:
+            f.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.url = "/media/movie_images/cover.jpg"
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+
+        # Check status code is OK, with the validators and caching headers
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(b"".join(response.streaming_content), CONTENT)
+        self.assertEquals(response["Content-Type"], "image/jpeg")
+        self.assertEquals(response["Content-Length"], str(len(CONTENT)))
+        self.assertEquals(response["Accept-Ranges"], "bytes")
+        self.assertEquals(response["Cache-Control"], "public, max-age=3600")
+        self.assertRegex(response["ETag"], r'^"[0-9a-f]+-400"$')
+        self.assertTrue(response.has_header("Last-Modified"))
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        # Check the file is not sent again, the validators are
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response.content, b"")
+        self.assertEquals(response["ETag"], etag)
+
+        self.assertEquals(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+
+        self.assertEquals(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEquals(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200)
+
+    def test_etag_changes_with_the_file(self):
+        etag = self.client.get(self.url)["ETag"]
+        path = os.path.join(MEDIA_ROOT, "movie_images", "cover.jpg")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+
+        self.assertNotEqual(self.client.get(self.url)["ETag"], etag)
+
+    def test_ranges(self):
+        for header, first, last in (("bytes=0-99", 0, 99), ("bytes=1000-", 1000, 1023),
+                                    ("bytes=-24", 1000, 1023), ("bytes=1000-5000", 1000, 1023)):
+            response = self.client.get(self.url, HTTP_RANGE=header)
+
+            self.assertEquals(response.status_code, 206, header)
+            self.assertEquals(response["Content-Range"], "bytes {}-{}/1024".format(first, last))
+            self.assertEquals(response["Content-Length"], str(last - first + 1))
+            self.assertEquals(b"".join(response.streaming_content), CONTENT[first:last + 1])
+
+    def test_unsatisfiable_and_ignored_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2000-")
+        self.assertEquals(response.status_code, 416)
+        self.assertEquals(response["Content-Range"], "bytes */1024")
+
+        # Check multiple ranges and ranges of an older version of the file get the whole file
+        self.assertEquals(self.client.get(self.url, HTTP_RANGE="bytes=0-1,5-6").status_code, 200)
+        self.assertEquals(self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"old"').status_code, 200)
+
+        etag = self.client.get(self.url)["ETag"]
+        self.assertEquals(self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE=etag).status_code, 206)
+
+    def test_missing_files(self):
+        for path in ("/media/movie_images/missing.jpg", "/media/../manage.py", "/media/movie_images"):
+            self.assertEquals(self.client.get(path).status_code, 404, path)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT="/protected-media/")
+    def test_accel_redirect(self):
+        response = self.client.get("/media/movie_images/a cover.jpg")
+
+        # Check only the headers are sent, nginx sends the file
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response["X-Accel-Redirect"], "/protected-media/movie_images/a%20cover.jpg")
+        self.assertEquals(response["Content-Type"], "image/jpeg")
+        self.assertEquals(response.content, b"")
@@ -0,0 +1,144 @@
+import os
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from rotten_potatoes.models import *
+
+
+class TestMovieRatingAggregates(TestCase):
+
+    def setUp(self):
+        self.profiles = []
+        for username in ("first", "second", "third"):
+            user = User.objects.create_user(username=username)
+            self.profiles.append(UserProfile.objects.create(user=user))
+
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.profiles[0])
+
+    def get_movie(self):
+        return Movie.objects.get(pk=self.test_movie.pk)
+
+    def test_movie_without_ratings_has_empty_aggregates(self):
+        movie_obj = self.get_movie()
+
+        self.assertEquals(movie_obj.rating_sum, 0)
+        self.assertEquals(movie_obj.num_of_ratings, 0)
+        self.assertEquals(movie_obj.avg_rating, 0)
+
+    def test_creating_ratings_updates_aggregates(self):
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[1], rating=5)
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[2], rating=2)
+
+        movie_obj = self.get_movie()
+
+        self.assertEquals(movie_obj.rating_sum, 7)
+        self.assertEquals(movie_obj.num_of_ratings, 2)
+        self.assertEquals(movie_obj.avg_rating, 3.5)
+
+    def test_changing_rating_updates_aggregates(self):
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[1], rating=5)
+
+        # Change rating on a freshly loaded instance
+        rating_obj = Rating.objects.get(user=self.profiles[1])
+        rating_obj.rating = 1
+        rating_obj.save()
+
+        movie_obj = self.get_movie()
+
+        self.assertEquals(movie_obj.rating_sum, 1)
+        self.assertEquals(movie_obj.num_of_ratings, 1)
+        self.assertEquals(movie_obj.avg_rating, 1)
+
+    def test_deleting_ratings_updates_aggregates(self):
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[1], rating=5)
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[2], rating=2)
+
+        Rating.objects.filter(user=self.profiles[1]).delete()
+        movie_obj = self.get_movie()
+        self.assertEquals(movie_obj.num_of_ratings, 1)
+        self.assertEquals(movie_obj.avg_rating, 2)
+
+        Rating.objects.all().delete()
+        movie_obj = self.get_movie()
+        self.assertEquals(movie_obj.num_of_ratings, 0)
+        self.assertEquals(movie_obj.avg_rating, 0)
+
+    def test_saving_stale_movie_keeps_aggregates(self):
+        stale_movie = self.get_movie()
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[1], rating=4)
+
+        # Saving a movie loaded before the rating must not reset its aggregates
+        stale_movie.description = "Test Description"
+        stale_movie.save()
+
+        movie_obj = self.get_movie()
+        self.assertEquals(movie_obj.description, "Test Description")
+        self.assertEquals(movie_obj.num_of_ratings, 1)
+        self.assertEquals(movie_obj.avg_rating, 4)
+
+    def test_rebuild_command_recomputes_aggregates(self):
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[1], rating=3)
+        Rating.objects.create(movie=self.test_movie, user=self.profiles[2], rating=4)
+
+        # Corrupt stored values, then rebuild them from the Rating table
+        Movie.objects.update(rating_sum=0, num_of_ratings=0, avg_rating=0)
+        call_command("rebuild_rating_aggregates", stdout=open(os.devnull, "w"))
+
+        movie_obj = self.get_movie()
+        self.assertEquals(movie_obj.rating_sum, 7)
+        self.assertEquals(movie_obj.num_of_ratings, 2)
+        self.assertEquals(movie_obj.avg_rating, 3.5)
+
+
+class TestMovieCast(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+
+    def create_movie(self, name, actors):
+        return Movie.objects.create(name=name, actors=actors, producer=self.test_profile)
+
+    def test_parse_actors_normalizes_names(self):
+        names = parse_actors(" Liam  Neeson,Maggie Grace, ,liam neeson")
+
+        self.assertEquals(names, {"liam-neeson": "Liam Neeson", "maggie-grace": "Maggie Grace"})
+
+    def test_creating_movie_links_cast(self):
+        test_movie = self.create_movie("Taken", "Liam Neeson, Maggie Grace")
+
+        self.assertEquals(sorted(a.name for a in test_movie.cast.all()), ["Liam Neeson", "Maggie Grace"])
+
+    def test_actors_are_shared_between_movies(self):
+        self.create_movie("Taken", "Liam Neeson, Maggie Grace")
+        self.create_movie("The Ballad of Buster Scruggs", "Tim Blake Nelson, liam neeson")
+
+        self.assertEquals(Actor.objects.count(), 3)
+        self.assertEquals(sorted(m.name for m in Actor.objects.get(slug="liam-neeson").movies.all()),
+                          ["Taken", "The Ballad of Buster Scruggs"])
+
+    def test_actor_lookup_does_not_match_substrings(self):
+        self.create_movie("Heat", "Al Pacino")
+        self.create_movie("Other Movie", "Alan Pacinoson")
+
+        self.assertEquals([m.name for m in Actor.objects.get(slug="al-pacino").movies.all()], ["Heat"])
+
+    def test_editing_actors_updates_cast(self):
+        self.create_movie("Taken", "Liam Neeson, Maggie Grace")
+
+        test_movie = Movie.objects.get(slug="taken")
+        test_movie.actors = "Liam Neeson, Famke Janssen"
+        test_movie.save()
+
+        self.assertEquals(sorted(a.name for a in test_movie.cast.all()), ["Famke Janssen", "Liam Neeson"])
+
+    def test_saving_unchanged_actors_skips_cast_update(self):
+        self.create_movie("Taken", "Liam Neeson")
+        test_movie = Movie.objects.get(slug="taken")
+
+        # Only the movie update itself and the catalog version bump
+        with self.assertNumQueries(2):
+            test_movie.save()
@@ -0,0 +1,79 @@
+import re
+
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+from rotten_potatoes.profiling import RequestProfile
+
+
+def server_timing(response):
+    # Server-Timing metrics by name, with their duration and description
+    metrics = {}
+    for metric in response["Server-Timing"].split(", "):
+        match = re.match(r'(\w+);dur=([\d.]+)(?:;desc="(.*)")?$', metric)
+        metrics[match.group(1)] = (float(match.group(2)), match.group(3))
+    return metrics
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_SERVER_TIMING=True)
+class TestProfilingMiddleware(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        producer = UserProfile.objects.create(user=User.objects.create_user(username="producer", password="123"),
+                                              producer=True)
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=producer)
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("rotten_potatoes:movie", args=[self.test_movie.slug]))
+
+        # Check every metric is reported, with the number of queries of the movie page
+        metrics = server_timing(response)
+        self.assertEquals(set(metrics), {"db", "tpl", "app", "total"})
+        self.assertEquals(metrics["db"][1], "3 queries")
+        self.assertTrue(metrics["tpl"][0] > 0)
+        self.assertTrue(metrics["db"][0] + metrics["tpl"][0] + metrics["app"][0] <= metrics["total"][0] + 0.05)
+
+    def test_log_line(self):
+        with self.assertLogs("rotten_potatoes.profiling", level="INFO") as logs:
+            self.client.get(reverse("rotten_potatoes:about"))
+
+        self.assertEquals(len(logs.records), 1)
+        self.assertTrue(logs.output[0].find("method=GET path=/rotten_potatoes/about/ status=200") > -1)
+        self.assertEquals(logs.records[0].request_profile["queries"], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_requests_not_sampled(self):
+        response = self.client.get(reverse("rotten_potatoes:about"))
+
+        # Check status code is OK, without a Server-Timing header
+        self.assertEquals(response.status_code, 200)
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    @override_settings(PROFILING_SERVER_TIMING=False)
+    def test_server_timing_header_not_sent_by_default(self):
+        # Behind a reverse proxy every client connects from the loopback address
+        with self.assertLogs("rotten_potatoes.profiling", level="INFO") as logs:
+            response = self.client.get(reverse("rotten_potatoes:about"), REMOTE_ADDR="127.0.0.1")
+
+        # Check the request was still profiled and logged
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEquals(len(logs.records), 1)
+
+    @override_settings(DEBUG=True, PROFILING_SERVER_TIMING=False)
+    def test_server_timing_header_sent_with_debug(self):
+        response = self.client.get(reverse("rotten_potatoes:about"))
+
+        self.assertTrue(response.has_header("Server-Timing"))
+
+    def test_app_time_excludes_sql_and_templates(self):
+        profile = RequestProfile()
+        profile.total_seconds = 0.010
+        profile.queries.seconds = 0.004
+        profile.template_seconds = 0.003
+
+        self.assertAlmostEqual(profile.app_seconds, 0.003)
+        self.assertEquals(profile.as_dict()["app_ms"], 3.0)
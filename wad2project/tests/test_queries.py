@@ -0,0 +1,95 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+
+
+class TestMovieViewsQueryCounts(TestCase):
+    # Logged in requests load their session, then the user together with its profile
+    AUTH_QUERIES = 2
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        producer = User.objects.create_user(username="producer", password="123")
+        self.producer = UserProfile.objects.create(user=producer, producer=True)
+
+        viewer = User.objects.create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.create(user=viewer)
+
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.producer)
+        Comment.objects.create(movie=self.test_movie, user=self.viewer, time_posted=datetime.now(), text="Comment")
+
+    def url(self, name):
+        return reverse("rotten_potatoes:" + name, kwargs={"movie_name_slug": self.test_movie.slug})
+
+    def test_movie_GET_anonymous(self):
+        # Movie with its producer, one page of comments with their authors, then similar movies
+        with self.assertNumQueries(3):
+            self.client.get(self.url("movie"))
+
+    def test_movie_GET_logged_in(self):
+        self.client.login(username="viewer", password="123")
+
+        with self.assertNumQueries(self.AUTH_QUERIES + 3):
+            self.client.get(self.url("movie"))
+
+    def test_edit_movie_GET(self):
+        self.client.login(username="producer", password="123")
+
+        # Movie
+        with self.assertNumQueries(self.AUTH_QUERIES + 1):
+            self.client.get(self.url("edit_movie"))
+
+    def test_add_comment_GET(self):
+        self.client.login(username="viewer", password="123")
+
+        # Movie
+        with self.assertNumQueries(self.AUTH_QUERIES + 1):
+            self.client.get(self.url("add_comment"))
+
+    def test_add_comment_POST(self):
+        self.client.login(username="viewer", password="123")
+
+        # Movie, the comment insert and the movie version update
+        with self.assertNumQueries(self.AUTH_QUERIES + 3):
+            self.client.post(self.url("add_comment"), data={"text": "Another Comment"})
+
+    def test_rate_movie_GET(self):
+        self.client.login(username="viewer", password="123")
+
+        # Movie and the check for an existing rating
+        with self.assertNumQueries(self.AUTH_QUERIES + 2):
+            self.client.get(self.url("rate_movie"))
+
+    def test_rate_movie_POST(self):
+        self.client.login(username="viewer", password="123")
+        # Prior cached by an earlier rating, it is not cached while there are none
+        cache.set(SCORE_PRIOR_KEY, 3.0)
+
+        # Movie, existing rating check, then the insert, the two aggregate updates and the
+        # catalog version bump inside two savepoints, with the score prior already cached
+        with self.assertNumQueries(self.AUTH_QUERIES + 2 + 8):
+            self.client.post(self.url("rate_movie"), data={"rating": 4})
+
+    def test_delete_movie_GET(self):
+        self.client.login(username="producer", password="123")
+        for i in range(4):
+            Comment.objects.create(movie=self.test_movie, user=self.viewer, time_posted=datetime.now(),
+                                   text="Comment {}".format(i))
+            rater = UserProfile.objects.create(user=User.objects.create_user(username="rater{}".format(i)))
+            Rating.objects.create(movie=self.test_movie, user=rater, rating=i + 1)
+
+        # Movie, then the cascading delete of ratings, comments, cast links, neighbors both ways and
+        # the movie, however many comments and ratings there are, the aggregates are deleted with it,
+        # and the catalog version bump
+        with self.assertNumQueries(self.AUTH_QUERIES + 1 + 8):
+            self.client.get(self.url("delete_movie"))
+
+
+@override_settings(SHARED_CACHE=True, SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+class TestMovieViewsQueryCountsWithSharedCache(TestMovieViewsQueryCounts):
+    # The session is cached at login, only the user and its profile are loaded by the first request
+    AUTH_QUERIES = 1
@@ -0,0 +1,52 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from rotten_potatoes.benchmark import BenchmarkData, build_scenarios, run_benchmarks
+from rotten_potatoes.datagen import DataGenerator
+from rotten_potatoes.models import *
+from rotten_potatoes.query_budgets import QUERY_BUDGETS, check_query_budgets
+from rotten_potatoes.recommendations import build_movie_neighbors
+
+
+class TestQueryBudgets(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Few movies with many comments and ratings each, so that a query per comment,
+        # rating or movie shows up as far more queries than the budget
+        cache.clear()
+        DataGenerator(users=80, movies=8, ratings=400, comments=300, seed=2).generate()
+        build_movie_neighbors()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_scenario_has_a_budget(self):
+        scenarios = build_scenarios(BenchmarkData())
+
+        routes = {(scenario.url_name, scenario.method) for scenario in scenarios}
+        self.assertEquals(routes - set(QUERY_BUDGETS), set())
+
+    def test_views_are_within_their_budget(self):
+        # Check the dataset is big enough for the movie pages to have more than a page of comments
+        self.assertTrue(Comment.objects.values('movie').annotate(n=Count('id')).filter(n__gt=20).exists())
+
+        # Requests with cold caches, then warm ones
+        results = run_benchmarks(iterations=2, warmup=0)
+
+        self.assertEquals(check_query_budgets(results), [])
+
+    def test_check_query_budgets_flags_views_over_budget(self):
+        results = {"results": {
+            "movie GET": {"url_name": "movie", "method": "GET", "max_queries": QUERY_BUDGETS["movie", "GET"]},
+            "rate POST": {"url_name": "rate_movie", "method": "POST",
+                          "max_queries": QUERY_BUDGETS["rate_movie", "POST"] + 1},
+            "unknown GET": {"url_name": "unknown", "method": "GET", "max_queries": 0},
+        }}
+
+        over_budget = check_query_budgets(results)
+
+        # Check a view at its budget passes, one over it or without a budget fails
+        self.assertEquals(len(over_budget), 2)
+        self.assertTrue(over_budget[0].startswith("rate POST:"))
+        self.assertTrue(over_budget[1].startswith("unknown GET:"))
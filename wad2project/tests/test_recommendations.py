@@ -0,0 +1,101 @@
+import os
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+from rotten_potatoes.recommendations import build_movie_neighbors, recommend_movies, similar_movies
+
+
+class TestRecommendations(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username="producer")
+        producer = UserProfile.objects.create(user=user, producer=True)
+        self.movies = {name: Movie.objects.create(name=name, producer=producer) for name in "ABCDE"}
+
+        # Two groups of users with opposite tastes
+        for i, ratings in enumerate([{"A": 5, "B": 5, "C": 1}, {"A": 5, "B": 4, "C": 2, "D": 1},
+                                     {"A": 4, "B": 5, "D": 2}, {"C": 5, "D": 5, "A": 1},
+                                     {"C": 4, "D": 5, "B": 2}]):
+            profile = self.create_profile("rater{}".format(i))
+            for name, rating in ratings.items():
+                Rating.objects.create(movie=self.movies[name], user=profile, rating=rating)
+
+        self.fan = self.create_profile("fan")
+
+    def create_profile(self, username):
+        user = User.objects.create_user(username=username)
+        user.set_password("123")
+        user.save()
+        return UserProfile.objects.create(user=user)
+
+    def neighbors(self, name):
+        return [m.name for m in similar_movies(self.movies[name])]
+
+    def test_build_stores_similar_movies_most_similar_first(self):
+        build_movie_neighbors()
+
+        self.assertEquals(self.neighbors("A"), ["B"])
+        self.assertEquals(self.neighbors("C"), ["D"])
+        # Unrated movies have no neighbors
+        self.assertEquals(self.neighbors("E"), [])
+        self.assertFalse(MovieNeighbor.objects.filter(movie=F('neighbor')).exists())
+
+    def test_build_replaces_stored_neighbors_and_keeps_top_k(self):
+        self.assertEquals(build_movie_neighbors(), build_movie_neighbors())
+
+        build_movie_neighbors(neighbors=1)
+        self.assertEquals(MovieNeighbor.objects.filter(movie=self.movies["A"]).count(), 1)
+
+    def test_recommendations_merge_neighbors_of_rated_movies(self):
+        build_movie_neighbors()
+        Rating.objects.create(movie=self.movies["A"], user=self.fan, rating=5)
+
+        recommendations = recommend_movies(self.fan)
+
+        self.assertEquals([(r.movie.name, r.because.name) for r in recommendations], [("B", "A")])
+
+    def test_recommendations_skip_rated_and_disliked_movies(self):
+        build_movie_neighbors()
+        Rating.objects.create(movie=self.movies["A"], user=self.fan, rating=5)
+        Rating.objects.create(movie=self.movies["B"], user=self.fan, rating=5)
+        Rating.objects.create(movie=self.movies["C"], user=self.fan, rating=1)
+
+        # D is similar to C, which the fan disliked
+        self.assertEquals(recommend_movies(self.fan), [])
+
+    def test_recommendations_run_three_queries(self):
+        build_movie_neighbors()
+        Rating.objects.create(movie=self.movies["C"], user=self.fan, rating=5)
+
+        # Ratings of the user, neighbors of the rated movies, then the recommended movies
+        with self.assertNumQueries(3):
+            recommend_movies(self.fan)
+
+    def test_user_without_ratings_gets_no_recommendations(self):
+        build_movie_neighbors()
+
+        with self.assertNumQueries(1):
+            self.assertEquals(recommend_movies(self.fan), [])
+
+    def test_build_movie_neighbors_command(self):
+        with open(os.devnull, "w") as devnull:
+            call_command("build_movie_neighbors", stdout=devnull)
+
+        self.assertTrue(MovieNeighbor.objects.exists())
+
+    def test_movie_and_account_pages_show_recommendations(self):
+        build_movie_neighbors()
+        Rating.objects.create(movie=self.movies["A"], user=self.fan, rating=5)
+        client = Client()
+
+        response = client.get(reverse("rotten_potatoes:movie", args=[self.movies["A"].slug]))
+        self.assertEquals(response.context["similar_movies"], [self.movies["B"]])
+        self.assertContains(response, "Similar Movies")
+
+        client.login(username="fan", password="123")
+        response = client.get(reverse("rotten_potatoes:account"))
+        self.assertContains(response, "because you rated")
+        self.assertEquals([r.movie for r in response.context["recommendations"]], [self.movies["B"]])
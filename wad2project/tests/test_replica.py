@@ -0,0 +1,194 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+from rotten_potatoes.management.commands.sync_replica import Command as SyncReplicaCommand
+from rotten_potatoes.auth import CachedModelBackend
+from rotten_potatoes.replica import PRIMARY, REPLICA, STICKY_COOKIE, PrimaryReplicaRouter, ReplicaMiddleware, \
+    _local, copy_database, replica_ready
+
+
+@override_settings(USE_REPLICA=True)
+class TestReplicaRouting(TransactionTestCase):
+    """
+    In tests the replica mirrors the default database through another connection, which only sees
+    committed rows, hence a TransactionTestCase.
+    """
+    databases = {PRIMARY, REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        producer = User.objects.create_user(username="producer", password="123")
+        self.producer = UserProfile.objects.create(user=producer, producer=True)
+
+        viewer = User.objects.create_user(username="viewer", password="123")
+        self.viewer = UserProfile.objects.create(user=viewer)
+        self.client.login(username="viewer", password="123")
+
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.producer)
+        self.movie_url = reverse("rotten_potatoes:movie", args=[self.test_movie.slug])
+
+        # Load the middleware, which checks the replica first
+        self.client.get(reverse("rotten_potatoes:about"))
+
+    def get(self, url):
+        # Response of a GET, with the queries it ran on each database
+        with CaptureQueriesContext(connections[PRIMARY]) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = self.client.get(url)
+        return response, primary, replica
+
+    def test_read_only_views_read_from_replica(self):
+        response, primary, replica = self.get(self.movie_url)
+
+        # Check the movie page was read from the replica, and only the session and the user from the primary
+        self.assertContains(response, "Test Movie")
+        self.assertTrue(len(replica) > 0)
+        self.assertEquals(len(primary), 2)
+        self.assertTrue(all('"django_session"' in query['sql'] or '"auth_user"' in query['sql']
+                            for query in primary.captured_queries))
+
+    def test_search_reads_from_replica(self):
+        response, primary, replica = self.get(reverse("rotten_potatoes:search") + "?q=test")
+
+        # Check the search index and the movies found were read from the replica
+        self.assertContains(response, "Test Movie")
+        self.assertTrue(any("MATCH" in query['sql'] for query in replica.captured_queries))
+        self.assertFalse(any("MATCH" in query['sql'] for query in primary.captured_queries))
+
+    def test_other_views_read_from_primary(self):
+        response, primary, replica = self.get(reverse("rotten_potatoes:rate_movie", args=[self.test_movie.slug]))
+
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(len(replica), 0)
+
+    def test_client_reads_its_writes_from_primary(self):
+        response = self.client.post(reverse("rotten_potatoes:rate_movie", args=[self.test_movie.slug]),
+                                    data={"rating": 5})
+        self.assertTrue(STICKY_COOKIE in response.cookies)
+
+        # Check the movie page is read from the primary, which has the rating the replica may lack
+        response, primary, replica = self.get(self.movie_url)
+        self.assertContains(response, "Number of Ratings: 1")
+        self.assertEquals(len(replica), 0)
+
+        # Check another client still reads from the replica
+        self.client = Client()
+        response, primary, replica = self.get(self.movie_url)
+        self.assertTrue(len(replica) > 0)
+
+    def test_expired_stickiness_reads_from_replica(self):
+        self.client.cookies[STICKY_COOKIE] = int(time.time()) - 1
+
+        response, primary, replica = self.get(self.movie_url)
+        self.assertTrue(len(replica) > 0)
+
+    def test_reads_without_a_request_use_primary(self):
+        self.assertEquals(PrimaryReplicaRouter().db_for_read(Movie), PRIMARY)
+        self.assertFalse(PrimaryReplicaRouter().allow_migrate(REPLICA, "rotten_potatoes"))
+
+    @override_settings(USE_REPLICA=False)
+    def test_replica_is_off(self):
+        response, primary, replica = self.get(self.movie_url)
+        self.assertEquals(len(replica), 0)
+
+    def test_values_cached_without_a_version_are_read_from_primary(self):
+        _local.read_replica = True
+        try:
+            # Check the score prior and the user are not read from a replica which may lack the last writes
+            with CaptureQueriesContext(connections[REPLICA]) as replica:
+                get_score_prior()
+                CachedModelBackend().get_user(self.viewer.user.pk)
+            self.assertEquals(PrimaryReplicaRouter().db_for_read(Movie), REPLICA)
+        finally:
+            _local.read_replica = False
+        self.assertEquals(len(replica), 0)
+
+    def test_missing_replica_is_not_used(self):
+        self.assertTrue(replica_ready())
+
+        # A replica file which was never synced, opened as an empty database
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        replica = connections[REPLICA]
+        connections[REPLICA] = type(replica)(dict(replica.settings_dict, NAME=os.path.join(directory, 'db.sqlite3')),
+                                             REPLICA)
+        try:
+            self.assertFalse(replica_ready())
+
+            # Check the middleware steps aside, so that every read goes to the primary
+            with self.assertLogs('rotten_potatoes.replica', 'ERROR'):
+                with self.assertRaises(MiddlewareNotUsed):
+                    ReplicaMiddleware(lambda request: None)
+        finally:
+            connections[REPLICA].close()
+            connections[REPLICA] = replica
+
+
+class TestCopyDatabase(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.primary = os.path.join(self.directory, 'db.sqlite3')
+        self.replica = os.path.join(self.directory, 'db-replica.sqlite3')
+
+    def connect(self, name):
+        connection = sqlite3.connect(name, isolation_level=None)
+        self.addCleanup(connection.close)
+        return connection
+
+    def count(self, name):
+        return self.connect(name).execute('SELECT COUNT(*) FROM movie').fetchone()[0]
+
+    def test_replica_has_committed_rows_of_primary(self):
+        writer = self.connect(self.primary)
+        writer.execute('PRAGMA journal_mode = WAL')
+        writer.execute('CREATE TABLE movie (name TEXT)')
+        writer.execute("INSERT INTO movie VALUES ('Test Movie')")
+        copy_database(self.primary, self.replica)
+
+        # Check a write which is not committed yet is not copied, and the replica lags until the next copy
+        writer.execute('BEGIN')
+        writer.execute("INSERT INTO movie VALUES ('Other Movie')")
+        copy_database(self.primary, self.replica)
+        self.assertEquals(self.count(self.replica), 1)
+
+        writer.execute('COMMIT')
+        self.assertEquals(self.count(self.replica), 1)
+        copy_database(self.primary, self.replica)
+        self.assertEquals(self.count(self.replica), 2)
+
+
+class TestSyncReplicaCommand(SimpleTestCase):
+
+    def test_loop_goes_on_after_failed_copy(self):
+        command = SyncReplicaCommand()
+        calls = []
+
+        def sync_replica():
+            calls.append(1)
+            if len(calls) == 1:
+                raise sqlite3.OperationalError("database is locked")
+            command.stopping = True
+
+        # Check the failed copy is logged, and the next one is made
+        with mock.patch('rotten_potatoes.management.commands.sync_replica.sync_replica', sync_replica), \
+                self.assertLogs('rotten_potatoes.replica', 'ERROR'):
+            call_command(command, loop=True, interval=0.01, stdout=StringIO())
+        self.assertEquals(len(calls), 2)
@@ -0,0 +1,154 @@
+import os
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+from rotten_potatoes import scores
+from rotten_potatoes.scores import bayesian_averages, compute_movie_scores, wilson_lower_bounds
+
+
+class TestScoreFunctions(TestCase):
+
+    def test_bayesian_average_prefers_many_good_ratings_over_one_perfect_rating(self):
+        scores = bayesian_averages(np.array([5.0, 48000.0]), np.array([1.0, 10000.0]), 3.0, 10)
+
+        self.assertLess(scores[0], scores[1])
+        self.assertAlmostEqual(scores[0], (5 + 3 * 10) / 11)
+
+    def test_wilson_lower_bound_grows_with_number_of_ratings(self):
+        bounds = wilson_lower_bounds(np.array([5.0, 50.0, 5000.0]), np.array([1.0, 10.0, 1000.0]), 1.96)
+
+        self.assertTrue(np.all(np.diff(bounds) > 0))
+        self.assertTrue(np.all(bounds < 5))
+        self.assertGreater(bounds[2], 4.9)
+
+    def test_movies_without_ratings_score_zero(self):
+        self.assertEquals(bayesian_averages(np.array([0.0]), np.array([0.0]), 3.0, 10).tolist(), [0.0])
+        self.assertEquals(wilson_lower_bounds(np.array([0.0]), np.array([0.0]), 1.96).tolist(), [0.0])
+
+
+class TestMovieScores(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test_profiles = []
+        for i in range(10):
+            user = User.objects.create_user(username="test_profile{}".format(i))
+            self.test_profiles.append(UserProfile.objects.create(user=user))
+
+        self.one_rating = self.create_movie("One Rating", [5])
+        self.many_ratings = self.create_movie("Many Ratings", [5, 5, 5, 5, 5, 5, 5, 5, 4, 4])
+        self.low_ratings = self.create_movie("Low Ratings", [2] * 10)
+        self.no_ratings = self.create_movie("No Ratings", [])
+        # Prior cached by the first rating, as if it had expired since
+        cache.clear()
+
+    def create_movie(self, name, ratings):
+        movie = Movie.objects.create(name=name, producer=self.test_profiles[0])
+        for profile, rating in zip(self.test_profiles, ratings):
+            Rating.objects.create(movie=movie, user=profile, rating=rating)
+        return movie
+
+    def test_compute_movie_scores_ranks_by_score(self):
+        compute_movie_scores()
+
+        self.assertEquals([m.name for m in Movie.objects.order_by('-score')],
+                          ["Many Ratings", "One Rating", "Low Ratings", "No Ratings"])
+        self.assertEquals([m.name for m in Movie.objects.order_by('-score_lower_bound')],
+                          ["Many Ratings", "One Rating", "Low Ratings", "No Ratings"])
+
+    def test_compute_movie_scores_matches_bayesian_average(self):
+        compute_movie_scores()
+
+        prior_mean = 73 / 21
+        weight = settings.SCORE_PRIOR_RATINGS
+        self.many_ratings.refresh_from_db()
+        self.assertAlmostEqual(self.many_ratings.score, (48 + prior_mean * weight) / (10 + weight))
+        self.assertAlmostEqual(get_score_prior(), prior_mean)
+
+    def test_compute_movie_scores_only_writes_changed_movies(self):
+        self.assertEquals(compute_movie_scores(), 3)
+        self.assertEquals(compute_movie_scores(), 0)
+
+    def test_ratings_keep_scores_up_to_date_between_runs(self):
+        compute_movie_scores()
+        one_rating_score = Movie.objects.get(name="One Rating").score
+        Rating.objects.create(movie=self.no_ratings, user=self.test_profiles[0], rating=4)
+        rating = Rating.objects.get(movie=self.one_rating)
+        rating.rating = 1
+        rating.save()
+
+        self.assertGreater(Movie.objects.get(name="No Ratings").score, 0)
+        self.assertLess(Movie.objects.get(name="One Rating").score, one_rating_score)
+
+        # Scores kept up to date match a run of the batch with the prior they used
+        prior_mean = get_score_prior()
+        for movie in Movie.objects.filter(pk__in=[self.no_ratings.pk, self.one_rating.pk]):
+            expected = bayesian_averages(np.array([movie.rating_sum]), np.array([movie.num_of_ratings]),
+                                         prior_mean, settings.SCORE_PRIOR_RATINGS)
+            self.assertAlmostEqual(movie.score, expected[0])
+
+    def test_compute_movie_scores_keeps_scores_of_ratings_made_meanwhile(self):
+        def rate_then_compute(*args):
+            # A rating saved after the batch read the aggregates
+            Rating.objects.create(movie=self.one_rating, user=self.test_profiles[1], rating=1)
+            return bayesian_averages(*args)
+
+        with mock.patch.object(scores, "bayesian_averages", rate_then_compute):
+            updated = compute_movie_scores()
+
+        # Check the score the rating gave the movie is not overwritten with one from its old aggregates
+        self.assertEquals(updated, 2)
+        self.one_rating.refresh_from_db()
+        self.assertEquals(self.one_rating.num_of_ratings, 2)
+        self.assertLess(self.one_rating.score, 4)
+
+    def test_ratings_page_sorts_by_lower_bound(self):
+        compute_movie_scores()
+        Movie.objects.update(genre="Action")
+
+        response = Client().get(reverse("rotten_potatoes:ratings"),
+                                data={"genre": "Action", "sort_by": "-score_lower_bound"})
+
+        self.assertEquals([m.name for m in response.context["movie_list"]],
+                          ["Many Ratings", "One Rating", "Low Ratings", "No Ratings"])
+
+    def test_compute_movie_scores_command(self):
+        with open(os.devnull, "w") as devnull:
+            call_command("compute_movie_scores", stdout=devnull)
+
+        self.many_ratings.refresh_from_db()
+        self.assertGreater(self.many_ratings.score_lower_bound, 0)
+
+    def test_prior_of_empty_catalog_is_not_cached(self):
+        Rating.objects.all().delete()
+        cache.clear()
+        self.assertEquals(get_score_prior(), 0)
+
+        # Check the prior follows the first ratings, as after a warm-up on an empty database
+        Rating.objects.create(movie=self.no_ratings, user=self.test_profiles[0], rating=4)
+        self.assertEquals(get_score_prior(), 4)
+
+    @override_settings(SCORE_PRIOR_CACHE_TTL=0)
+    def test_prior_is_computed_again_when_it_expires(self):
+        prior_mean = get_score_prior()
+
+        # Check a change made by another process is picked up once the cached prior expired
+        Movie.objects.filter(pk=self.no_ratings.pk).update(rating_sum=F('rating_sum') + 50,
+                                                           num_of_ratings=F('num_of_ratings') + 10)
+        self.assertAlmostEqual(get_score_prior(), (73 + 50) / (21 + 10))
+        self.assertNotAlmostEqual(get_score_prior(), prior_mean)
+
+    def test_index_top_movies_are_ranked_by_score(self):
+        compute_movie_scores()
+        cache.clear()
+
+        response = Client().get(reverse("rotten_potatoes:index"))
+
+        self.assertEquals([m.name for m in response.context["top_movies"]][:2], ["Many Ratings", "One Rating"])
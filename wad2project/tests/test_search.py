@@ -0,0 +1,120 @@
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from rotten_potatoes.models import *
+from rotten_potatoes.search import build_match_query, install_search_index, search_movies
+
+
+class TestSearchMovies(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+
+    def create_movie(self, name, actors="", description=""):
+        return Movie.objects.create(name=name, actors=actors, description=description, producer=self.test_profile)
+
+    def search_names(self, text, limit=10, offset=0):
+        return [m.name for m in search_movies(text, limit, offset)[0]]
+
+    def test_search_matches_name_actors_and_description(self):
+        self.create_movie("Taken", actors="Liam Neeson, Maggie Grace")
+        self.create_movie("Heat", description="A group of bank robbers")
+
+        self.assertEquals(self.search_names("taken"), ["Taken"])
+        self.assertEquals(self.search_names("neeson"), ["Taken"])
+        self.assertEquals(self.search_names("robbers"), ["Heat"])
+
+    def test_search_matches_word_prefixes_and_all_words(self):
+        self.create_movie("The Lord of the Rings", actors="Elijah Wood")
+        self.create_movie("The Rings of Power")
+
+        self.assertEquals(sorted(self.search_names("ring")), ["The Lord of the Rings", "The Rings of Power"])
+        self.assertEquals(self.search_names("rings elijah"), ["The Lord of the Rings"])
+
+    def test_search_ranks_name_matches_first(self):
+        self.create_movie("Some Movie", description="A story about a western town")
+        self.create_movie("Western")
+
+        self.assertEquals(self.search_names("western"), ["Western", "Some Movie"])
+
+    def test_search_index_follows_edits_and_deletes(self):
+        movie_obj = self.create_movie("Old Name")
+
+        movie_obj.name = "New Name"
+        movie_obj.save()
+        self.assertEquals(self.search_names("old"), [])
+        self.assertEquals(self.search_names("new"), ["New Name"])
+
+        movie_obj.delete()
+        self.assertEquals(self.search_names("new"), [])
+
+    def test_search_ignores_query_syntax_in_input(self):
+        self.create_movie("Taken")
+
+        self.assertEquals(build_match_query('taken" (*:'), '"taken"*')
+        self.assertEquals(self.search_names('taken" (*:'), ["Taken"])
+        self.assertEquals(self.search_names("*()"), [])
+
+    def test_search_pages_through_results(self):
+        for i in range(5):
+            self.create_movie("Sequel {}".format(i))
+
+        movies, has_next = search_movies("sequel", 2, 0)
+        self.assertEquals(len(movies), 2)
+        self.assertTrue(has_next)
+
+        movies, has_next = search_movies("sequel", 2, 4)
+        self.assertEquals(len(movies), 1)
+        self.assertFalse(has_next)
+
+    def test_install_search_index_restores_dropped_triggers(self):
+        movie_obj = self.create_movie("Taken")
+
+        # Remaking the movie table in a migration drops the triggers
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER rotten_potatoes_movie_fts_update")
+        Movie.objects.filter(pk=movie_obj.pk).update(name="Heat")
+
+        self.assertTrue(install_search_index())
+        self.assertEquals(self.search_names("heat"), ["Heat"])
+        self.assertFalse(install_search_index())
+
+
+class TestSearchView(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.search_url = reverse("rotten_potatoes:search")
+
+        user = User.objects.create_user(username="test_profile")
+        test_profile = UserProfile.objects.create(user=user)
+        Movie.objects.create(name="Test Movie", producer=test_profile)
+
+    def test_search_GET_uses_correct_template(self):
+        response = self.client.get(self.search_url)
+
+        # Check status code is OK
+        self.assertEquals(response.status_code, 200)
+
+        # Check if correct template is used
+        self.assertTemplateUsed(response, "rotten_potatoes/search.html")
+
+    def test_search_GET_displays_results(self):
+        response = self.client.get(self.search_url, data={"q": "test"})
+
+        # Check if correct data is displayed
+        self.assertContains(response, "Test Movie")
+
+        response = self.client.get(self.search_url, data={"q": "missing"})
+        self.assertContains(response, 'No movies found for "missing"')
+
+    def test_search_GET_clamps_page_number(self):
+        response = self.client.get(self.search_url, data={"q": "test", "page": "99999999999999999999"})
+
+        # Check a page number beyond the last searchable page is not an error
+        self.assertEquals(response.status_code, 200)
+        previous_page = "page={}".format(settings.SEARCH_MAX_PAGE - 1)
+        self.assertTrue(response.context["previous_page_url"].endswith(previous_page))
@@ -0,0 +1,93 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+
+from rotten_potatoes.storage import brotli
+
+STATIC_ROOT = tempfile.mkdtemp()
+STORAGE = "rotten_potatoes.storage.CompressedManifestStaticFilesStorage"
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT, STATICFILES_STORAGE=STORAGE)
+class TestStaticFiles(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with override_settings(STATIC_ROOT=STATIC_ROOT, STATICFILES_STORAGE=STORAGE):
+            call_command("collectstatic", interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.css_name = staticfiles_storage.stored_name("css/style.css")
+        with open(os.path.join(STATIC_ROOT, "css", "style.css"), "rb") as f:
+            self.css = f.read()
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        # Check the hashed name was written along with its gzip version, and brotli only when installed
+        self.assertRegex(self.css_name, r"^css/style\.[0-9a-f]{12}\.css$")
+        with open(os.path.join(STATIC_ROOT, self.css_name + ".gz"), "rb") as f:
+            self.assertEquals(gzip.decompress(f.read()), self.css)
+        self.assertEquals(os.path.exists(os.path.join(STATIC_ROOT, self.css_name + ".br")), brotli is not None)
+
+    def test_templates_use_hashed_names(self):
+        response = self.client.get("/rotten_potatoes/about/")
+
+        self.assertContains(response, "/static/" + self.css_name)
+
+    def test_serves_gzip_when_accepted(self):
+        response = self.client.get("/static/" + self.css_name, HTTP_ACCEPT_ENCODING="gzip, deflate")
+
+        # Check the precompressed version is served, cached for a year
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response["Content-Encoding"], "gzip")
+        self.assertEquals(response["Content-Type"], "text/css")
+        self.assertEquals(response["Vary"], "Accept-Encoding")
+        self.assertEquals(response["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEquals(gzip.decompress(b"".join(response.streaming_content)), self.css)
+
+    def test_serves_uncompressed_without_accept_encoding(self):
+        for accept_encoding in ("", "gzip;q=0", "identity"):
+            response = self.client.get("/static/" + self.css_name, HTTP_ACCEPT_ENCODING=accept_encoding)
+
+            self.assertFalse(response.has_header("Content-Encoding"))
+            self.assertEquals(b"".join(response.streaming_content), self.css)
+
+    def test_unhashed_names_are_revalidated(self):
+        response = self.client.get("/static/css/style.css")
+
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response["Cache-Control"], "public, no-cache")
+
+        # Check revalidating with the ETag does not send the file again
+        response = self.client.get("/static/css/style.css", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response["Vary"], "Accept-Encoding")
+
+    def test_missing_files(self):
+        # Check files which do not exist or are outside of STATIC_ROOT are not found
+        for path in ("/static/css/missing.css", "/static/../wad2project/settings.py", "/static/%2E%2E/manage.py"):
+            self.assertEquals(self.client.get(path).status_code, 404, path)
+
+    def test_only_get_and_head(self):
+        self.assertEquals(self.client.post("/static/" + self.css_name).status_code, 405)
+        self.assertEquals(self.client.head("/static/" + self.css_name).status_code, 200)
+
+    def test_files_missing_from_the_manifest_are_an_error(self):
+        # Check a file which was not collected is not referred to by its unhashed name
+        with self.assertRaises(ValueError):
+            staticfiles_storage.url("css/not-collected.css")
+
+        # Check development refers to the files by their own names
+        with self.settings(DEBUG=True):
+            self.assertEquals(staticfiles_storage.url("css/not-collected.css"), "/static/css/not-collected.css")
@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from rotten_potatoes.jobs import run_pending_jobs
+from rotten_potatoes.models import *
+from rotten_potatoes.thumbnails import generate_thumbnails, set_image, update_thumbnails
+
+MEDIA_DIR = tempfile.mkdtemp()
+
+
+def image_file(name, size, image_format="JPEG", mode="RGB"):
+    buffer = BytesIO()
+    Image.new(mode, size, "red").save(buffer, image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/" + image_format.lower())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_DIR, THUMBNAIL_WIDTHS=[100, 200, 400])
+class TestThumbnails(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        producer = User.objects.create_user(username="producer", password="123")
+        self.producer = UserProfile.objects.create(user=producer, producer=True)
+
+    def create_movie(self, cover):
+        movie = Movie.objects.create(name="Test Movie", producer=self.producer, cover=cover)
+        return Movie.objects.get(pk=movie.pk)
+
+    def test_generates_every_width_and_webp(self):
+        movie = self.create_movie(image_file("cover.jpg", (300, 150)))
+
+        widths = update_thumbnails(movie, "cover")
+
+        # Check widths above the image are replaced by the image width, without upscaling
+        self.assertEquals(widths, "100,200,300")
+        self.assertEquals(Movie.objects.get(pk=movie.pk).cover_thumbnails, widths)
+
+        root = os.path.splitext(movie.cover.name)[0]
+        for width in (100, 200, 300):
+            with Image.open(default_storage.path("{}.{}w.jpg".format(root, width))) as thumbnail:
+                self.assertEquals(thumbnail.size, (width, width // 2))
+            with Image.open(default_storage.path("{}.{}w.webp".format(root, width))) as thumbnail:
+                self.assertEquals(thumbnail.format, "WEBP")
+
+    def test_png_thumbnails_stay_png(self):
+        movie = self.create_movie(image_file("cover.png", (500, 500), "PNG", "RGBA"))
+
+        self.assertEquals(update_thumbnails(movie, "cover"), "100,200,400")
+
+        root = os.path.splitext(movie.cover.name)[0]
+        with Image.open(default_storage.path(root + ".200w.png")) as thumbnail:
+            self.assertEquals(thumbnail.mode, "RGBA")
+
+    def test_existing_thumbnails_are_kept(self):
+        movie = self.create_movie(image_file("cover.jpg", (300, 150)))
+        generate_thumbnails(movie.cover)
+        path = default_storage.path(os.path.splitext(movie.cover.name)[0] + ".100w.jpg")
+        os.utime(path, (0, 0))
+
+        generate_thumbnails(movie.cover)
+        self.assertEquals(os.path.getmtime(path), 0)
+
+        generate_thumbnails(movie.cover, overwrite=True)
+        self.assertNotEqual(os.path.getmtime(path), 0)
+
+    def test_add_movie_generates_thumbnails_in_the_worker(self):
+        self.client.login(username="producer", password="123")
+
+        data = {"name": "Uploaded Movie", "actors": "Test Actor", "trailer": "", "genre": "Action",
+                "description": "Test Description", "cover": image_file("cover.jpg", (800, 400))}
+        response = self.client.post(reverse("rotten_potatoes:add_movie"), data=data, follow=True)
+
+        # Check the movie page shows the original until the worker has run the queued job
+        movie = Movie.objects.get(slug="uploaded-movie")
+        self.assertEquals(movie.cover_thumbnails, "")
+        self.assertNotContains(response, "srcset")
+        self.assertEquals(Job.objects.get().task, "generate_thumbnails")
+
+        self.assertEquals(run_pending_jobs(), 1)
+
+        # Check the movie page then offers the thumbnails, WebP first
+        movie.refresh_from_db()
+        self.assertEquals(movie.cover_thumbnails, "100,200,400")
+        response = self.client.get(reverse("rotten_potatoes:movie", args=[movie.slug]))
+        self.assertContains(response, '<source type="image/webp" srcset="/media/{}.100w.webp 100w'.format(
+            os.path.splitext(movie.cover.name)[0]))
+        self.assertContains(response, 'src="{}"'.format(movie.cover.url))
+
+    def test_default_cover_gets_thumbnails_in_the_worker(self):
+        # The default cover, as shipped in the media directory
+        os.makedirs(os.path.join(MEDIA_DIR, "movie_images"), exist_ok=True)
+        Image.new("RGB", (300, 150), "red").save(os.path.join(MEDIA_DIR, DEFAULT_COVER))
+        self.client.login(username="producer", password="123")
+
+        data = {"name": "Default Movie", "actors": "Test Actor", "trailer": "", "genre": "Action",
+                "description": "Test Description"}
+        self.client.post(reverse("rotten_potatoes:add_movie"), data=data)
+        self.assertEquals(run_pending_jobs(), 1)
+
+        # Check a movie added without a cover gets the thumbnails of the default one
+        movie = Movie.objects.get(slug="default-movie")
+        self.assertEquals(movie.cover.name, DEFAULT_COVER)
+        self.assertEquals(movie.cover_thumbnails, "100,200,300")
+
+        # Check an edit resetting an uploaded cover to the default one sets its thumbnails again
+        set_image(movie, "cover", image_file("cover.jpg", (800, 400)))
+        movie.save()
+        update_thumbnails(movie, "cover")
+        data["genre"] = "Comedy"
+        self.client.post(reverse("rotten_potatoes:edit_movie", args=[movie.slug]), data=data)
+        movie.refresh_from_db()
+        self.assertEquals(movie.cover.name, DEFAULT_COVER)
+        self.assertEquals(movie.cover_thumbnails, "")
+        self.assertEquals(run_pending_jobs(), 1)
+        movie.refresh_from_db()
+        self.assertEquals(movie.cover_thumbnails, "100,200,300")
+
+    def test_movie_page_uses_original_without_thumbnails(self):
+        movie = self.create_movie(image_file("cover.jpg", (300, 150)))
+
+        response = self.client.get(reverse("rotten_potatoes:movie", args=[movie.slug]))
+
+        # Check only the original image is used
+        self.assertContains(response, '<img src="{}" class="img-fluid rounded"'.format(movie.cover.url))
+        self.assertNotContains(response, "srcset")
+
+    def test_backfill_command_updates_every_row_of_an_image(self):
+        cover = self.create_movie(image_file("cover.jpg", (300, 150))).cover.name
+        Movie.objects.create(name="Second Movie", producer=self.producer, cover=cover)
+        Movie.objects.create(name="Missing Movie", producer=self.producer, cover="movie_images/missing.jpg")
+
+        out = StringIO()
+        call_command("generate_thumbnails", stdout=out)
+
+        # Check both movies sharing the cover got its thumbnails, and the missing files were skipped,
+        # including the default profile picture which is not in the test media directory
+        self.assertTrue(out.getvalue().find("Skipped movie_images/missing.jpg") > -1)
+        self.assertEquals(list(Movie.objects.filter(cover=cover).values_list("cover_thumbnails", flat=True)),
+                          ["100,200,300", "100,200,300"])
+        self.assertEquals(Movie.objects.get(name="Missing Movie").cover_thumbnails, "")
+        self.assertEquals(UserProfile.objects.get(pk=self.producer.pk).profile_pic_thumbnails, "")
@@ -55,4 +55,16 @@ class TestUrls(TestCase):
 
     def test_ratings_url_is_resolved(self):
         url = reverse('rotten_potatoes:ratings')
-        self.assertEquals(resolve(url).func, ratings)
\ No newline at end of file
+        self.assertEquals(resolve(url).func, ratings)
+
+    def test_movie_comments_url_is_resolved(self):
+        url = reverse('rotten_potatoes:movie_comments', args=["slug"])
+        self.assertEquals(resolve(url).func, movie_comments)
+
+    def test_search_url_is_resolved(self):
+        url = reverse('rotten_potatoes:search')
+        self.assertEquals(resolve(url).func, search)
+
+    def test_actor_url_is_resolved(self):
+        url = reverse('rotten_potatoes:actor', args=["slug"])
+        self.assertEquals(resolve(url).func, actor)
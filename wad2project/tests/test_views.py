@@ -1,14 +1,23 @@
 from datetime import timedelta
-from django.test import TestCase, Client
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rotten_potatoes.forms import *
 from rotten_potatoes.models import *
+from rotten_potatoes.pagination import encode_cursor
 from rotten_potatoes.views import *
 
 
 class TestIndexViewEmptyDatabase(TestCase):
 
+    def setUp(self):
+        # Home page sections may be cached by previous tests
+        cache.clear()
+
     def test_index_GET_with_empty_database(self):
         client = Client()
         response = client.get(reverse('index'))
@@ -26,6 +35,7 @@ class TestIndexViewEmptyDatabase(TestCase):
 class TestIndexViewNotEmptyDatabase(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.index_url = reverse('index')
 
@@ -83,6 +93,43 @@ class TestIndexViewNotEmptyDatabase(TestCase):
         self.assertQuerysetEqual(response.context['this_years_favorite'], [])
 
 
+class TestIndexViewCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.index_url = reverse('index')
+
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.test_profile)
+
+    def test_index_GET_serves_sections_from_cache(self):
+        # First request fills the cache
+        self.client.get(self.index_url)
+
+        # Anonymous requests then only read the catalog version
+        with self.assertNumQueries(1):
+            response = self.client.get(self.index_url)
+
+        self.assertContains(response, "Test Movie")
+
+    def test_index_GET_cache_invalidated_by_movie_and_rating_writes(self):
+        self.client.get(self.index_url)
+
+        # New movie must show up straight away
+        Movie.objects.create(name="Second Movie", producer=self.test_profile)
+        response = self.client.get(self.index_url)
+        self.assertContains(response, "Second Movie")
+
+        # New rating must reorder top movies straight away
+        second_movie = Movie.objects.get(slug="second-movie")
+        Rating.objects.create(movie=second_movie, user=self.test_profile, rating=5)
+        response = self.client.get(self.index_url)
+        self.assertEquals(response.context['top_movies'][0], second_movie)
+
+
 class TestAboutView(TestCase):
 
     def test_about_GET_uses_correct_template(self):
@@ -100,6 +147,7 @@ class TestAboutView(TestCase):
 class TestMovieView(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.movie_url = reverse("rotten_potatoes:movie", args=["test-movie"])
 
@@ -162,7 +210,8 @@ class TestMovieView(TestCase):
         self.assertContains(response, "Test Movie")                             # Movie name
         self.assertContains(response, str(self.test_profile.user.username))     # Producers name
         self.assertContains(response, 'Release Date: Nov. 11, 1111')            # Release date
-        self.assertContains(response, 'Actors: Test Actor')                     # List of actors
+        self.assertContains(response, '<a href="{}">Test Actor</a>'.format(
+            reverse("rotten_potatoes:actor", args=["test-actor"])))             # Actors, linked to their page
         self.assertContains(response, 'Genre: Test Genre')                      # Movie genre
         self.assertContains(response, 'Test Description')                       # Description
         self.assertContains(response, "Rating: 5")                              # Average rating
@@ -170,6 +219,75 @@ class TestMovieView(TestCase):
         self.assertContains(response, "Test Comment")                           # Comments
 
 
+@override_settings(COMMENTS_PAGE_SIZE=3)
+class TestMovieCommentsPagination(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.movie_url = reverse("rotten_potatoes:movie", args=["test-movie"])
+
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+        self.test_movie = Movie.objects.create(name="Test Movie", producer=self.test_profile)
+
+    def create_comments(self, count):
+        # Each comment is written by a different user
+        start = Comment.objects.count()
+        for i in range(start, start + count):
+            user = User.objects.create_user(username="commenter{}".format(i))
+            profile = UserProfile.objects.create(user=user)
+            Comment.objects.create(movie=self.test_movie, user=profile, time_posted=datetime.now(),
+                                   text="Comment {}".format(i))
+
+    def test_movie_GET_shows_newest_comments_first_page(self):
+        self.create_comments(5)
+
+        response = self.client.get(self.movie_url)
+
+        # Check only the newest page is shown, with a link to the next one
+        self.assertEquals([c.text for c in response.context["comments"]], ["Comment 4", "Comment 3", "Comment 2"])
+        self.assertContains(response, "Load More Comments")
+
+    def test_movie_GET_query_count_does_not_grow_with_comments(self):
+        self.create_comments(1)
+        with CaptureQueriesContext(connection) as few_comments:
+            self.client.get(self.movie_url)
+
+        self.create_comments(10)
+        with CaptureQueriesContext(connection) as many_comments:
+            self.client.get(self.movie_url)
+
+        self.assertEquals(len(few_comments), len(many_comments))
+
+    def test_movie_comments_GET_returns_next_page_fragment(self):
+        self.create_comments(5)
+        response = self.client.get(self.movie_url)
+
+        # The link is only computed when the cached comments fragment is rendered
+        response = self.client.get(response.context["next_comments_url"]())
+
+        # Check status code is OK and the fragment holds the remaining comments only
+        self.assertEquals(response.status_code, 200)
+        self.assertTemplateUsed(response, "rotten_potatoes/comments.html")
+        self.assertTemplateNotUsed(response, "rotten_potatoes/base.html")
+        self.assertEquals([c.text for c in response.context["comments"]], ["Comment 1", "Comment 0"])
+        self.assertEquals(response["X-Next-Page"], "")
+
+    def test_movie_comments_GET_tampered_cursor_returns_first_page(self):
+        self.create_comments(5)
+
+        response = self.client.get(reverse("rotten_potatoes:movie_comments", args=["test-movie"]),
+                                   data={"cursor": encode_cursor(["x", "y"])})
+
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals([c.text for c in response.context["comments"]], ["Comment 4", "Comment 3", "Comment 2"])
+
+    def test_movie_comments_GET_for_missing_movie_returns_404(self):
+        response = self.client.get(reverse("rotten_potatoes:movie_comments", args=["missing-movie"]))
+
+        self.assertEquals(response.status_code, 404)
+
+
 class TestEditMovieVies(TestCase):
 
     def setUp(self):
@@ -463,6 +581,22 @@ class TestEditAccountView(TestCase):
         self.assertTrue(self.test_profile.profile_pic == "profile_images/default.png")  # If no file provided should set default picture
         self.assertTrue(self.test_profile.description == "Test Description")
 
+    def test_edit_account_POST_leaves_default_picture_thumbnails_to_the_worker(self):
+        self.client.login(username="test_profile", password="123")
+        data = {"profile_pic": "", "description": "Test Description"}
+
+        self.client.post(self.edit_account_url, data=data)
+
+        # Check the thumbnails of the default picture are generated by a job, not in the request
+        self.assertEquals(Job.objects.get().task, "generate_thumbnails")
+        self.assertEquals(UserProfile.objects.get(pk=self.test_profile.pk).profile_pic_thumbnails, "")
+
+        # Check saving once they exist queues nothing more
+        UserProfile.objects.filter(pk=self.test_profile.pk).update(profile_pic_thumbnails="160,320")
+        cache.clear()
+        self.client.post(self.edit_account_url, data=data)
+        self.assertEquals(Job.objects.count(), 1)
+
 
 class TestAddCommentView(TestCase):
 
@@ -632,6 +766,7 @@ class TestDeleteMovieView(TestCase):
 class TestRatingsView(TestCase):
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.ratings_url = reverse("rotten_potatoes:ratings")
 
@@ -688,4 +823,103 @@ class TestRatingsView(TestCase):
 
         # Check correct query set is given
         self.assertQuerysetEqual(response.context["movie_list"], ['<Movie: Test Movie1>', '<Movie: Test Movie3>'],
-                                 ordered=False)
\ No newline at end of file
+                                 ordered=False)
+
+
+class TestRatingsViewPagination(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.ratings_url = reverse("rotten_potatoes:ratings")
+
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+
+        for name in ["Movie E", "Movie B", "Movie D", "Movie A", "Movie C"]:
+            Movie.objects.create(name=name, producer=self.test_profile, genre="Action")
+
+    def collect_pages(self, data):
+        # Follow next page links until the last page, returning the names of every page
+        pages = []
+        response = self.client.get(self.ratings_url, data=data)
+        while True:
+            self.assertEquals(response.status_code, 200)
+            pages.append([m.name for m in response.context["movie_list"]])
+            if "next_page_url" not in response.context:
+                return pages
+            response = self.client.get(response.context["next_page_url"])
+
+    def test_ratings_GET_pages_through_movies_in_order(self):
+        pages = self.collect_pages({"genre": "Action", "sort_by": "name", "limit": 2})
+
+        self.assertEquals(pages, [["Movie A", "Movie B"], ["Movie C", "Movie D"], ["Movie E"]])
+
+    def test_ratings_GET_pages_are_stable_for_equal_sort_values(self):
+        # No movie has any rating, so only the tiebreaker orders them
+        pages = self.collect_pages({"genre": "Action", "sort_by": "-num_of_ratings", "limit": 2})
+        names = [name for page in pages for name in page]
+
+        self.assertEquals(len(pages), 3)
+        self.assertEquals(sorted(names), ["Movie A", "Movie B", "Movie C", "Movie D", "Movie E"])
+
+    def test_ratings_GET_deep_page_runs_same_queries_as_first_page(self):
+        data = {"genre": "Action", "sort_by": "-avg_rating", "limit": 2}
+        response = self.client.get(self.ratings_url, data=data)
+
+        # The catalog version, then the page
+        with self.assertNumQueries(2):
+            self.client.get(self.ratings_url, data=data)
+        with self.assertNumQueries(2):
+            self.client.get(response.context["next_page_url"])
+
+    def test_ratings_GET_tampered_cursor_returns_first_page(self):
+        # Values which do not convert to the ordering fields, through the database and the leaderboards
+        for data in [{}, {"sort_by": "-avg_rating"}, {"genre": "Action", "sort_by": "name"}]:
+            for values in [["x", "y"], [None, 1], ["Movie A", 1.5]]:
+                response = self.client.get(self.ratings_url, data=dict(data, limit=2, cursor=encode_cursor(values)))
+
+                self.assertEquals(response.status_code, 200)
+                self.assertEquals(len(response.context["movie_list"]), 2)
+
+    def test_ratings_GET_limit_is_capped(self):
+        response = self.client.get(self.ratings_url, data={"limit": 100000})
+
+        self.assertEquals(response.context["movie_list"].per_page, settings.MAX_PAGE_SIZE)
+
+
+class TestActorView(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+
+        user = User.objects.create_user(username="test_profile")
+        self.test_profile = UserProfile.objects.create(user=user)
+
+        Movie.objects.create(name="Taken", actors="Liam Neeson", producer=self.test_profile)
+
+    def test_actor_GET_displays_filmography(self):
+        response = self.client.get(reverse("rotten_potatoes:actor", args=["liam-neeson"]))
+
+        # Check status code is OK
+        self.assertEquals(response.status_code, 200)
+
+        # Check if correct template is used and data is displayed
+        self.assertTemplateUsed(response, "rotten_potatoes/actor.html")
+        self.assertContains(response, "Liam Neeson")
+        self.assertContains(response, "Taken")
+
+    def test_actor_GET_query_count_does_not_grow_with_filmography(self):
+        for i in range(5):
+            Movie.objects.create(name="Sequel {}".format(i), actors="Liam Neeson", producer=self.test_profile)
+
+        # Actor, then the movies with their stored ratings
+        with self.assertNumQueries(2):
+            self.client.get(reverse("rotten_potatoes:actor", args=["liam-neeson"]))
+
+    def test_actor_GET_missing_actor_redirects_with_message(self):
+        response = self.client.get(reverse("rotten_potatoes:actor", args=["missing-actor"]), follow=True)
+
+        # Check we got redirected to index with a message
+        self.assertTemplateUsed(response, "rotten_potatoes/index.html")
+        self.assertContains(response, "Sorry, actor you tried to access does not exists")
@@ -0,0 +1,58 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase
+
+from rotten_potatoes.cache import HOME_PAGE_SECTIONS_KEY
+from rotten_potatoes.leaderboards import LEADERBOARD_FIELDS, get_cached_leaderboards
+from rotten_potatoes.models import *
+from rotten_potatoes.warmup import run_warmup
+
+
+class TestWarmup(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        producer = User.objects.create_user(username="producer", password="123")
+        self.producer = UserProfile.objects.create(user=producer, producer=True)
+        Movie.objects.create(name="Test Movie", producer=self.producer, genre="Action")
+        cache.clear()
+
+    def test_every_step_runs(self):
+        steps = run_warmup()
+
+        # Check every step succeeded and reported what it did
+        self.assertEquals([name for name, seconds, result, error in steps], ["templates", "urls", "caches"])
+        self.assertEquals([error for name, seconds, result, error in steps], [None, None, None])
+        self.assertTrue(steps[0][2].endswith(" templates"))
+
+    def test_caches_are_filled(self):
+        run_warmup()
+
+        # Check the home page sections and the leaderboards are cached for the first requests
+        self.assertIsNotNone(cache.get(HOME_PAGE_SECTIONS_KEY))
+        leaderboards = get_cached_leaderboards(get_catalog_version(["Action"])[2])
+        for field in LEADERBOARD_FIELDS:
+            self.assertEquals(len(leaderboards["Action", field]), 1)
+
+        # Check nothing is built again by a second warm-up, which reads the versions,
+        # and the prior as it is not cached while there are no ratings
+        with self.assertNumQueries(2):
+            self.assertEquals(run_warmup()[2][2], "0 genre leaderboards built")
+
+    def test_connections_are_closed(self):
+        # Check the connections opened by the warm-up are not inherited by forked workers
+        with mock.patch.object(connections, "close_all") as close_all:
+            run_warmup()
+        close_all.assert_called_once_with()
+
+    def test_command_reports_every_step(self):
+        out = StringIO()
+        call_command("warmup", stdout=out)
+
+        self.assertTrue(out.getvalue().find("templates: ") > -1)
+        self.assertTrue(out.getvalue().find("urls: ") > -1)
+        self.assertTrue(out.getvalue().find("Warmed up.") > -1)
@@ -14,3 +14,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'wad2project.settings')
 
 application = get_asgi_application()
+
+# Prepare the worker for its first requests, failures are logged and do not stop it
+from django.conf import settings
+
+if settings.WARMUP_ON_START:
+    from rotten_potatoes.warmup import run_warmup
+    run_warmup()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.1/ref/settings/
 """
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,23 +46,33 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'rotten_potatoes.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'rotten_potatoes.replica.ReplicaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'wad2project.urls'
 
+# Templates are looked up in TEMPLATE_DIR, then in the templates directory of every app
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates, timing the rendering of templates for the profiling middleware
+        'BACKEND': 'rotten_potatoes.profiling.ProfilingDjangoTemplates',
         'DIRS': [TEMPLATE_DIR, ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Compiled templates are kept in memory, except in development where they are edited
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -75,6 +86,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'wad2project.wsgi.application'
 
+# Whether the WSGI and ASGI applications compile the templates and fill the caches when they are loaded,
+# so that the first requests of a new worker are not slower, see the warmup command
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', '1') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
@@ -83,9 +98,170 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Seconds a connection is kept open and reused by the following requests of a worker
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            # Seconds a write waits for the lock held by another writer before failing
+            'timeout': 20,
+        },
+    },
+    # Copy of the default database, read by the read only views when USE_REPLICA is on. Locally it
+    # is a file kept in sync by the sync_replica command, in tests it is the test default database.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('DB_REPLICA_NAME', os.path.join(BASE_DIR, 'db-replica.sqlite3')),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# Writes go to the default database, and so do the reads outside the views allowed to use the replica
+DATABASE_ROUTERS = ['rotten_potatoes.replica.PrimaryReplicaRouter']
+
+# Whether the GET requests of the REPLICA_VIEWS read from the replica, see rotten_potatoes.replica
+USE_REPLICA = os.environ.get('DB_USE_REPLICA', '0') == '1'
+REPLICA_VIEWS = ['index', 'about', 'movie', 'movie_comments', 'actor', 'account', 'ratings', 'search']
+
+# Seconds the reads of a client which wrote go to the default database, so that it sees its own
+# writes. It should be longer than the replica takes to catch up, which sync_replica does every
+# REPLICA_SYNC_INTERVAL seconds.
+REPLICA_STICKY_SECONDS = 15
+REPLICA_SYNC_INTERVAL = 5
+
+# Pragmas set on every new SQLite connection, see rotten_potatoes.db. In WAL mode readers are not
+# blocked by writers, and synchronous NORMAL only syncs the file at checkpoints, which is safe there.
+# Up to 256 MiB of the file is memory mapped, and each connection caches up to 64 MiB of pages.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# The local memory cache is per process, use a shared backend (e.g. memcached)
+# when running several workers so that invalidation reaches all of them.
+# Sessions and users are only cached with a shared backend: with the default cache every
+# logged in request queries them, set CACHE_BACKEND and CACHE_LOCATION to cache them, e.g.
+# CACHE_BACKEND=django.core.cache.backends.memcached.MemcachedCache CACHE_LOCATION=127.0.0.1:11211
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'rotten-potatoes'),
     }
 }
 
+# Whether every worker uses the same cache, so that what one of them deletes from it is gone for the others
+SHARED_CACHE = CACHES['default']['BACKEND'].rsplit('.', 1)[-1] not in ('LocMemCache', 'DummyCache')
+
+# Seconds the computed home page sections are kept in the cache
+HOME_PAGE_CACHE_TTL = 300
+
+# Seconds the details, rating and comments fragments of a movie page are kept in the cache, they
+# are cached under the version of the movie and rendered again once a write bumps it
+MOVIE_FRAGMENT_CACHE_TTL = 3600
+
+# Part of the ETag of every page answered with Not Modified, change it with a release
+# which changes the templates so that browsers do not keep showing the old pages
+PAGE_VERSION = os.environ.get('PAGE_VERSION', '1')
+
+# Seconds the per genre leaderboards of the ratings page are kept in the cache, they are
+# rebuilt from the database when next read once a write changed the version of their genre
+LEADERBOARD_TTL = 3600
+
+# Movie scores count every movie as having this many extra ratings of the mean rating,
+# and their lower bounds are taken at this z value of the normal distribution (1.96 for 95%)
+SCORE_PRIOR_RATINGS = 10
+SCORE_CONFIDENCE_Z = 1.96
+
+# Seconds each process keeps the mean rating the scores kept up to date by ratings are computed with
+SCORE_PRIOR_CACHE_TTL = 300
+
+# Number of most similar movies stored for every movie by the build_movie_neighbors command,
+# shown as similar movies on a movie page, and recommended to a user on their account page
+MOVIE_NEIGHBORS = 20
+SIMILAR_MOVIES = 5
+RECOMMENDATIONS = 10
+
+# Widths in pixels of the thumbnails generated for uploaded covers and profile pictures,
+# and the quality of the JPEG and WebP ones
+THUMBNAIL_WIDTHS = [160, 320, 640, 960]
+THUMBNAIL_QUALITY = 82
+
+# Background jobs of the worker command: a failed job is tried JOB_MAX_ATTEMPTS times, waiting
+# JOB_RETRY_DELAY seconds after the first failure and twice as long after each other one. A job
+# running for JOB_TIMEOUT seconds was left by a worker which died and is taken again.
+# Idle workers look for new jobs every WORKER_POLL_INTERVAL seconds
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 30
+JOB_TIMEOUT = 600
+WORKER_POLL_INTERVAL = 2
+
+# Fraction of requests the profiling middleware measures, from 0 to 1, cheap enough to leave on. Their SQL,
+# template and total time are logged by rotten_potatoes.profiling, and reported in a Server-Timing header
+# with DEBUG or PROFILING_SERVER_TIMING on. Leave the header off where clients are not trusted, the
+# timings tell them too much about the server. The tests only profile the requests of the profiling tests.
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0 if sys.argv[1:2] == ['test'] else 0.01))
+PROFILING_SERVER_TIMING = os.environ.get('PROFILING_SERVER_TIMING', '0') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'rotten_potatoes.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'rotten_potatoes.warmup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'rotten_potatoes.replica': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Number of items on a listing page, and the most a client can ask for with ?limit=
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+RATINGS_PAGE_SIZE = 50
+COMMENTS_PAGE_SIZE = 20
+
+# Most pages of search results a client can ask for, later pages are answered with the last one
+SEARCH_MAX_PAGE = 100
+
+
+# With a shared cache, sessions are read from the cache and written through to the database, so that
+# logged in requests do not query the session table. A per process cache would keep a session another
+# worker logged out or flushed valid, so they are only read from the database then.
+SESSION_ENGINE = ('django.contrib.sessions.backends.cached_db' if SHARED_CACHE
+                  else 'django.contrib.sessions.backends.db')
+
+# Users are loaded together with their profile, and cached between requests with a shared cache
+AUTHENTICATION_BACKENDS = ['rotten_potatoes.auth.CachedModelBackend']
+
+# Seconds a user and its profile are kept in the shared cache
+USER_CACHE_TTL = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -128,6 +304,25 @@ DELETE_MESSAGE = 50
 STATICFILES_DIRS = [STATIC_DIR, ]
 STATIC_URL = '/static/'
 
+# collectstatic copies the static files here, under names with a hash of their content,
+# along with gzip (and brotli, if installed) versions of them
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+STATICFILES_STORAGE = 'rotten_potatoes.storage.CompressedManifestStaticFilesStorage'
+
+# The tests run without collected static files, and refer to them by their own names
+if sys.argv[1:2] == ['test']:
+    STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+# Seconds browsers and proxies cache static files with a hash in their name
+STATIC_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
 
 MEDIA_ROOT = MEDIA_DIR
 MEDIA_URL = '/media/'
+
+# Seconds browsers cache media files before revalidating them with their ETag
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+
+# URL prefix of an nginx internal location aliased to MEDIA_ROOT, e.g. '/protected-media/'. When set,
+# media responses only carry an X-Accel-Redirect header and nginx sends the file itself
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT')
@@ -18,7 +18,7 @@ from django.urls import path
 from django.urls import include
 from rotten_potatoes import views
 from django.conf import settings
-from django.conf.urls.static import static
+from rotten_potatoes.serving import serve_media, serve_static
 
 
 urlpatterns = [
@@ -26,4 +26,8 @@ urlpatterns = [
     path('rotten_potatoes/', include('rotten_potatoes.urls')),
     # The above maps any URLs starting with rango/ to be handled by rango.
     path('admin/', admin.site.urls),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    # Collected static files, in development runserver serves them from the app directories first
+    path(settings.STATIC_URL.lstrip('/') + '<path:path>', serve_static, name='static'),
+    # Uploaded files, only the headers when nginx sends the files with MEDIA_ACCEL_REDIRECT
+    path(settings.MEDIA_URL.lstrip('/') + '<path:path>', serve_media, name='media'),
+]
\ No newline at end of file